@@ -1,18 +1,48 @@
 import os
+import sys
+import gc
+import hmac
 import logging
 import json
 import re
+import tempfile
+import threading
+import time
+import multiprocessing
+import urllib.error
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
+from nltk.tokenize import word_tokenize
 from nltk.corpus import stopwords
-import spacy
-import tensorflow as tf
-from transformers import pipeline, AutoTokenizer, AutoModelForTokenClassification, AutoModelForSequenceClassification
+from model_registry import ModelRegistry
+from inference_backends import DEFAULT_BACKEND, active_backends, build_pipeline, parse_model_backends
+from batching import MicroBatcher
+from result_cache import ResultCache, make_cache_key
+from artifacts import (
+    MissingArtifactError, baked, missing_nltk_resources, spacy_model_directory, transformer_model_directory
+)
+from document_context import DocumentContext
+from fingerprints import FingerprintStore, SummaryMemo, clause_fingerprints, diff_clauses, minhash_signature
+from metrics import (
+    batch_queue_seconds, cache_lookups, http_seconds, model_input_tokens, observe_model_call,
+    render_metrics, stage_seconds, timed
+)
+from contract_rules import (
+    NLTK_DATA_DIR, split_sentences, detect_language, context_language, context_sentences, context_contract_fields,
+    context_dates, context_monetary_values, score_document_type, analyze_contract_clauses,
+    calculate_contract_risk_score, rule_analysis
+)
+from profiling import ProfileSession, ProfilingBusy, list_profiles, profile_path, profile_window
+from stage_graph import Stage, StageError, run_stages
+from job_queue import JobQueue, JobQueueFull, FINISHED_STATUSES, SUCCEEDED, FAILED
+from windowing import aggregate_window_scores, chunk_sentences, model_max_tokens, select_evenly, split_text, token_windows
+from retrieval import PassageIndexCache
 
 # Load environment variables
 load_dotenv()
@@ -31,245 +61,515 @@ app = Flask(__name__)
 MODEL_PATH = os.getenv('MODEL_PATH', '/app/models')
 ENABLE_GPU = os.getenv('ENABLE_GPU', 'false').lower() == 'true'
 
+# Offline mode loads NLTK data, spaCy and transformer models only from the
+# artifacts baked under MODEL_PATH (see bake_artifacts.py) and refuses to start
+# when one is missing, instead of waiting on network timeouts
+OFFLINE_MODE = os.getenv('OFFLINE_MODE', 'false').lower() == 'true'
+if OFFLINE_MODE:
+    # Must be set before transformers is first imported by a loader
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+# Comma-separated model names to load at startup ("all" loads every model);
+# everything else is loaded on first use
+PRELOAD_MODELS = [name.strip() for name in os.getenv('PRELOAD_MODELS', '').split(',') if name.strip()]
+# Comma-separated models the readiness probe waits for ("all", the default,
+# waits for every model, whether or not it was preloaded); empty for none
+READY_MODELS = [name.strip() for name in os.getenv('READY_MODELS', 'all').split(',') if name.strip()]
+# Upper bound for the estimated size of loaded models; 0 disables eviction
+MODEL_MEMORY_BUDGET_MB = int(os.getenv('MODEL_MEMORY_BUDGET_MB', '0'))
+# A model that failed to load is retried after MODEL_LOAD_RETRY_SECONDS, doubling
+# up to 10 minutes; after MODEL_LOAD_MAX_ATTEMPTS failed loads of a READY_MODELS
+# model the liveness probe fails too, so the pod is restarted instead of
+# staying unready for good
+MODEL_LOAD_RETRY_SECONDS = float(os.getenv('MODEL_LOAD_RETRY_SECONDS', '30'))
+MODEL_LOAD_MAX_ATTEMPTS = int(os.getenv('MODEL_LOAD_MAX_ATTEMPTS', '5'))
+
+# Intra-op threads of each inference library per process; 0 keeps the library
+# defaults. Set per worker by gunicorn.conf.py so workers do not oversubscribe cores
+INFERENCE_THREADS = int(os.getenv('INFERENCE_THREADS', '0'))
+
+if not ENABLE_GPU:
+    # Must be set before TensorFlow/PyTorch are first imported by a loader
+    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+
 logger.info(f"Starting ML service with model path: {MODEL_PATH}")
 logger.info(f"GPU enabled: {ENABLE_GPU}")
 
-# Download necessary NLTK data
-try:
-    nltk.download('punkt', quiet=True)
-    nltk.download('stopwords', quiet=True)
-    nltk.download('averaged_perceptron_tagger', quiet=True)
-    logger.info("NLTK resources downloaded successfully")
-except Exception as e:
-    logger.error(f"Error downloading NLTK resources: {e}")
-
-# Load spaCy models
-try:
-    # Load English model
-    nlp_en = spacy.load("en_core_web_sm")
+# Shared registry for all spaCy and transformer models
+model_registry = ModelRegistry(
+    memory_budget=MODEL_MEMORY_BUDGET_MB * 2**20, retry_after=MODEL_LOAD_RETRY_SECONDS, max_retry_after=600
+)
+
+# Approximate spaCy footprints, used for the memory budget
+SPACY_MODEL_SIZE = 50 * 2**20
+
+# Only doc.ents is read, so everything but the entity recognizer is left out
+SPACY_UNUSED_COMPONENTS = ["tagger", "parser", "attribute_ruler", "lemmatizer", "morphologizer", "senter", "textcat"]
+SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', '64'))
+SPACY_N_PROCESS = int(os.getenv('SPACY_N_PROCESS', '1'))
+# Long documents are processed in pieces of at most this many characters
+SPACY_MAX_CHARS = int(os.getenv('SPACY_MAX_CHARS', '100000'))
+
+# spaCy packages of each registry entry, in order of preference
+SPACY_PACKAGES = {
+    "spacy_en": ["en_core_web_sm"],
+    "spacy_ar": ["ar_core_news_sm", "xx_ent_wiki_sm"]
+}
+
+def load_spacy_entity_pipeline(name):
+    """Load a spaCy pipeline with only the components entity recognition needs"""
+    import spacy
+    source = spacy_model_directory(MODEL_PATH, name)
+    if baked(source):
+        name = source
+    elif OFFLINE_MODE:
+        raise MissingArtifactError(f"spaCy model {name} not found under {MODEL_PATH}")
+    nlp = spacy.load(name, exclude=SPACY_UNUSED_COMPONENTS)
+    # A shared tok2vec is only needed when a remaining component listens to it
+    if "tok2vec" in nlp.pipe_names and not getattr(nlp.get_pipe("tok2vec"), "listening_components", None):
+        nlp.remove_pipe("tok2vec")
+    logger.info(f"Loaded spaCy {name} with components {nlp.pipe_names}")
+    return nlp
+
+def load_spacy_english():
+    return load_spacy_entity_pipeline(SPACY_PACKAGES["spacy_en"][0])
+
+def load_spacy_arabic():
     # Load Arabic model if available, otherwise use multi-language model
+    arabic, multi_language = SPACY_PACKAGES["spacy_ar"]
     try:
-        nlp_ar = spacy.load("ar_core_news_sm")
-    except:
+        return load_spacy_entity_pipeline(arabic)
+    except Exception:
         logger.warning("Arabic spaCy model not found, using multi-language model")
-        nlp_ar = spacy.load("xx_ent_wiki_sm")
-    
-    logger.info("spaCy models loaded successfully")
-except Exception as e:
-    logger.error(f"Error loading spaCy models: {e}")
-    # Fallback to simple NLP if spaCy fails
-    nlp_en = None
-    nlp_ar = None
+        return load_spacy_entity_pipeline(multi_language)
 
-# Initialize transformers models
-def load_transformers_models():
-    models = {}
-    
-    try:
-        # Configure GPU/CPU settings
-        if not ENABLE_GPU:
+def load_spacy_models(registry):
+    """Register spaCy models for on-demand loading"""
+    registry.register("spacy_en", load_spacy_english, size_hint=SPACY_MODEL_SIZE)
+    registry.register("spacy_ar", load_spacy_arabic, size_hint=SPACY_MODEL_SIZE)
+    return registry
+
+devices_configured = False
+
+def configure_devices():
+    """Configure GPU/CPU settings before the first transformer model is built"""
+    global devices_configured
+    if devices_configured:
+        return
+    devices_configured = True
+    if not ENABLE_GPU:
+        try:
+            import tensorflow as tf
             tf.config.set_visible_devices([], 'GPU')
-            os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
             logger.info("GPU disabled for TensorFlow")
-        
-        # Document classification model
-        models["document_classifier"] = pipeline(
-            "text-classification", 
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            device=-1 if not ENABLE_GPU else 0
-        )
-        
-        # Named entity recognition model
-        models["ner_model"] = pipeline(
-            "ner", 
-            model="dbmdz/bert-large-cased-finetuned-conll03-english",
-            aggregation_strategy="simple",
-            device=-1 if not ENABLE_GPU else 0
-        )
-        
-        # Sentiment analysis model
-        models["sentiment_analyzer"] = pipeline(
-            "sentiment-analysis",
-            model="nlptown/bert-base-multilingual-uncased-sentiment",
-            device=-1 if not ENABLE_GPU else 0
-        )
-        
-        # Summarization model
-        models["summarizer"] = pipeline(
-            "summarization",
-            model="facebook/bart-large-cnn",
-            device=-1 if not ENABLE_GPU else 0
-        )
-        
-        # Question answering model
-        models["qa_model"] = pipeline(
-            "question-answering",
-            model="distilbert-base-cased-distilled-squad",
-            device=-1 if not ENABLE_GPU else 0
+        except Exception as e:
+            logger.warning(f"Could not configure TensorFlow devices: {e}")
+    configure_inference_threads(INFERENCE_THREADS)
+
+def configure_inference_threads(threads):
+    """Limit the intra-op threads of the inference libraries loaded in this process"""
+    if threads <= 0:
+        return
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+    tf = sys.modules.get("tensorflow")
+    if tf is not None:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+        except RuntimeError as e:
+            # TensorFlow only accepts this before its runtime starts
+            logger.warning(f"Could not limit TensorFlow to {threads} intra-op threads: {e}")
+
+# Inference backend per model, e.g. MODEL_BACKENDS="ner_model=onnx-int8,summarizer=onnx";
+# converted ONNX artifacts are cached under MODEL_PATH
+MODEL_BACKENDS = parse_model_backends(os.getenv('MODEL_BACKENDS', ''))
+# Framework of the plain pipelines, so installing PyTorch (e.g. with the ONNX
+# requirements) does not silently move them off TensorFlow
+PIPELINE_FRAMEWORK = os.getenv('PIPELINE_FRAMEWORK', 'tf')
+
+def pipeline_framework(backend):
+    """Framework of a model's weights: ONNX export reads PyTorch weights, so those models use whatever is baked"""
+    return PIPELINE_FRAMEWORK if backend == DEFAULT_BACKEND else None
+
+def pipeline_loader(task, model, backend=DEFAULT_BACKEND, **kwargs):
+    """Build a loader callable for a transformers pipeline"""
+    def load():
+        configure_devices()
+        source = transformer_model_directory(MODEL_PATH, model)
+        if not baked(source):
+            if OFFLINE_MODE:
+                raise MissingArtifactError(f"Transformer model {model} not found under {MODEL_PATH}")
+            source = None
+        return build_pipeline(
+            task, model, backend=backend, cache_dir=MODEL_PATH,
+            device=-1 if not ENABLE_GPU else 0, intra_op_threads=INFERENCE_THREADS, source=source,
+            framework=pipeline_framework(backend), **kwargs
         )
-        
-        logger.info("Transformer models loaded successfully")
-        return models
-    
-    except Exception as e:
-        logger.error(f"Error loading transformer models: {e}")
-        return {}
-
-# Load models
-transformers_models = load_transformers_models()
-
-# Contract analysis patterns and rules
-contract_patterns = {
-    "effective_date": r"(?i)effective\s+(?:as\s+of\s+)?(?:the\s+)?(?:date\s+(?:of|on|hereof)|date)?\s*:?\s*([A-Za-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}|\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4})",
-    "termination_date": r"(?i)(?:terminat(?:ion|e)|expir(?:ation|e)|end)\s+(?:date|on)\s*:?\s*([A-Za-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}|\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4})",
-    "payment_terms": r"(?i)(?:payment\s+terms|terms\s+of\s+payment)\s*:?\s*([^\.;]+)",
-    "governing_law": r"(?i)(?:governing\s+law|law\s+govern(?:s|ing))\s*:?\s*([^\.;]+)",
-    "parties": r"(?i)(?:between|among|party)\s+([A-Z][A-Za-z\s,]+(?:LLC|Inc\.|Corporation|Corp\.|Ltd\.|Limited|Co\.|Company))",
-    "confidentiality": r"(?i)(?:confidential(?:ity)?|non-disclosure)\s+([^\.;]+)",
-    "indemnification": r"(?i)(?:indemnif(?:y|ication)|hold\s+harmless)\s+([^\.;]+)",
-    "limitation_of_liability": r"(?i)(?:limit(?:ation|ing)?\s+(?:of|on)\s+liability)\s+([^\.;]+)",
-    "force_majeure": r"(?i)(?:force\s+majeure|act(?:s)?\s+of\s+god)\s+([^\.;]+)",
-    "dispute_resolution": r"(?i)(?:dispute\s+resolution|arbitration|mediation)\s+([^\.;]+)"
+    return load
+
+# Pipeline task and model of each transformer model
+TRANSFORMER_MODELS = {
+    "document_classifier": ("text-classification", "distilbert-base-uncased-finetuned-sst-2-english", {}),
+    "ner_model": ("ner", "dbmdz/bert-large-cased-finetuned-conll03-english", {"aggregation_strategy": "simple"}),
+    "sentiment_analyzer": ("sentiment-analysis", "nlptown/bert-base-multilingual-uncased-sentiment", {}),
+    "summarizer": ("summarization", "facebook/bart-large-cnn", {}),
+    "qa_model": ("question-answering", "distilbert-base-cased-distilled-squad", {})
 }
 
-# Contract clause risk assessment rules
-risk_assessment_rules = {
-    "high_risk_terms": [
-        "unlimited liability", "sole discretion", "unilateral", "without notice", 
-        "without cause", "without limitation", "without consent", "irrevocable", 
-        "perpetual", "unrestricted", "unconditional", "non-negotiable"
-    ],
-    "medium_risk_terms": [
-        "reasonable efforts", "commercially reasonable", "material breach", 
-        "substantial", "significant", "best efforts", "good faith"
-    ],
-    "low_risk_terms": [
-        "mutual", "reasonable notice", "written consent", "written notice", 
-        "limited liability", "reasonable time", "jointly"
-    ]
+# Initialize transformers models
+def load_transformers_models(registry):
+    """Register transformer pipelines for on-demand loading"""
+    for name, (task, model, kwargs) in TRANSFORMER_MODELS.items():
+        backend = MODEL_BACKENDS.get(name, DEFAULT_BACKEND)
+        registry.register(name, pipeline_loader(task, model, backend=backend, **kwargs))
+
+    return registry
+
+def missing_artifacts():
+    """Baked artifacts the service needs but cannot find"""
+    missing = [f"nltk:{name}" for name in missing_nltk_resources(NLTK_DATA_DIR)]
+    for packages in SPACY_PACKAGES.values():
+        if not any(baked(spacy_model_directory(MODEL_PATH, package)) for package in packages):
+            missing.append(f"spacy:{packages[0]}")
+    for name, (_, model, _) in TRANSFORMER_MODELS.items():
+        if not baked(transformer_model_directory(MODEL_PATH, model)):
+            missing.append(f"transformers:{model}")
+    return missing
+
+if OFFLINE_MODE:
+    # Fail at startup rather than on the first request that needs a missing artifact
+    started = time.perf_counter()
+    missing = missing_artifacts()
+    if missing:
+        raise MissingArtifactError(f"Offline mode, but artifacts are missing under {MODEL_PATH}: {', '.join(missing)}")
+    logger.info(f"All artifacts found under {MODEL_PATH} in {time.perf_counter() - started:.2f}s")
+    # Model load times are logged by the registry as PRELOAD_MODELS are loaded
+    started = time.perf_counter()
+    split_sentences("Loads the sentence tokenizer. Once per process.")
+    logger.info(f"NLTK data loaded in {time.perf_counter() - started:.2f}s")
+
+# Set by gunicorn.conf.py when the workers are forked from a master that imports this module
+FORK_WORKERS = os.getenv('FORK_WORKERS', 'false').lower() == 'true'
+
+def fork_safe(name):
+    """Whether a model loaded before a fork still works in the forked workers
+
+    spaCy pipelines are plain Python and NumPy; the TensorFlow, PyTorch and
+    ONNX Runtime thread pools behind the transformer models do not survive a fork.
+    """
+    return name in SPACY_PACKAGES
+
+# Models to load in each worker instead of in the master, because they are not fork-safe
+per_worker_models = []
+
+# Register models; they are loaded lazily unless listed in PRELOAD_MODELS
+load_spacy_models(model_registry)
+load_transformers_models(model_registry)
+if PRELOAD_MODELS:
+    preload_names = model_registry.keys() if PRELOAD_MODELS == ['all'] else PRELOAD_MODELS
+    if FORK_WORKERS:
+        per_worker_models.extend(name for name in preload_names if not fork_safe(name))
+        preload_names = [name for name in preload_names if fork_safe(name)]
+    model_registry.preload(preload_names)
+
+# Concurrent requests to these pipelines are grouped into batched forward passes
+ENABLE_MICRO_BATCHING = os.getenv('ENABLE_MICRO_BATCHING', 'true').lower() == 'true'
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '16'))
+BATCH_MAX_WAIT_MS = int(os.getenv('BATCH_MAX_WAIT_MS', '10'))
+BATCHED_MODELS = ["document_classifier", "ner_model", "sentiment_analyzer"]
+# Classifiers run over token windows return the score of every label, not
+# just the best one, so the scores of all windows can be combined
+PIPELINE_CALL_OPTIONS = {
+    "document_classifier": {"top_k": None},
+    "sentiment_analyzer": {"top_k": None}
 }
 
-# Document type classification rules
-document_types = {
-    "contract": ["agreement", "contract", "terms", "conditions", "covenant", "deed", "license"],
-    "legal_opinion": ["opinion", "legal opinion", "advice", "counsel", "recommendation"],
-    "court_filing": ["complaint", "motion", "petition", "pleading", "brief", "memorandum", "affidavit"],
-    "corporate_document": ["bylaws", "articles", "incorporation", "resolution", "minutes", "certificate"],
-    "regulatory_filing": ["filing", "report", "disclosure", "compliance", "regulatory", "statement"]
+def record_inference(model_name, seconds, batch_size=1):
+    """Record the latency of a model call for the readiness report and /metrics"""
+    model_registry.record_inference(model_name, seconds)
+    if model_name is not None:
+        observe_model_call(model_name, seconds, batch_size)
+
+# Model calls that failed over to a fallback since startup; results computed
+# while one happened are not cached (see store_result)
+model_fallback_count = 0
+model_fallback_lock = threading.Lock()
+
+def record_model_fallback():
+    """Count a failed model call whose result was replaced by a fallback"""
+    global model_fallback_count
+    with model_fallback_lock:
+        model_fallback_count += 1
+
+def run_pipeline_batch(model_name, texts):
+    """Run a pipeline on a list of texts in one padded batch"""
+    model = model_registry.get(model_name)
+    if model is None:
+        raise RuntimeError(f"Model '{model_name}' is not available")
+    started = time.perf_counter()
+    results = model(texts, batch_size=len(texts), **PIPELINE_CALL_OPTIONS.get(model_name, {}))
+    record_inference(model_name, time.perf_counter() - started, len(texts))
+    # Single-text calls return a list per input, so wrap bare results to match
+    return [result if isinstance(result, list) else [result] for result in results]
+
+model_batchers = {
+    name: MicroBatcher(
+        lambda texts, name=name: run_pipeline_batch(name, texts),
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        name=name,
+        on_batch=lambda waits, name=name: [batch_queue_seconds.labels(name).observe(wait) for wait in waits]
+    )
+    for name in BATCHED_MODELS
 }
 
-# Helper functions
-def detect_language(text):
-    """Detect if text is primarily in English or Arabic"""
-    # Simple heuristic: check for Arabic characters
-    arabic_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+')
-    arabic_matches = arabic_pattern.findall(text)
-    
-    # If more than 10% of the text contains Arabic characters, consider it Arabic
-    if len(''.join(arabic_matches)) > len(text) * 0.1:
-        return "ar"
-    return "en"
-
-def extract_dates(text):
-    """Extract dates from text using regex patterns"""
-    date_patterns = [
-        r'\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4}',  # DD/MM/YYYY, MM/DD/YYYY, etc.
-        r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}',  # Month DD, YYYY
-        r'\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?,?\s+\d{4}'  # DD Month YYYY
-    ]
-    
-    dates = []
-    for pattern in date_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        dates.extend(matches)
-    
-    return dates
+def run_pipeline(model_name, text):
+    """Run a pipeline on a single text, sharing a batch with concurrent callers"""
+    if ENABLE_MICRO_BATCHING and model_name in model_batchers:
+        return model_batchers[model_name].submit(text)
+    started = time.perf_counter()
+    result = model_registry.get(model_name)(text, **PIPELINE_CALL_OPTIONS.get(model_name, {}))
+    record_inference(model_name, time.perf_counter() - started)
+    return result
+
+# Texts longer than a model's input are split into overlapping token windows;
+# MAX_WINDOWS bounds the windows per text, spread evenly over it
+WINDOW_STRIDE_TOKENS = int(os.getenv('WINDOW_STRIDE_TOKENS', '64'))
+MAX_WINDOWS = int(os.getenv('MAX_WINDOWS', '16'))
+
+def model_windows(model_name, text):
+    """Token windows of a text sized for one model"""
+    tokenizer = getattr(model_registry.get(model_name), "tokenizer", None)
+    windows = token_windows(tokenizer, text, model_max_tokens(tokenizer), WINDOW_STRIDE_TOKENS)
+    return select_evenly(windows, MAX_WINDOWS)
 
-def extract_monetary_values(text):
-    """Extract monetary values from text using regex patterns"""
-    money_patterns = [
-        r'(?:USD|US\$|\$|SAR|SR|€|EUR|£|GBP)\s*\d+(?:,\d{3})*(?:\.\d{2})?',  # Currency symbol followed by amount
-        r'\d+(?:,\d{3})*(?:\.\d{2})?\s*(?:dollars|USD|SAR|riyals|euros|EUR|pounds|GBP)'  # Amount followed by currency name
+def run_windowed_pipeline(model_name, texts):
+    """Run a pipeline over the windows of each text, in one batch for all windows
+
+    Returns, per text, its windows and the pipeline output of each window.
+    A single window goes through the micro-batcher like any short request.
+    """
+    windows = [model_windows(model_name, text) for text in texts]
+    inputs = [window for text_windows in windows for window, _ in text_windows]
+    tokens = model_input_tokens.labels(model_name)
+    for text_windows in windows:
+        for _, token_count in text_windows:
+            tokens.observe(token_count)
+    if len(inputs) == 1:
+        outputs = [run_pipeline(model_name, inputs[0])]
+    else:
+        outputs = run_pipeline_batch(model_name, inputs)
+    
+    results = []
+    position = 0
+    for text_windows in windows:
+        results.append((text_windows, outputs[position:position + len(text_windows)]))
+        position += len(text_windows)
+    return results
+
+def run_windowed_classifier(model_name, texts):
+    """Classify texts of any length, weighting window scores by window length"""
+    return [
+        aggregate_window_scores(outputs, [tokens for _, tokens in text_windows])
+        for text_windows, outputs in run_windowed_pipeline(model_name, texts)
     ]
-    
-    values = []
-    for pattern in money_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        values.extend(matches)
-    
-    return values
 
-def assess_clause_risk(clause_text):
-    """Assess the risk level of a contract clause"""
-    clause_lower = clause_text.lower()
-    
-    # Count risk terms
-    high_risk_count = sum(1 for term in risk_assessment_rules["high_risk_terms"] if term.lower() in clause_lower)
-    medium_risk_count = sum(1 for term in risk_assessment_rules["medium_risk_terms"] if term.lower() in clause_lower)
-    low_risk_count = sum(1 for term in risk_assessment_rules["low_risk_terms"] if term.lower() in clause_lower)
+# Content-addressed cache of endpoint results; RESULT_CACHE_DB enables a
+# SQLite tier shared by all workers on the same host
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+MODEL_VERSION = os.getenv('MODEL_VERSION', 'v1')
+
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', '1024')),
+    max_bytes=int(os.getenv('RESULT_CACHE_MAX_MB', '64')) * 2**20,
+    ttl=int(os.getenv('RESULT_CACHE_TTL', '3600')),
+    db_path=os.getenv('RESULT_CACHE_DB') or None,
+    max_db_entries=int(os.getenv('RESULT_CACHE_DB_MAX_ENTRIES', '100000'))
+)
+
+def model_state():
+    """Available models and fallback count, to tell whether a result may have used a fallback"""
+    return sorted(model_registry.keys()), model_fallback_count
+
+def result_cache_key(endpoint, text, params=None, exact_text=False):
+    """Cache key for an endpoint result, or None when caching is disabled
+
+    The key is paired with the model state it was computed under. Results
+    with character offsets into the text need `exact_text`, so documents
+    differing only in whitespace do not share them.
+    """
+    if not RESULT_CACHE_ENABLED:
+        return None
+    available_models, fallbacks = model_state()
+    # Results computed without an unavailable model must not be served once it is available again
+    version = MODEL_VERSION + ":" + ",".join(available_models)
+    if MODEL_BACKENDS:
+        version += ":" + ",".join(f"{name}={backend}" for name, backend in sorted(MODEL_BACKENDS.items()))
+    return make_cache_key(endpoint, text, params, version, normalize=not exact_text), (available_models, fallbacks)
+
+def cached_result(key):
+    """Look up a cached endpoint result"""
+    if not key:
+        return None
+    result = result_cache.get(key[0])
+    cache_lookups.labels("miss" if result is None else "hit").inc()
+    return result
+
+def store_result(key, result):
+    """Cache an endpoint result, unless a model failed to load or fell back while it was computed
+
+    Such a result may hold a fallback (e.g. the extractive summary) and its
+    key still names the models as available, so it is returned uncached.
+    """
+    if not key:
+        return
+    if model_state() != key[1]:
+        logger.info("Not caching a result computed while a model failed")
+        return
+    result_cache.set(key[0], result)
+
+def batch_results(endpoint, documents, process_slice, slice_size):
+    """Yield the results of a batch request as they become available
+
+    Invalid and cached documents are answered first; the others go through
+    `process_slice` (a generator of item results) `slice_size` documents at a
+    time, each annotated with its cache key.
+    """
+    pending = []
+    for document in documents:
+        if "error" in document:
+            yield batch_item_result(document, error=document["error"])
+            continue
+        document["cache_key"] = result_cache_key(endpoint, document["text"], {"language": document["language"]})
+        result = cached_result(document["cache_key"])
+        if result is not None:
+            yield batch_item_result(document, result)
+        else:
+            pending.append(document)
     
-    # Determine risk level
-    if high_risk_count > 0:
-        return "high"
-    elif medium_risk_count > low_risk_count:
-        return "medium"
-    else:
-        return "low"
+    slice_size = max(1, slice_size)
+    for start in range(0, len(pending), slice_size):
+        yield from process_slice(pending[start:start + slice_size])
+
+# Clients that accept NDJSON get one line per result as soon as it is ready
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_SLICE_DOCUMENTS = int(os.getenv('STREAM_SLICE_DOCUMENTS', '4'))
+
+def wants_ndjson():
+    """True when the client prefers a streamed NDJSON response"""
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_response(items):
+    """Stream items as newline-delimited JSON"""
+    def generate():
+        for item in items:
+            yield json.dumps(item) + "\n"
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+
+def batch_response(endpoint, documents, process_slice):
+    """Return batch results as one JSON document, or stream them as NDJSON"""
+    if wants_ndjson():
+        # Small slices keep memory flat and get the first results out early
+        return ndjson_response(batch_results(endpoint, documents, process_slice, STREAM_SLICE_DOCUMENTS))
+    
+    results = batch_results(endpoint, documents, process_slice, len(documents))
+    return jsonify({"results": sorted(results, key=lambda item: item["index"])})
 
-def classify_document_type(text):
+def context_spacy_docs(context):
+    """spaCy Docs of the document pieces, or None if no model serves its language"""
+    def parse(c):
+        nlp = get_spacy_model(context_language(c))
+        return spacy_pipe(nlp, [c.text])[0] if nlp is not None else None
+    return context.get("spacy_docs", parse)
+
+def combine_type_confidence(confidence, model_result):
+    """Combine rule-based and model-based classification"""
+    if model_result and model_result[0]['score'] > 0.7:
+        return (confidence + model_result[0]['score']) / 2
+    return confidence
+
+def classify_document_type(context):
     """Classify document type based on keyword presence"""
-    text_lower = text.lower()
-    
-    # Count occurrences of type-specific keywords
-    type_scores = {}
-    for doc_type, keywords in document_types.items():
-        type_scores[doc_type] = sum(1 for keyword in keywords if keyword.lower() in text_lower)
-    
-    # Find the document type with the highest score
-    max_score = 0
-    doc_type = "unknown"
-    for t, score in type_scores.items():
-        if score > max_score:
-            max_score = score
-            doc_type = t
-    
-    # If using transformers, enhance with model prediction
-    confidence = max_score / (sum(type_scores.values()) or 1)  # Avoid division by zero
-    
-    if "document_classifier" in transformers_models and len(text) < 512:
+    return context.get("classification", classify_document_context)
+
+@timed("classify_document_type")
+def classify_document_context(context):
+    """Keyword scores, refined by the transformer classifier"""
+    doc_type, confidence = score_document_type(context)
+    
+    # If using transformers, enhance with model prediction over the whole text
+    classifier = model_registry.get("document_classifier")
+    if classifier is not None:
         try:
-            # Use only the first part of the text to avoid token limits
-            model_result = transformers_models["document_classifier"](text[:512])
-            # Combine rule-based and model-based classification
-            if model_result[0]['score'] > 0.7:
-                confidence = (confidence + model_result[0]['score']) / 2
+            model_result = run_windowed_classifier("document_classifier", [context.text])[0]
+            confidence = combine_type_confidence(confidence, model_result)
         except Exception as e:
             logger.warning(f"Error using transformer for document classification: {e}")
+            record_model_fallback()
     
     return doc_type, confidence
 
-def extract_entities_with_spacy(text, language="en"):
-    """Extract named entities using spaCy"""
-    if language == "en" and nlp_en:
-        nlp = nlp_en
-    elif language == "ar" and nlp_ar:
-        nlp = nlp_ar
-    else:
-        return None
+@timed("classify_document_types")
+def classify_document_types(contexts):
+    """Classify several documents, scoring all their windows with one classifier batch"""
+    classifications = [score_document_type(context) for context in contexts]
     
-    # Process text with spaCy
-    doc = nlp(text)
+    if contexts and model_registry.get("document_classifier") is not None:
+        try:
+            model_results = run_windowed_classifier("document_classifier", [context.text for context in contexts])
+            for i, model_result in enumerate(model_results):
+                doc_type, confidence = classifications[i]
+                classifications[i] = (doc_type, combine_type_confidence(confidence, model_result))
+        except Exception as e:
+            logger.warning(f"Error using transformer for batch document classification: {e}")
+            record_model_fallback()
     
-    # Extract entities
-    entities = {
+    return classifications
+
+def empty_entities():
+    """Return an empty entity result"""
+    return {
         "people": [],
         "organizations": [],
         "locations": [],
         "dates": [],
         "monetary_values": []
     }
+
+def get_spacy_model(language):
+    """Return the spaCy model for a language, or None if unavailable"""
+    if language == "en":
+        return model_registry.get("spacy_en")
+    if language == "ar":
+        return model_registry.get("spacy_ar")
+    return None
+
+@timed("spacy_pipe", text_arg=1)
+def spacy_pipe(nlp, texts):
+    """Process texts with nlp.pipe, returning the Docs of each text's pieces
+
+    Texts longer than SPACY_MAX_CHARS (or the pipeline's max_length) are split
+    on whitespace; all pieces of all texts go through one nlp.pipe call.
+    """
+    max_chars = min(SPACY_MAX_CHARS, nlp.max_length)
+    pieces = [[piece for _, piece in split_text(text, max_chars)] for text in texts]
+    started = time.perf_counter()
+    docs = list(nlp.pipe(
+        [piece for text_pieces in pieces for piece in text_pieces],
+        batch_size=SPACY_BATCH_SIZE,
+        n_process=SPACY_N_PROCESS
+    ))
+    record_inference(model_registry.name_of(nlp), time.perf_counter() - started, len(docs))
+    docs = iter(docs)
+    return [[next(docs) for _ in text_pieces] for text_pieces in pieces]
+
+def collect_spacy_entities(docs):
+    """Group the entities of processed spaCy Docs by category"""
+    entities = empty_entities()
     
-    for ent in doc.ents:
+    for ent in (ent for doc in docs for ent in doc.ents):
         if ent.label_ in ["PERSON", "PER"]:
             entities["people"].append(ent.text)
         elif ent.label_ in ["ORG", "ORGANIZATION"]:
@@ -287,248 +587,325 @@ def extract_entities_with_spacy(text, language="en"):
     
     return entities
 
-def extract_entities_with_transformers(text):
-    """Extract named entities using transformers"""
-    if "ner_model" not in transformers_models:
+@timed("extract_entities_with_spacy")
+def extract_entities_with_spacy(context):
+    """Extract named entities using spaCy"""
+    docs = context_spacy_docs(context)
+    if docs is None:
         return None
     
-    try:
-        # Use transformer model for NER
-        ner_results = transformers_models["ner_model"](text)
-        
-        # Group entities by type
-        entities = {
-            "people": [],
-            "organizations": [],
-            "locations": [],
-            "dates": [],
-            "monetary_values": []
-        }
-        
-        current_entity = ""
-        current_type = ""
-        
-        for entity in ner_results:
-            # Map transformer entity types to our categories
-            entity_type = None
-            if entity["entity"].startswith("B-PER") or entity["entity"].startswith("I-PER"):
-                entity_type = "people"
-            elif entity["entity"].startswith("B-ORG") or entity["entity"].startswith("I-ORG"):
-                entity_type = "organizations"
-            elif entity["entity"].startswith("B-LOC") or entity["entity"].startswith("I-LOC"):
-                entity_type = "locations"
-            
+    return collect_spacy_entities(docs)
+
+@timed("extract_entities_with_spacy_batch")
+def extract_entities_with_spacy_batch(contexts, language="en"):
+    """Extract named entities from several documents of one language with nlp.pipe"""
+    nlp = get_spacy_model(language)
+    if nlp is None:
+        return [None] * len(contexts)
+    
+    entities = []
+    for context, docs in zip(contexts, spacy_pipe(nlp, [context.text for context in contexts])):
+        # Keep the Docs so later helpers on this document reuse them
+        entities.append(collect_spacy_entities(context.get("spacy_docs", lambda c: docs)))
+    return entities
+
+# Map transformer entity labels to our categories
+TRANSFORMER_ENTITY_TYPES = {"PER": "people", "ORG": "organizations", "LOC": "locations"}
+
+def group_transformer_entities(context, ner_results):
+    """Group NER pipeline output by entity category"""
+    entities = empty_entities()
+    
+    current_entity = ""
+    current_type = ""
+    
+    for entity in ner_results:
+        # Aggregated pipelines already merge sub-word tokens into entity groups
+        if "entity_group" in entity:
+            entity_type = TRANSFORMER_ENTITY_TYPES.get(entity["entity_group"])
             if entity_type:
-                if entity["entity"].startswith("B-"):
-                    # If we have a previous entity, add it to the list
-                    if current_entity and current_type:
-                        entities[current_type].append(current_entity.strip())
-                    # Start a new entity
-                    current_entity = entity["word"]
-                    current_type = entity_type
-                elif entity["entity"].startswith("I-") and current_type == entity_type:
-                    # Continue the current entity
-                    current_entity += " " + entity["word"]
-        
-        # Add the last entity if there is one
-        if current_entity and current_type:
-            entities[current_type].append(current_entity.strip())
+                entities[entity_type].append(entity["word"].strip())
+            continue
         
-        # Add dates and monetary values using regex
-        entities["dates"] = extract_dates(text)
-        entities["monetary_values"] = extract_monetary_values(text)
+        # Map transformer entity types to our categories
+        entity_type = None
+        if entity["entity"].startswith("B-PER") or entity["entity"].startswith("I-PER"):
+            entity_type = "people"
+        elif entity["entity"].startswith("B-ORG") or entity["entity"].startswith("I-ORG"):
+            entity_type = "organizations"
+        elif entity["entity"].startswith("B-LOC") or entity["entity"].startswith("I-LOC"):
+            entity_type = "locations"
         
-        # Remove duplicates
-        for key in entities:
-            entities[key] = list(set(entities[key]))
-        
-        return entities
+        if entity_type:
+            if entity["entity"].startswith("B-"):
+                # If we have a previous entity, add it to the list
+                if current_entity and current_type:
+                    entities[current_type].append(current_entity.strip())
+                # Start a new entity
+                current_entity = entity["word"]
+                current_type = entity_type
+            elif entity["entity"].startswith("I-") and current_type == entity_type:
+                # Continue the current entity
+                current_entity += " " + entity["word"]
+    
+    # Add the last entity if there is one
+    if current_entity and current_type:
+        entities[current_type].append(current_entity.strip())
+    
+    # Add dates and monetary values using regex
+    entities["dates"] = context_dates(context)
+    entities["monetary_values"] = context_monetary_values(context)
+    
+    # Remove duplicates
+    for key in entities:
+        entities[key] = list(set(entities[key]))
+    
+    return entities
+
+@timed("extract_entities_with_transformers")
+def extract_entities_with_transformers(context):
+    """Extract named entities using transformers"""
+    ner_model = model_registry.get("ner_model")
+    if ner_model is None:
+        return None
+    
+    try:
+        # Use transformer model for NER on every window of the text
+        _, window_results = run_windowed_pipeline("ner_model", [context.text])[0]
+        return group_transformer_entities(context, [entity for entities in window_results for entity in entities])
     
     except Exception as e:
         logger.error(f"Error extracting entities with transformers: {e}")
+        record_model_fallback()
         return None
 
-def analyze_contract_clauses(text):
-    """Analyze contract text to identify and assess clauses"""
-    # Split text into sentences
-    sentences = sent_tokenize(text)
-    
-    # Identify potential clauses
-    clauses = []
-    current_clause = ""
-    current_clause_type = ""
-    
-    for sentence in sentences:
-        # Check if sentence starts a new clause
-        new_clause_type = None
-        for clause_type, pattern in contract_patterns.items():
-            if re.search(pattern, sentence, re.IGNORECASE):
-                new_clause_type = clause_type
-                break
-        
-        if new_clause_type:
-            # If we have a previous clause, add it to the list
-            if current_clause and current_clause_type:
-                risk_level = assess_clause_risk(current_clause)
-                clauses.append({
-                    "type": current_clause_type,
-                    "text": current_clause.strip(),
-                    "risk_level": risk_level
-                })
-            
-            # Start a new clause
-            current_clause = sentence
-            current_clause_type = new_clause_type
-        elif current_clause_type:
-            # Continue the current clause
-            current_clause += " " + sentence
-    
-    # Add the last clause if there is one
-    if current_clause and current_clause_type:
-        risk_level = assess_clause_risk(current_clause)
-        clauses.append({
-            "type": current_clause_type,
-            "text": current_clause.strip(),
-            "risk_level": risk_level
-        })
+@timed("extract_entities_with_transformers_batch")
+def extract_entities_with_transformers_batch(contexts):
+    """Extract named entities from several documents with one NER batch"""
+    if model_registry.get("ner_model") is None:
+        return [None] * len(contexts)
+    
+    try:
+        ner_batches = run_windowed_pipeline("ner_model", [context.text for context in contexts])
+    except Exception as e:
+        logger.error(f"Error extracting entities with transformers in batch: {e}")
+        record_model_fallback()
+        return [None] * len(contexts)
+    
+    return [
+        group_transformer_entities(context, [entity for entities in window_results for entity in entities])
+        for context, (_, window_results) in zip(contexts, ner_batches)
+    ]
+
+def merge_entities(context, entities_transformers, entities_spacy):
+    """Merge entity results, preferring transformer results when available"""
+    if entities_transformers and entities_spacy:
+        return {
+            key: list(set(entities_transformers.get(key, []) + entities_spacy.get(key, [])))
+            for key in ["people", "organizations", "locations", "dates", "monetary_values"]
+        }
+    elif entities_transformers:
+        return entities_transformers
+    elif entities_spacy:
+        return entities_spacy
     
-    return clauses
+    # Fallback to regex-based extraction
+    entities = empty_entities()
+    entities["dates"] = context_dates(context)
+    entities["monetary_values"] = context_monetary_values(context)
+    return entities
 
-def extract_contract_metadata(text):
+@timed("extract_contract_metadata")
+def extract_contract_metadata(context, classification=None):
     """Extract metadata from contract text"""
     metadata = {}
     
-    # Extract contract type
-    doc_type, confidence = classify_document_type(text)
+    # Extract contract type, unless it was already classified in a batch
+    doc_type, confidence = classification or classify_document_type(context)
     metadata["contract_type"] = doc_type
     metadata["type_confidence"] = confidence
     
-    # Extract dates
-    effective_date_match = re.search(contract_patterns["effective_date"], text, re.IGNORECASE)
-    if effective_date_match:
-        metadata["effective_date"] = effective_date_match.group(1)
+    # Extract dates, payment terms, governing law and parties in one scan
+    fields = context_contract_fields(context)
+    
+    if fields["effective_date"]:
+        metadata["effective_date"] = fields["effective_date"]
     
-    termination_date_match = re.search(contract_patterns["termination_date"], text, re.IGNORECASE)
-    if termination_date_match:
-        metadata["termination_date"] = termination_date_match.group(1)
+    if fields["termination_date"]:
+        metadata["termination_date"] = fields["termination_date"]
     
-    # Extract payment terms
-    payment_terms_match = re.search(contract_patterns["payment_terms"], text, re.IGNORECASE)
-    if payment_terms_match:
-        metadata["payment_terms"] = payment_terms_match.group(1).strip()
+    if fields["payment_terms"]:
+        metadata["payment_terms"] = fields["payment_terms"].strip()
     
-    # Extract governing law
-    governing_law_match = re.search(contract_patterns["governing_law"], text, re.IGNORECASE)
-    if governing_law_match:
-        metadata["governing_law"] = governing_law_match.group(1).strip()
+    if fields["governing_law"]:
+        metadata["governing_law"] = fields["governing_law"].strip()
     
     # Extract parties
-    parties = []
-    party_matches = re.finditer(contract_patterns["parties"], text, re.IGNORECASE)
-    for match in party_matches:
-        parties.append(match.group(1).strip())
+    parties = [party.strip() for party in fields["parties"]]
     
     if parties:
         metadata["parties"] = list(set(parties))
     
     return metadata
 
-def calculate_contract_risk_score(clauses):
-    """Calculate overall risk score based on clause risk levels"""
-    if not clauses:
-        return 0.0
-    
-    # Assign weights to risk levels
-    risk_weights = {"high": 1.0, "medium": 0.5, "low": 0.1}
+def extractive_summary(context):
+    """Simple extractive summarization from the leading sentences"""
+    sentences = context_sentences(context)
+    if len(sentences) <= 3:
+        return " ".join(sentences)
     
-    # Calculate weighted risk score
-    total_weight = 0
-    risk_sum = 0
-    
-    for clause in clauses:
-        risk_level = clause.get("risk_level", "low")
-        risk_sum += risk_weights.get(risk_level, 0.1)
-        total_weight += 1
+    return " ".join(sentences[:3])
+
+# Long documents are summarized per chunk, then the chunk summaries are summarized;
+# SUMMARY_MAX_CHUNKS caps the summarizer calls spent on one document
+SUMMARY_CHUNK_TOKENS = int(os.getenv('SUMMARY_CHUNK_TOKENS', '900'))
+SUMMARY_MAX_CHUNKS = int(os.getenv('SUMMARY_MAX_CHUNKS', '16'))
+SUMMARY_BATCH_SIZE = int(os.getenv('SUMMARY_BATCH_SIZE', '4'))
+SUMMARY_PARALLEL_BATCHES = int(os.getenv('SUMMARY_PARALLEL_BATCHES', '1'))
+
+def run_summarizer(summarizer, texts, max_length, memo=None):
+    """Summarize texts in batches of SUMMARY_BATCH_SIZE, optionally in parallel
+
+    Texts already summarized in `memo` (a SummaryMemo) are not summarized again.
+    """
+    if memo is not None:
+        summaries = [memo.get(text, max_length) for text in texts]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if missing:
+            for i, summary in zip(missing, run_summarizer(summarizer, [texts[i] for i in missing], max_length)):
+                summaries[i] = summary
+                memo.put(texts[i], max_length, summary)
+        return summaries
+    
+    def summarize_batch(batch):
+        started = time.perf_counter()
+        summaries = summarizer(
+            batch,
+            max_length=max_length,
+            min_length=min(30, max_length),
+            do_sample=False,
+            truncation=True,
+            batch_size=len(batch)
+        )
+        record_inference("summarizer", time.perf_counter() - started, len(batch))
+        return [summary['summary_text'] for summary in summaries]
     
-    # Normalize to 0-1 range
-    if total_weight > 0:
-        normalized_score = risk_sum / (total_weight * 1.0)
+    batches = [texts[i:i + SUMMARY_BATCH_SIZE] for i in range(0, len(texts), SUMMARY_BATCH_SIZE)]
+    if SUMMARY_PARALLEL_BATCHES > 1 and len(batches) > 1:
+        with ThreadPoolExecutor(max_workers=min(SUMMARY_PARALLEL_BATCHES, len(batches))) as executor:
+            results = list(executor.map(summarize_batch, batches))
     else:
-        normalized_score = 0.0
+        results = [summarize_batch(batch) for batch in batches]
     
-    return round(normalized_score, 2)
+    return [summary for batch in results for summary in batch]
 
-def summarize_text(text, max_length=150):
-    """Generate a summary of the text"""
-    if "summarizer" not in transformers_models:
-        # Fallback to extractive summarization
-        sentences = sent_tokenize(text)
-        if len(sentences) <= 3:
-            return " ".join(sentences)
+def summary_chunks(summarizer, text, sentences=None):
+    """Split text into sentence-aligned chunks that fit the summarizer window"""
+    tokenizer = getattr(summarizer, "tokenizer", None)
+    if sentences is None:
+        sentences = split_sentences(text)
+    max_tokens = min(SUMMARY_CHUNK_TOKENS, model_max_tokens(tokenizer, SUMMARY_CHUNK_TOKENS))
+    return [chunk for chunk, _ in chunk_sentences(sentences, tokenizer, max_tokens)]
+
+def context_summary_chunks(context, summarizer):
+    """Summarizer-sized chunks of the document, tokenized once"""
+    return context.get("summary_chunks", lambda c: summary_chunks(summarizer, c.text, context_sentences(c)))
+
+@timed("map_reduce_summary", text_arg=1)
+def map_reduce_summary(summarizer, text, max_length, chunks=None, memo=None):
+    """Summarize chunks of a long document, then summarize the summaries"""
+    for step in map_reduce_summary_steps(summarizer, text, max_length, chunks, memo):
+        pass
+    return step["summary"]
+
+def map_reduce_summary_steps(summarizer, text, max_length, chunks=None, memo=None):
+    """Map-reduce summarization that reports each chunk summary as it is produced
+
+    Yields {"type": "chunk", "index", "chunks", "summary"} for the chunks of
+    the document, then {"type": "summary", "summary"} with the final summary.
+    """
+    texts = chunks if chunks is not None else summary_chunks(summarizer, text)
+    if len(texts) <= 1:
+        yield {"type": "summary", "summary": run_summarizer(summarizer, [text], max_length, memo)[0]}
+        return
+    
+    calls = 0
+    first_level = True
+    while len(texts) > 1:
+        # Keep one call in reserve for the final summary
+        remaining = SUMMARY_MAX_CHUNKS - calls - 1
+        if remaining < 2:
+            # Out of budget: the final call sees the truncated concatenation
+            texts = [" ".join(texts)]
+            break
+        if len(texts) > remaining:
+            logger.info(f"Summarizing {remaining} of {len(texts)} chunks to stay within the compute budget")
+            texts = select_evenly(texts, remaining)
         
-        # Simple extractive summarization
-        return " ".join(sentences[:3])
+        if first_level:
+            # Summarize the document chunks in rounds so progress can be reported
+            partial_summaries = []
+            round_size = SUMMARY_BATCH_SIZE * max(1, SUMMARY_PARALLEL_BATCHES)
+            for start in range(0, len(texts), round_size):
+                for summary in run_summarizer(summarizer, texts[start:start + round_size], max_length, memo):
+                    yield {"type": "chunk", "index": len(partial_summaries), "chunks": len(texts), "summary": summary}
+                    partial_summaries.append(summary)
+            first_level = False
+        else:
+            partial_summaries = run_summarizer(summarizer, texts, max_length, memo)
+        calls += len(texts)
+        texts = summary_chunks(summarizer, " ".join(partial_summaries))
+    
+    yield {"type": "summary", "summary": run_summarizer(summarizer, texts, max_length, memo)[0]}
+
+@timed("summarize_text")
+def summarize_text(context, max_length=150, memo=None):
+    """Generate a summary of the text, reusing the chunk summaries in `memo`"""
+    summarizer = model_registry.get("summarizer")
+    if summarizer is None:
+        # Fallback to extractive summarization
+        return extractive_summary(context)
     
     try:
-        # Use transformer model for summarization
-        # Limit input length to avoid token limits
-        max_input_length = 1024
-        if len(text) > max_input_length:
-            text = text[:max_input_length]
-        
-        summary = transformers_models["summarizer"](
-            text, 
-            max_length=max_length, 
-            min_length=30, 
-            do_sample=False
-        )
-        
-        return summary[0]['summary_text']
+        # Use transformer model for summarization over model-sized chunks
+        return map_reduce_summary(summarizer, context.text, max_length, context_summary_chunks(context, summarizer), memo)
     
     except Exception as e:
         logger.error(f"Error summarizing text with transformers: {e}")
+        record_model_fallback()
         # Fallback to extractive summarization
-        sentences = sent_tokenize(text)
-        if len(sentences) <= 3:
-            return " ".join(sentences)
-        
-        return " ".join(sentences[:3])
-
-# API Endpoints
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        "status": "healthy", 
-        "models_loaded": {
-            "spacy": {"en": nlp_en is not None, "ar": nlp_ar is not None},
-            "transformers": list(transformers_models.keys())
-        }
-    })
+        return extractive_summary(context)
 
-@app.route('/api/analyze-contract', methods=['POST'])
-def analyze_contract():
-    """Analyze contract text and extract key information"""
-    if not request.json or 'text' not in request.json:
-        return jsonify({"error": "Missing contract text"}), 400
+@timed("summarize_texts")
+def summarize_texts(contexts, max_length=150):
+    """Generate summaries for several documents, batching those that fit one window"""
+    summarizer = model_registry.get("summarizer")
+    if summarizer is None:
+        return [extractive_summary(context) for context in contexts]
     
-    contract_text = request.json['text']
-    language = request.json.get('language', detect_language(contract_text))
-    
-    # Extract contract metadata
-    metadata = extract_contract_metadata(contract_text)
-    
-    # Analyze contract clauses
-    clauses = analyze_contract_clauses(contract_text)
-    
-    # Calculate risk score
-    risk_score = calculate_contract_risk_score(clauses)
-    
-    # Generate summary
-    summary = summarize_text(contract_text)
+    try:
+        chunks = [context_summary_chunks(context, summarizer) for context in contexts]
+        short_indexes = [i for i, text_chunks in enumerate(chunks) if len(text_chunks) <= 1]
+        summaries = [None] * len(contexts)
+        short_texts = [contexts[i].text for i in short_indexes]
+        for i, summary in zip(short_indexes, run_summarizer(summarizer, short_texts, max_length)):
+            summaries[i] = summary
+        
+        # Long documents go through map-reduce summarization one by one
+        for i, summary in enumerate(summaries):
+            if summary is None:
+                summaries[i] = map_reduce_summary(summarizer, contexts[i].text, max_length, chunks[i])
+        return summaries
     
-    # Prepare response
-    analysis_result = {
+    except Exception as e:
+        logger.error(f"Error summarizing texts with transformers in batch: {e}")
+        return [summarize_text(context, max_length) for context in contexts]
+
+def build_contract_analysis(metadata, clauses, summary, language, risk_score=None):
+    """Assemble the contract analysis response"""
+    if risk_score is None:
+        risk_score = calculate_contract_risk_score(clauses)
+    return {
         "contract_type": metadata.get("contract_type", "Unknown"),
         "type_confidence": metadata.get("type_confidence", 0.0),
         "parties": metadata.get("parties", []),
@@ -543,9 +920,768 @@ def analyze_contract():
         "clauses": clauses,
         "language": language
     }
+
+# Independent contract analysis stages run concurrently on a bounded pool; a
+# summary that misses its deadline is replaced by the extractive summary
+ANALYSIS_STAGE_WORKERS = int(os.getenv('ANALYSIS_STAGE_WORKERS', '4'))
+STAGE_TIMEOUT = float(os.getenv('STAGE_TIMEOUT', '60'))
+SUMMARY_STAGE_TIMEOUT = float(os.getenv('SUMMARY_STAGE_TIMEOUT', '20'))
+# Summaries run on their own pool: one that missed its deadline keeps running
+# there, and at most this many can, instead of delaying the required stages
+OPTIONAL_STAGE_WORKERS = int(os.getenv('OPTIONAL_STAGE_WORKERS', '2'))
+
+stage_executor = None
+stage_executor_pid = None
+optional_stage_executor = None
+optional_stage_executor_pid = None
+stage_executor_lock = threading.Lock()
+
+def get_stage_executor():
+    """Thread pool for analysis stages, created per process; None runs stages inline"""
+    global stage_executor, stage_executor_pid
+    if ANALYSIS_STAGE_WORKERS <= 1:
+        return None
+    with stage_executor_lock:
+        # Worker threads do not survive a fork
+        if stage_executor is None or stage_executor_pid != os.getpid():
+            stage_executor = ThreadPoolExecutor(max_workers=ANALYSIS_STAGE_WORKERS, thread_name_prefix="analysis-stage")
+            stage_executor_pid = os.getpid()
+        return stage_executor
+
+def get_optional_stage_executor():
+    """Thread pool for optional analysis stages, created per process; None shares the stage pool"""
+    global optional_stage_executor, optional_stage_executor_pid
+    if ANALYSIS_STAGE_WORKERS <= 1 or OPTIONAL_STAGE_WORKERS <= 0:
+        return None
+    with stage_executor_lock:
+        if optional_stage_executor is None or optional_stage_executor_pid != os.getpid():
+            optional_stage_executor = ThreadPoolExecutor(
+                max_workers=OPTIONAL_STAGE_WORKERS, thread_name_prefix="optional-stage"
+            )
+            optional_stage_executor_pid = os.getpid()
+        return optional_stage_executor
+
+# The rule-based stages (clause patterns, field extraction, sentence splitting)
+# hold the GIL, so for large documents they run in a pool of worker processes;
+# "auto" divides the CPUs between the WEB_CONCURRENCY web workers, 0 disables it
+RULE_PROCESS_WORKERS = os.getenv('RULE_PROCESS_WORKERS', '0')
+# Smaller documents are analyzed inline, where sending them would cost more than it saves
+RULE_PROCESS_MIN_CHARS = int(os.getenv('RULE_PROCESS_MIN_CHARS', '20000'))
+
+rule_process_pool = None
+rule_process_pool_pid = None
+rule_process_pool_lock = threading.Lock()
+
+def rule_process_count():
+    """Number of rule worker processes per web worker"""
+    if RULE_PROCESS_WORKERS == 'auto':
+        return max(1, (os.cpu_count() or 1) // max(1, int(os.getenv('WEB_CONCURRENCY', '1'))))
+    return int(RULE_PROCESS_WORKERS)
+
+def get_rule_process_pool():
+    """Process pool for the rule stages, created per process; None analyzes inline"""
+    global rule_process_pool, rule_process_pool_pid
+    workers = rule_process_count()
+    if workers <= 0:
+        return None
+    with rule_process_pool_lock:
+        if rule_process_pool is None or rule_process_pool_pid != os.getpid():
+            # Spawned workers import only contract_rules, not this module and its models
+            rule_process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            rule_process_pool_pid = os.getpid()
+        return rule_process_pool
+
+def reset_rule_process_pool():
+    """Drop a broken pool so the next call starts a new one"""
+    global rule_process_pool
+    with rule_process_pool_lock:
+        pool, rule_process_pool = rule_process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False)
+
+def submit_rule_analysis(contexts):
+    """Start the rule stages of large documents in the process pool
+
+    Returns (context, future) pairs for collect_rule_analysis; documents left
+    out are analyzed inline when their rule values are first needed.
+    """
+    pool = get_rule_process_pool()
+    if pool is None:
+        return []
+    pending = []
+    try:
+        for context in contexts:
+            if len(context.text) >= RULE_PROCESS_MIN_CHARS:
+                pending.append((context, pool.submit(rule_analysis, context.text)))
+    except BrokenProcessPool as e:
+        logger.error(f"Rule process pool is broken, analyzing inline: {e}")
+        reset_rule_process_pool()
+    return pending
+
+def collect_rule_analysis(pending):
+    """Store the rule values computed by the process pool on their document contexts"""
+    for context, future in pending:
+        try:
+            context.seed(future.result())
+        except BrokenProcessPool as e:
+            logger.error(f"Rule process pool is broken, analyzing inline: {e}")
+            reset_rule_process_pool()
+        except Exception as e:
+            logger.warning(f"Error in rule worker process, analyzing inline: {e}")
+
+def contract_analysis_stages(context, summary_timeout=SUMMARY_STAGE_TIMEOUT, summary_memo=None):
+    """Stage graph of a single contract analysis"""
+    return [
+        Stage("rules", lambda: collect_rule_analysis(submit_rule_analysis([context])), timeout=STAGE_TIMEOUT),
+        Stage("metadata", lambda _: extract_contract_metadata(context), depends_on=["rules"], timeout=STAGE_TIMEOUT),
+        Stage("clauses", lambda _: analyze_contract_clauses(context), depends_on=["rules"], timeout=STAGE_TIMEOUT),
+        Stage("risk_score", calculate_contract_risk_score, depends_on=["clauses"], timeout=STAGE_TIMEOUT),
+        Stage("summary", lambda: summarize_text(context, memo=summary_memo), timeout=summary_timeout, optional=True)
+    ]
+
+# Fingerprints of analyzed contracts, per worker: a contract close to an earlier
+# one (typically an edit of the same template) reuses its chunk summaries and
+# reports the clauses that differ from it. The earlier contract may belong to
+# another client, so the report names clauses by type and index only, never
+# by text or document id
+FINGERPRINT_ENABLED = os.getenv('FINGERPRINT_ENABLED', 'true').lower() == 'true'
+
+fingerprint_store = FingerprintStore(
+    max_documents=int(os.getenv('FINGERPRINT_MAX_DOCUMENTS', '1000')),
+    min_similarity=float(os.getenv('FINGERPRINT_MIN_SIMILARITY', '0.6'))
+)
+
+def template_report(template, similarity, clauses, memo):
+    """Differences between a contract and the closest earlier one"""
+    return dict(
+        similarity=round(similarity, 3),
+        reused_summaries=memo.reused,
+        **diff_clauses(clause_fingerprints(clauses), template["clauses"])
+    )
+
+def analyze_contract_document(text, language=None, summary_timeout=SUMMARY_STAGE_TIMEOUT):
+    """Analyze one contract, using the result cache and the closest earlier contract
+
+    Raises StageError when a required analysis stage fails.
+    """
+    context = DocumentContext(text, language)
+    language = context_language(context)
+    
+    cache_key = result_cache_key("analyze-contract", text, {"language": language})
+    analysis_result = cached_result(cache_key)
+    if analysis_result is not None:
+        return analysis_result
+    
+    signature = minhash_signature(text) if FINGERPRINT_ENABLED else None
+    closest = fingerprint_store.closest(text, signature) if FINGERPRINT_ENABLED else None
+    summary_memo = SummaryMemo(closest[1]["summaries"] if closest else None)
+    
+    # Metadata, clauses and summary run concurrently; the risk score waits for the clauses
+    stages = run_stages(
+        contract_analysis_stages(context, summary_timeout, summary_memo), get_stage_executor(), get_optional_stage_executor()
+    )
+    for stage, seconds in stages.durations.items():
+        stage_seconds.labels(stage).observe(seconds)
+    
+    summary = stages.get("summary")
+    if summary is None:
+        summary = extractive_summary(context)
+    
+    analysis_result = build_contract_analysis(
+        stages.get("metadata"), stages.get("clauses"), summary, language, stages.get("risk_score")
+    )
+    if closest is not None:
+        analysis_result["template"] = template_report(closest[1], closest[2], stages.get("clauses"), summary_memo)
+    if stages.partial:
+        # Incomplete results are returned but not cached
+        analysis_result["partial"] = True
+        analysis_result["incomplete_stages"] = sorted(stages.failed)
+    else:
+        store_result(cache_key, analysis_result)
+        if FINGERPRINT_ENABLED:
+            fingerprint_store.add(text, stages.get("clauses"), summary_memo.used, signature)
+    
+    return analysis_result
+
+def classify_document_text(text, language=None):
+    """Classify and summarize one document, using the result cache"""
+    context = DocumentContext(text, language)
+    language = context_language(context)
+    
+    cache_key = result_cache_key("classify-document", text, {"language": language})
+    classification = cached_result(cache_key)
+    if classification is not None:
+        return classification
+    
+    # Classify document type
+    doc_type, confidence = classify_document_type(context)
+    
+    # Generate summary
+    summary = summarize_text(context)
+    
+    classification = {
+        "document_type": doc_type,
+        "confidence": confidence,
+        "language": language,
+        "summary": summary
+    }
+    store_result(cache_key, classification)
+    return classification
+
+def summarize_document_text(text, max_length=150):
+    """Summarize one document, using the result cache"""
+    cache_key = result_cache_key("summarize", text, {"max_length": max_length})
+    result = cached_result(cache_key)
+    if result is not None:
+        return result
+    
+    result = {"summary": summarize_text(DocumentContext(text), max_length)}
+    store_result(cache_key, result)
+    return result
+
+def summarize_document_steps(text, max_length=150):
+    """Summarize one document, yielding chunk summaries before the final summary"""
+    cache_key = result_cache_key("summarize", text, {"max_length": max_length})
+    result = cached_result(cache_key)
+    if result is not None:
+        yield dict(result, type="summary")
+        return
+    
+    context = DocumentContext(text)
+    summarizer = model_registry.get("summarizer")
+    if summarizer is None:
+        summary = extractive_summary(context)
+    else:
+        try:
+            for step in map_reduce_summary_steps(summarizer, text, max_length, context_summary_chunks(context, summarizer)):
+                if step["type"] == "chunk":
+                    yield step
+            summary = step["summary"]
+        except Exception as e:
+            logger.error(f"Error summarizing text with transformers: {e}")
+            record_model_fallback()
+            summary = extractive_summary(context)
+    
+    store_result(cache_key, {"summary": summary})
+    yield {"type": "summary", "summary": summary}
+
+# Maximum number of documents accepted by the batch endpoints
+MAX_BATCH_DOCUMENTS = int(os.getenv('MAX_BATCH_DOCUMENTS', '100'))
+
+def parse_batch_documents(payload):
+    """Validate a batch request and normalize its documents
+
+    Accepts {"documents": [...]} where each document is either a string or an
+    object with "text" and optional "id" and "language". Returns the list of
+    documents and an error message; invalid entries are kept with an "error"
+    so they are reported per item instead of failing the batch.
+    """
+    if not payload or not isinstance(payload.get('documents'), list):
+        return None, "Missing documents list"
+    if not payload['documents']:
+        return None, "Empty documents list"
+    if len(payload['documents']) > MAX_BATCH_DOCUMENTS:
+        return None, f"Too many documents (maximum {MAX_BATCH_DOCUMENTS})"
+    
+    documents = []
+    for index, item in enumerate(payload['documents']):
+        if isinstance(item, str):
+            item = {"text": item}
+        if not isinstance(item, dict) or not isinstance(item.get('text'), str):
+            documents.append({"index": index, "id": None, "error": "Missing document text"})
+            continue
+        documents.append({
+            "index": index,
+            "id": item.get('id'),
+            "text": item['text'],
+            "language": item.get('language') or detect_language(item['text'])
+        })
+    return documents, None
+
+def batch_item_result(document, result=None, error=None):
+    """Wrap one document result of a batch response"""
+    item = {"index": document["index"]}
+    if document.get("id") is not None:
+        item["id"] = document["id"]
+    if error is not None:
+        item["error"] = error
+    else:
+        item.update(result)
+    return item
+
+def analyze_contract_slice(documents):
+    """Analyze batch documents with batched model calls, yielding item results"""
+    contexts = [DocumentContext(document["text"], document["language"]) for document in documents]
+    # Rule stages of large documents run in worker processes while the summarizer runs here
+    pending_rules = submit_rule_analysis(contexts)
+    summaries = summarize_texts(contexts)
+    collect_rule_analysis(pending_rules)
+    classifications = classify_document_types(contexts)
+    
+    for document, context, classification, summary in zip(documents, contexts, classifications, summaries):
+        try:
+            metadata = extract_contract_metadata(context, classification)
+            clauses = analyze_contract_clauses(context)
+            analysis_result = build_contract_analysis(metadata, clauses, summary, document["language"])
+            store_result(document["cache_key"], analysis_result)
+            yield batch_item_result(document, analysis_result)
+        except Exception as e:
+            logger.error(f"Error analyzing contract {document['index']} in batch: {e}")
+            yield batch_item_result(document, error=f"Failed to analyze contract: {str(e)}")
+
+def extract_entities_slice(documents):
+    """Extract entities from batch documents with batched model calls, yielding item results"""
+    contexts = [DocumentContext(document["text"], document["language"]) for document in documents]
+    
+    # One NER batch for the whole slice
+    entities_transformers = extract_entities_with_transformers_batch(contexts)
+    
+    # One spaCy pipe per language
+    entities_spacy = [None] * len(documents)
+    for language in set(document["language"] for document in documents):
+        positions = [i for i, document in enumerate(documents) if document["language"] == language]
+        try:
+            language_entities = extract_entities_with_spacy_batch([contexts[i] for i in positions], language)
+        except Exception as e:
+            logger.error(f"Error extracting entities with spaCy in batch: {e}")
+            record_model_fallback()
+            continue
+        for i, entities in zip(positions, language_entities):
+            entities_spacy[i] = entities
+    
+    for document, context, transformer_result, spacy_result in zip(documents, contexts, entities_transformers, entities_spacy):
+        try:
+            entities = merge_entities(context, transformer_result, spacy_result)
+            entities["language"] = document["language"]
+            store_result(document["cache_key"], entities)
+            yield batch_item_result(document, entities)
+        except Exception as e:
+            logger.error(f"Error extracting entities for document {document['index']} in batch: {e}")
+            yield batch_item_result(document, error=f"Failed to extract entities: {str(e)}")
+
+def classify_document_slice(documents):
+    """Classify batch documents with batched model calls, yielding item results"""
+    contexts = [DocumentContext(document["text"], document["language"]) for document in documents]
+    # When a batched call fails, each document is retried on its own so only the failing ones report an error
+    try:
+        classifications = classify_document_types(contexts)
+    except Exception as e:
+        logger.error(f"Error classifying documents in batch: {e}")
+        classifications = [None] * len(contexts)
+    try:
+        summaries = summarize_texts(contexts)
+    except Exception as e:
+        logger.error(f"Error summarizing documents in batch: {e}")
+        summaries = [None] * len(contexts)
+    
+    for document, context, classification, summary in zip(documents, contexts, classifications, summaries):
+        try:
+            doc_type, confidence = classification or classify_document_type(context)
+            if summary is None:
+                summary = summarize_text(context)
+            classification = {
+                "document_type": doc_type,
+                "confidence": confidence,
+                "language": document["language"],
+                "summary": summary
+            }
+            store_result(document["cache_key"], classification)
+            yield batch_item_result(document, classification)
+        except Exception as e:
+            logger.error(f"Error classifying document {document['index']} in batch: {e}")
+            yield batch_item_result(document, error=f"Failed to classify document: {str(e)}")
+
+# Question answering reads the QA_TOP_K passages that best match the question
+QA_PASSAGE_WORDS = int(os.getenv('QA_PASSAGE_WORDS', '120'))
+QA_PASSAGE_STRIDE = int(os.getenv('QA_PASSAGE_STRIDE', '60'))
+QA_TOP_K = int(os.getenv('QA_TOP_K', '4'))
+MAX_QA_QUESTIONS = int(os.getenv('MAX_QA_QUESTIONS', '50'))
+
+# Passage indexes of recently queried documents
+passage_index_cache = PassageIndexCache(max_entries=int(os.getenv('QA_INDEX_CACHE_SIZE', '32')))
+
+@timed("answer_from_passages", text_arg=2)
+def answer_from_passages(qa_model, index, questions):
+    """Run the QA model on the top-ranked passages of each question
+
+    All question-passage pairs go through the model in one batch. Returns the
+    best span per question (None if the document has no passages), with
+    offsets that refer to the full document text.
+    """
+    pairs = [(question_index, passage)
+             for question_index, question in enumerate(questions)
+             for passage in index.rank(question, QA_TOP_K)]
+    if not pairs:
+        return [None] * len(questions)
+    
+    started = time.perf_counter()
+    answers = qa_model(
+        question=[questions[question_index] for question_index, _ in pairs],
+        context=[index.passages[passage] for _, passage in pairs],
+        batch_size=len(pairs)
+    )
+    record_inference("qa_model", time.perf_counter() - started, len(pairs))
+    if isinstance(answers, dict):
+        answers = [answers]
+    
+    best = [None] * len(questions)
+    for (question_index, passage), answer in zip(pairs, answers):
+        if best[question_index] is None or answer['score'] > best[question_index]['score']:
+            passage_start = index.spans[passage][0]
+            best[question_index] = {
+                "answer": answer['answer'],
+                "score": answer['score'],
+                "start": passage_start + answer['start'],
+                "end": passage_start + answer['end']
+            }
+    return best
+
+# Long analyses can be submitted as jobs; the SQLite queue survives restarts and
+# is shared by all workers on the host, each running up to JOB_WORKERS jobs
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', os.path.join(tempfile.gettempdir(), 'ml-service-jobs.db'))
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+# The queue is local to a host, so with several replicas behind one service a
+# job id names the replica that owns it (JOB_OWNER, e.g. the pod name) and the
+# other replicas relay its requests to <owner>.<JOB_PEER_DOMAIN>:<JOB_PEER_PORT>
+JOB_OWNER = os.getenv('JOB_OWNER', '')
+JOB_PEER_DOMAIN = os.getenv('JOB_PEER_DOMAIN', '')
+JOB_PEER_PORT = int(os.getenv('JOB_PEER_PORT', '5000'))
+JOB_FORWARD_TIMEOUT = float(os.getenv('JOB_FORWARD_TIMEOUT', '10'))
+JOB_OWNER_PATTERN = re.compile(r'^[a-z0-9]([a-z0-9-]{0,61}[a-z0-9])?$')
+
+# Jobs have no caller waiting, so the summary gets the full stage deadline
+JOB_HANDLERS = {
+    "analyze-contract": lambda payload: analyze_contract_document(
+        payload["text"], payload.get("language"), summary_timeout=STAGE_TIMEOUT
+    ),
+    "classify-document": lambda payload: classify_document_text(payload["text"], payload.get("language")),
+    "summarize": lambda payload: summarize_document_text(payload["text"], payload.get("max_length", 150))
+}
+
+job_queue = JobQueue(
+    JOB_QUEUE_DB,
+    JOB_HANDLERS,
+    workers=JOB_WORKERS,
+    max_queued=int(os.getenv('JOB_MAX_QUEUED', '1000')),
+    result_ttl=int(os.getenv('JOB_RESULT_TTL', '86400')),
+    # Running jobs are requeued once their worker's heartbeat is this old
+    stale_after=int(os.getenv('JOB_STALE_AFTER', '300')),
+    heartbeat_interval=int(os.getenv('JOB_HEARTBEAT_INTERVAL', '30')),
+    id_prefix=f"{JOB_OWNER}." if JOB_OWNER and JOB_PEER_DOMAIN else ""
+)
+
+def job_owner(job_id):
+    """Replica named in a job id, or None when the id has no valid owner"""
+    owner, separator, _ = job_id.rpartition(".")
+    return owner if separator and JOB_OWNER_PATTERN.match(owner) else None
+
+def forward_job_request(job_id):
+    """Relay a request for a job owned by another replica; None to handle it here"""
+    owner = job_owner(job_id)
+    if not JOB_PEER_DOMAIN or owner is None or owner == JOB_OWNER or request.headers.get('X-Job-Forwarded'):
+        return None
+    
+    url = f"http://{owner}.{JOB_PEER_DOMAIN}:{JOB_PEER_PORT}{request.full_path.rstrip('?')}"
+    forwarded = urllib.request.Request(url, method=request.method, headers={'X-Job-Forwarded': '1'})
+    try:
+        with urllib.request.urlopen(forwarded, timeout=JOB_FORWARD_TIMEOUT) as response:
+            return Response(response.read(), status=response.status, mimetype=response.headers.get_content_type())
+    except urllib.error.HTTPError as e:
+        return Response(e.read(), status=e.code, mimetype=e.headers.get_content_type())
+    except (urllib.error.URLError, OSError) as e:
+        logger.error(f"Error forwarding job request to {owner}: {e}")
+        return jsonify({"error": f"Replica {owner} holding the job is unreachable"}), 503
+
+# A short input run through each loaded model once a server worker starts, so the
+# first request does not pay for lazy initialization and buffer allocation
+WARM_UP_TEXT = "This Agreement is made between Acme Corporation and Legal Services LLC and is governed by the laws of Riyadh."
+WARM_UP_QUESTION = "Which law governs the agreement?"
+
+def warm_up_model(name, model):
+    """Run the warm-up input through one model"""
+    if name.startswith("spacy_"):
+        list(model.pipe([WARM_UP_TEXT]))
+    elif name == "qa_model":
+        model(question=WARM_UP_QUESTION, context=WARM_UP_TEXT)
+    elif name == "summarizer":
+        model(WARM_UP_TEXT, max_length=20, min_length=5, do_sample=False, truncation=True)
+    else:
+        model(WARM_UP_TEXT)
+
+# Models that must be loaded and warmed up before the readiness probe passes
+def required_models():
+    """Models that must be loaded and warmed up before the service is ready"""
+    if READY_MODELS == ['all']:
+        return list(SPACY_PACKAGES) + list(TRANSFORMER_MODELS)
+    return list(READY_MODELS)
+
+# Warm-up results of this process: seconds per warmed model, error per failed one
+warmed_models = {}
+warm_up_errors = {}
+warm_up_lock = threading.Lock()
+warm_up_pid = None
+
+def warm_up_models(names=None):
+    """Load and warm up models (default: the required, per-worker and loaded ones); returns the seconds per model"""
+    if names is None:
+        names = list(dict.fromkeys(required_models() + per_worker_models + model_registry.loaded()))
+    timings = {}
+    for name in names:
+        model = model_registry.get(name)
+        if model is None:
+            warm_up_errors[name] = "Model could not be loaded"
+            continue
+        started = time.perf_counter()
+        try:
+            warm_up_model(name, model)
+        except Exception as e:
+            logger.warning(f"Warm-up of model '{name}' failed: {e}")
+            warm_up_errors[name] = str(e)
+            continue
+        timings[name] = time.perf_counter() - started
+        warmed_models[name] = timings[name]
+        warm_up_errors.pop(name, None)
+        logger.info(f"Model '{name}' warmed up in {timings[name]:.2f}s")
+    return timings
+
+def start_warm_up(background=True):
+    """Warm up the models once per process, in a background thread unless told otherwise"""
+    global warm_up_pid
+    with warm_up_lock:
+        if warm_up_pid == os.getpid():
+            return
+        warm_up_pid = os.getpid()
+        warmed_models.clear()
+        warm_up_errors.clear()
+    if background:
+        threading.Thread(target=warm_up_models, name="warm-up", daemon=True).start()
+    else:
+        warm_up_models()
+
+warm_up_retry = None
+
+def retry_warm_up(names):
+    """Warm up models again in the background, e.g. after a failed load; the registry applies the backoff"""
+    global warm_up_retry
+    with warm_up_lock:
+        if warm_up_retry is not None and warm_up_retry.is_alive():
+            return
+        warm_up_retry = threading.Thread(target=warm_up_models, args=(names,), name="warm-up-retry", daemon=True)
+        warm_up_retry.start()
+
+def failed_required_models():
+    """Required models that failed to load MODEL_LOAD_MAX_ATTEMPTS times in a row"""
+    return [name for name in required_models() if model_registry.failures(name) >= MODEL_LOAD_MAX_ATTEMPTS]
+
+def fork_unsafe_models():
+    """Loaded models whose runtime threads do not survive a fork"""
+    return [name for name in model_registry.loaded() if not fork_safe(name)]
+
+def prepare_fork():
+    """Called in the server master once the models are loaded, before workers are forked"""
+    # Only reached when something used a transformer model in the master anyway
+    for name in fork_unsafe_models():
+        model_registry.evict(name)
+        if name not in per_worker_models:
+            per_worker_models.append(name)
+    # Objects that exist now live as long as the master; freezing them keeps the
+    # garbage collector from touching, and so copying, their pages in every worker
+    gc.collect()
+    gc.freeze()
+
+def init_worker():
+    """Called in each server worker after the fork, before it accepts requests"""
+    configure_inference_threads(INFERENCE_THREADS)
+    # Loading and warming up the transformer models can outlast the worker
+    # timeout, so it runs in the background; readiness holds traffic until it is done
+    start_warm_up()
+    # Pick up jobs left queued by a previous run
+    job_queue.start()
+
+# Request latencies are recorded until the response starts; streamed bodies are not included
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        http_seconds.labels(endpoint, request.method, str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
+# Admin-only profiling, disabled while PROFILING_TOKEN is empty. A request with
+# the token in X-Profile-Token and X-Profile: 1 (or ?profile=1) is profiled
+# until its response is sent; POST /admin/profile samples every request of the
+# worker for a time window. Profiles are stored under PROFILES_DIR.
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+PROFILES_DIR = os.getenv('PROFILES_DIR', os.path.join(tempfile.gettempdir(), 'ml-service-profiles'))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '300'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+
+def profiling_authorized():
+    """Whether the request carries the profiling token"""
+    token = request.headers.get('X-Profile-Token', '')
+    return bool(PROFILING_TOKEN) and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+def finish_request_profile(session):
+    try:
+        session.stop().save(PROFILES_DIR, keep=PROFILE_KEEP)
+    except Exception as e:
+        logger.error(f"Error saving profile {session.id}: {e}")
+
+@app.before_request
+def start_request_profile():
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    if not flag or flag.lower() in ('0', 'false') or request.path.startswith('/admin/') or not profiling_authorized():
+        return
+    session = ProfileSession(request.path, interval=PROFILE_SAMPLE_INTERVAL_MS / 1000)
+    try:
+        g.profile_session = session.start()
+    except ProfilingBusy:
+        logger.warning(f"Not profiling {request.path}: another profile is running")
+
+@app.after_request
+def attach_request_profile(response):
+    session = g.pop('profile_session', None)
+    if session is not None:
+        response.headers['X-Profile-Id'] = session.id
+        # Stop once the body is sent, so streamed responses are profiled in full
+        response.call_on_close(lambda: finish_request_profile(session))
+    return response
+
+@app.teardown_request
+def stop_failed_request_profile(error):
+    # Unhandled errors skip after_request
+    session = g.pop('profile_session', None)
+    if session is not None:
+        finish_request_profile(session)
+
+def admin_error():
+    """Error response when profiling is disabled or the token is wrong, else None"""
+    if not PROFILING_TOKEN:
+        return jsonify({"error": "Not found"}), 404
+    if not profiling_authorized():
+        return jsonify({"error": "Invalid profiling token"}), 403
+    return None
+
+@app.route('/admin/profile', methods=['POST'])
+def start_profile_window():
+    """Sample every thread of this worker for a number of seconds, then store the profile"""
+    error = admin_error()
+    if error:
+        return error
+    seconds = (request.get_json(silent=True) or {}).get('seconds', 30)
+    if not isinstance(seconds, (int, float)) or not 0 < seconds <= PROFILE_MAX_SECONDS:
+        return jsonify({"error": f"seconds must be between 0 and {PROFILE_MAX_SECONDS}"}), 400
+    try:
+        session = profile_window(seconds, PROFILES_DIR, PROFILE_SAMPLE_INTERVAL_MS / 1000, PROFILE_KEEP)
+    except ProfilingBusy as e:
+        return jsonify({"error": str(e)}), 409
+    return jsonify({"profile_id": session.id, "seconds": seconds, "pid": os.getpid()}), 202
+
+@app.route('/admin/profiles', methods=['GET'])
+def get_profiles():
+    """Ids of the stored profiles, newest first"""
+    error = admin_error()
+    if error:
+        return error
+    return jsonify({"profiles": list_profiles(PROFILES_DIR)})
+
+@app.route('/admin/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """A stored profile: the JSON report, or ?format=prof (pstats) or ?format=folded (flame graph stacks)"""
+    error = admin_error()
+    if error:
+        return error
+    path = profile_path(PROFILES_DIR, profile_id, request.args.get('format', 'json'))
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path, as_attachment=request.args.get('format', 'json') != 'json')
+
+# API Endpoints
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness probe: the process is serving requests and its required models have not given up loading"""
+    failed = failed_required_models()
+    if failed:
+        return jsonify({"status": "failed", "pid": os.getpid(), "failed_models": failed}), 503
+    return jsonify({"status": "alive", "pid": os.getpid()})
+
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: passes once every required model is loaded and warmed up"""
+    # The dev server has no worker hook, so the first probe starts the warm-up
+    start_warm_up()
+    required = required_models()
+    pending = [name for name in required if name not in warmed_models]
+    if pending and any(name in warm_up_errors for name in pending):
+        retry_warm_up([name for name in pending if name in warm_up_errors])
+    registry = model_registry.status()
+    models = {}
+    for name, status in registry["models"].items():
+        if name in required or status["loaded"]:
+            models[name] = dict(
+                status,
+                required=name in required,
+                warm_up_ms=round(1000 * warmed_models[name], 2) if name in warmed_models else None,
+                warm_up_error=warm_up_errors.get(name)
+            )
+    return jsonify({
+        "status": "ready" if not pending else "warming_up",
+        "pending": pending,
+        "memory_used_mb": registry["memory_used_mb"],
+        "models": models
+    }), 200 if not pending else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Latency, size, batch and cache metrics in the Prometheus text format"""
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        "status": "healthy", 
+        "models_loaded": {
+            "spacy": {"en": "spacy_en" in model_registry, "ar": "spacy_ar" in model_registry},
+            "transformers": [name for name in model_registry.keys() if not name.startswith("spacy_")],
+            "loaded": model_registry.loaded()
+        },
+        "registry": model_registry.status(),
+        "inference_backends": dict(active_backends),
+        "cache": result_cache.stats(),
+        "qa_index_cache": passage_index_cache.stats()
+    })
+
+@app.route('/api/analyze-contract', methods=['POST'])
+def analyze_contract():
+    """Analyze contract text and extract key information"""
+    if not request.json or 'text' not in request.json:
+        return jsonify({"error": "Missing contract text"}), 400
+    
+    try:
+        analysis_result = analyze_contract_document(request.json['text'], request.json.get('language'))
+    except StageError as e:
+        logger.error(f"Error analyzing contract: {e}")
+        return jsonify({"error": f"Failed to analyze contract: {str(e)}"}), 500
     
     return jsonify(analysis_result)
 
+@app.route('/api/analyze-contract/batch', methods=['POST'])
+def analyze_contract_batch():
+    """Analyze several contracts with batched model calls"""
+    documents, error = parse_batch_documents(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    # Batch analyses have no stage deadlines or template report, so they are cached apart from single ones
+    return batch_response("analyze-contract-batch", documents, analyze_contract_slice)
+
 @app.route('/api/extract-entities', methods=['POST'])
 def extract_entities():
     """Extract legal entities from document text"""
@@ -553,66 +1689,54 @@ def extract_entities():
         return jsonify({"error": "Missing document text"}), 400
     
     document_text = request.json['text']
-    language = request.json.get('language', detect_language(document_text))
+    context = DocumentContext(document_text, request.json.get('language'))
+    language = context_language(context)
+    
+    cache_key = result_cache_key("extract-entities", document_text, {"language": language})
+    entities = cached_result(cache_key)
+    if entities is not None:
+        return jsonify(entities)
     
     # Try to extract entities with spaCy
-    entities_spacy = extract_entities_with_spacy(document_text, language)
+    entities_spacy = extract_entities_with_spacy(context)
     
     # Try to extract entities with transformers
-    entities_transformers = extract_entities_with_transformers(document_text)
+    entities_transformers = extract_entities_with_transformers(context)
     
     # Merge results, preferring transformer results when available
-    if entities_transformers and entities_spacy:
-        entities = {
-            "people": list(set(entities_transformers.get("people", []) + entities_spacy.get("people", []))),
-            "organizations": list(set(entities_transformers.get("organizations", []) + entities_spacy.get("organizations", []))),
-            "locations": list(set(entities_transformers.get("locations", []) + entities_spacy.get("locations", []))),
-            "dates": list(set(entities_transformers.get("dates", []) + entities_spacy.get("dates", []))),
-            "monetary_values": list(set(entities_transformers.get("monetary_values", []) + entities_spacy.get("monetary_values", [])))
-        }
-    elif entities_transformers:
-        entities = entities_transformers
-    elif entities_spacy:
-        entities = entities_spacy
-    else:
-        # Fallback to regex-based extraction
-        entities = {
-            "people": [],
-            "organizations": [],
-            "locations": [],
-            "dates": extract_dates(document_text),
-            "monetary_values": extract_monetary_values(document_text)
-        }
+    entities = merge_entities(context, entities_transformers, entities_spacy)
     
     # Add language information
     entities["language"] = language
+    store_result(cache_key, entities)
     
     return jsonify(entities)
 
+@app.route('/api/extract-entities/batch', methods=['POST'])
+def extract_entities_batch():
+    """Extract legal entities from several documents with batched model calls"""
+    documents, error = parse_batch_documents(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    return batch_response("extract-entities", documents, extract_entities_slice)
+
 @app.route('/api/classify-document', methods=['POST'])
 def classify_document():
     """Classify document type"""
     if not request.json or 'text' not in request.json:
         return jsonify({"error": "Missing document text"}), 400
     
-    document_text = request.json['text']
-    language = request.json.get('language', detect_language(document_text))
-    
-    # Classify document type
-    doc_type, confidence = classify_document_type(document_text)
-    
-    # Generate summary
-    summary = summarize_text(document_text)
-    
-    # Prepare response
-    classification = {
-        "document_type": doc_type,
-        "confidence": confidence,
-        "language": language,
-        "summary": summary
-    }
-    
-    return jsonify(classification)
+    return jsonify(classify_document_text(request.json['text'], request.json.get('language')))
+
+@app.route('/api/classify-document/batch', methods=['POST'])
+def classify_document_batch():
+    """Classify several documents with batched model calls"""
+    documents, error = parse_batch_documents(request.json)
+    if error:
+        return jsonify({"error": error}), 400
+    
+    return batch_response("classify-document", documents, classify_document_slice)
 
 @app.route('/api/summarize', methods=['POST'])
 def summarize_document():
@@ -622,11 +1746,10 @@ def summarize_document():
     
     document_text = request.json['text']
     max_length = request.json.get('max_length', 150)
+    if wants_ndjson():
+        return ndjson_response(summarize_document_steps(document_text, max_length))
     
-    # Generate summary
-    summary = summarize_text(document_text, max_length)
-    
-    return jsonify({"summary": summary})
+    return jsonify(summarize_document_text(document_text, max_length))
 
 @app.route('/api/answer-question', methods=['POST'])
 def answer_question():
@@ -637,35 +1760,157 @@ def answer_question():
     document_text = request.json['text']
     question = request.json['question']
     
-    if "qa_model" not in transformers_models:
+    # Answers hold offsets into the text, so they are cached for the exact text only
+    cache_key = result_cache_key("answer-question", document_text, {"question": question}, exact_text=True)
+    result = cached_result(cache_key)
+    if result is not None:
+        return jsonify(result)
+    
+    qa_model = model_registry.get("qa_model")
+    if qa_model is None:
         return jsonify({"error": "Question answering model not available"}), 500
     
     try:
-        # Use transformer model for question answering
-        # Limit context length to avoid token limits
-        max_context_length = 512
-        if len(document_text) > max_context_length:
-            # Simple approach: use the first part of the document
-            context = document_text[:max_context_length]
-        else:
-            context = document_text
-        
-        answer = transformers_models["qa_model"](
-            question=question,
-            context=context
-        )
+        # Rank document passages and read only the best ones
+        index = passage_index_cache.get(document_text, QA_PASSAGE_WORDS, QA_PASSAGE_STRIDE)
+        answer = answer_from_passages(qa_model, index, [question])[0]
+        if answer is None:
+            return jsonify({"error": "Document text is empty"}), 400
         
-        return jsonify({
+        result = {
             "answer": answer['answer'],
             "confidence": answer['score'],
             "start": answer['start'],
             "end": answer['end']
-        })
+        }
+        store_result(cache_key, result)
+        
+        return jsonify(result)
     
     except Exception as e:
         logger.error(f"Error answering question with transformers: {e}")
         return jsonify({"error": f"Failed to answer question: {str(e)}"}), 500
 
+@app.route('/api/answer-questions', methods=['POST'])
+def answer_questions():
+    """Answer several questions about one document"""
+    if not request.json or 'text' not in request.json or not isinstance(request.json.get('questions'), list):
+        return jsonify({"error": "Missing document text or questions"}), 400
+    
+    document_text = request.json['text']
+    questions = request.json['questions']
+    if not questions or len(questions) > MAX_QA_QUESTIONS:
+        return jsonify({"error": f"Provide between 1 and {MAX_QA_QUESTIONS} questions"}), 400
+    if not all(isinstance(question, str) and question.strip() for question in questions):
+        return jsonify({"error": "Questions must be non-empty strings"}), 400
+    
+    # Questions answered before for this document come from the result cache
+    cache_keys = [
+        result_cache_key("answer-question", document_text, {"question": question}, exact_text=True)
+        for question in questions
+    ]
+    results = [cached_result(cache_key) for cache_key in cache_keys]
+    pending = [i for i, result in enumerate(results) if result is None]
+    
+    if pending:
+        qa_model = model_registry.get("qa_model")
+        if qa_model is None:
+            return jsonify({"error": "Question answering model not available"}), 500
+        
+        try:
+            # The document is split and indexed once for all questions
+            index = passage_index_cache.get(document_text, QA_PASSAGE_WORDS, QA_PASSAGE_STRIDE)
+            answers = answer_from_passages(qa_model, index, [questions[i] for i in pending])
+        except Exception as e:
+            logger.error(f"Error answering questions with transformers: {e}")
+            return jsonify({"error": f"Failed to answer questions: {str(e)}"}), 500
+        
+        if any(answer is None for answer in answers):
+            return jsonify({"error": "Document text is empty"}), 400
+        
+        for i, answer in zip(pending, answers):
+            results[i] = {
+                "answer": answer['answer'],
+                "confidence": answer['score'],
+                "start": answer['start'],
+                "end": answer['end']
+            }
+            store_result(cache_keys[i], results[i])
+    
+    return jsonify({
+        "answers": [dict(result, question=question) for question, result in zip(questions, results)]
+    })
+
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    """Queue a long-running analysis and return its job id"""
+    if not request.json or 'text' not in request.json or not isinstance(request.json['text'], str):
+        return jsonify({"error": "Missing document text"}), 400
+    
+    job_type = request.json.get('type', 'analyze-contract')
+    if job_type not in JOB_HANDLERS:
+        return jsonify({"error": f"Unknown job type: {job_type}"}), 400
+    
+    payload = {key: request.json[key] for key in ('text', 'language', 'max_length') if key in request.json}
+    try:
+        job_id = job_queue.submit(job_type, payload)
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    
+    response = jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "result_url": f"/api/jobs/{job_id}/result"
+    })
+    response.headers['Location'] = f"/api/jobs/{job_id}"
+    return response, 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a submitted job"""
+    forwarded = forward_job_request(job_id)
+    if forwarded is not None:
+        return forwarded
+    # Workers are started lazily, including after a restart with jobs still queued
+    job_queue.start()
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id):
+    """Result of a finished job; 202 while it is still queued or running"""
+    forwarded = forward_job_request(job_id)
+    if forwarded is not None:
+        return forwarded
+    job_queue.start()
+    job = job_queue.get(job_id, include_result=True)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    if job["status"] == SUCCEEDED:
+        return jsonify({"job_id": job_id, "status": job["status"], "result": job["result"]})
+    if job["status"] == FAILED:
+        return jsonify({"job_id": job_id, "status": job["status"], "error": job.get("error")}), 500
+    if job["status"] in FINISHED_STATUSES:
+        return jsonify({"job_id": job_id, "status": job["status"], "error": "Job was cancelled"}), 409
+    return jsonify({"job_id": job_id, "status": job["status"]}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a queued or running job"""
+    forwarded = forward_job_request(job_id)
+    if forwarded is not None:
+        return forwarded
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] in FINISHED_STATUSES:
+        return jsonify({"error": f"Job already {job['status']}", "status": job["status"]}), 409
+    return jsonify(job_queue.cancel(job_id))
+
 @app.route('/api/analyze-sentiment', methods=['POST'])
 def analyze_sentiment():
     """Analyze sentiment of text"""
@@ -674,7 +1919,13 @@ def analyze_sentiment():
     
     text = request.json['text']
     
-    if "sentiment_analyzer" not in transformers_models:
+    cache_key = result_cache_key("analyze-sentiment", text)
+    result = cached_result(cache_key)
+    if result is not None:
+        return jsonify(result)
+    
+    sentiment_analyzer = model_registry.get("sentiment_analyzer")
+    if sentiment_analyzer is None:
         # Fallback to simple sentiment analysis
         positive_words = ["good", "great", "excellent", "positive", "beneficial", "favorable", "advantageous"]
         negative_words = ["bad", "poor", "negative", "unfavorable", "disadvantageous", "harmful", "detrimental"]
@@ -693,19 +1944,17 @@ def analyze_sentiment():
             sentiment = "neutral"
             score = 0.5
         
-        return jsonify({
+        result = {
             "sentiment": sentiment,
             "score": score
-        })
+        }
+        store_result(cache_key, result)
+        
+        return jsonify(result)
     
     try:
-        # Use transformer model for sentiment analysis
-        # Limit input length to avoid token limits
-        max_input_length = 512
-        if len(text) > max_input_length:
-            text = text[:max_input_length]
-        
-        result = transformers_models["sentiment_analyzer"](text)
+        # Use transformer model for sentiment analysis over token windows of the whole text
+        result = run_windowed_classifier("sentiment_analyzer", [text])[0]
         
         # Map 1-5 star rating to sentiment
         label = result[0]['label']
@@ -718,15 +1967,19 @@ def analyze_sentiment():
         else:  # "4" or "5"
             sentiment = "positive"
         
-        return jsonify({
+        result = {
             "sentiment": sentiment,
             "score": score,
             "label": label
-        })
+        }
+        store_result(cache_key, result)
+        
+        return jsonify(result)
     
     except Exception as e:
         logger.error(f"Error analyzing sentiment with transformers: {e}")
         return jsonify({"error": f"Failed to analyze sentiment: {str(e)}"}), 500
 
 if __name__ == '__main__':
+    start_warm_up()
     app.run(host='0.0.0.0', port=5000, debug=os.getenv('NODE_ENV') == 'development')
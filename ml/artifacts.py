@@ -0,0 +1,99 @@
+import logging
+import os
+import time
+
+from inference_backends import COMPLETE_MARKER, build_artifact
+
+logger = logging.getLogger(__name__)
+
+# NLTK packages used by the service and the data path each one is found under
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "stopwords": "corpora/stopwords",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger"
+}
+
+
+class MissingArtifactError(Exception):
+    """Raised in offline mode when an artifact has not been baked"""
+
+
+def nltk_data_directory(model_path):
+    return os.path.join(model_path, "nltk_data")
+
+
+def spacy_model_directory(model_path, name):
+    return os.path.join(model_path, "spacy", name)
+
+
+def transformer_model_directory(model_path, model_id):
+    return os.path.join(model_path, "transformers", model_id.replace('/', '__'))
+
+
+def baked(directory):
+    """Whether a model directory was completely written by the bake step"""
+    return os.path.exists(os.path.join(directory, COMPLETE_MARKER))
+
+
+def missing_nltk_resources(directory):
+    """NLTK packages that cannot be found locally"""
+    import nltk
+    if directory not in nltk.data.path:
+        nltk.data.path.insert(0, directory)
+    missing = []
+    for name, resource in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def ensure_nltk_data(directory, offline=False):
+    """Make the NLTK packages available, downloading missing ones into `directory`
+
+    In offline mode nothing is downloaded and a missing package raises
+    MissingArtifactError.
+    """
+    import nltk
+    missing = missing_nltk_resources(directory)
+    if missing and offline:
+        raise MissingArtifactError(f"NLTK data {', '.join(missing)} not found under {directory}")
+    for name in missing:
+        started = time.perf_counter()
+        try:
+            nltk.download(name, download_dir=directory, quiet=True, raise_on_error=True)
+        except (OSError, ValueError):
+            # Not writable (e.g. no model volume in development): use the NLTK default location
+            nltk.download(name, quiet=True, raise_on_error=True)
+        logger.info(f"Downloaded NLTK {name} in {time.perf_counter() - started:.2f}s")
+
+
+def bake_spacy_model(model_path, name):
+    """Save a spaCy pipeline under `model_path`, installing its package if needed
+
+    Raises RuntimeError when the package cannot be downloaded, e.g. when it
+    does not exist for the installed spaCy version.
+    """
+    def build(staging):
+        import spacy
+        try:
+            nlp = spacy.load(name)
+        except OSError:
+            from spacy.cli import download
+            try:
+                download(name)
+            except SystemExit as e:
+                # spaCy's CLI exits instead of raising for unknown or incompatible packages
+                raise RuntimeError(f"spaCy package {name} could not be downloaded (exit status {e.code})")
+            nlp = spacy.load(name)
+        nlp.to_disk(staging)
+    return build_artifact(spacy_model_directory(model_path, name), build)
+
+
+def bake_transformer_model(model_path, task, model_id, framework=None, **kwargs):
+    """Save the weights (of `framework`, "tf" or "pt") and tokenizer of a transformers pipeline under `model_path`"""
+    def build(staging):
+        from transformers import pipeline
+        pipeline(task, model=model_id, framework=framework, **kwargs).save_pretrained(staging)
+    return build_artifact(transformer_model_directory(model_path, model_id), build)
@@ -0,0 +1,102 @@
+"""Bake the artifacts of the ML service under MODEL_PATH for offline startup
+
+Downloads the NLTK data, saves the spaCy pipelines and the transformer
+weights and tokenizers under the model path, and converts the models listed
+in MODEL_BACKENDS to their ONNX backend. Artifacts already baked are kept, so
+the command can be rerun after adding a model. Run it once per model volume
+(or image build) with network access, then start the service with
+OFFLINE_MODE=true. Prints the time spent per artifact as JSON and exits with
+status 1 when one of them could not be baked.
+
+Usage: python bake_artifacts.py [--model-path /app/models] [--models ner_model,summarizer]
+       [--skip-nltk] [--skip-spacy]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def timed(results, artifact, bake):
+    started = time.perf_counter()
+    result = {"artifact": artifact}
+    try:
+        result["path"] = bake()
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(result), file=sys.stderr)
+    results.append(result)
+    return "error" not in result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model-path', default=os.getenv('MODEL_PATH', '/app/models'))
+    parser.add_argument('--models', default=None, help='comma-separated transformer model names (default: all)')
+    parser.add_argument('--skip-nltk', action='store_true')
+    parser.add_argument('--skip-spacy', action='store_true')
+    args = parser.parse_args()
+
+    # The service settings are read when app.py is imported
+    os.environ['MODEL_PATH'] = args.model_path
+    os.environ['OFFLINE_MODE'] = 'false'
+    os.environ['PRELOAD_MODELS'] = ''
+    from app import MODEL_BACKENDS, PIPELINE_FRAMEWORK, SPACY_PACKAGES, TRANSFORMER_MODELS
+    from artifacts import (
+        NLTK_RESOURCES, bake_spacy_model, bake_transformer_model, nltk_data_directory, transformer_model_directory
+    )
+    from inference_backends import DEFAULT_BACKEND, active_backends, artifact_directory, build_pipeline
+
+    results = []
+
+    if not args.skip_nltk:
+        import nltk
+        directory = nltk_data_directory(args.model_path)
+        for name in NLTK_RESOURCES:
+            def bake_nltk(name=name):
+                nltk.download(name, download_dir=directory, quiet=True, raise_on_error=True)
+                return directory
+            timed(results, f"nltk:{name}", bake_nltk)
+
+    if not args.skip_spacy:
+        # One package per entry is enough; later ones are fallbacks
+        for packages in SPACY_PACKAGES.values():
+            attempts = []
+            for package in packages:
+                if timed(attempts, f"spacy:{package}", lambda: bake_spacy_model(args.model_path, package)):
+                    # A failed package replaced by its fallback is not an error of the bake
+                    for attempt in attempts[:-1]:
+                        attempt["skipped"] = attempt.pop("error")
+                    break
+            results.extend(attempts)
+
+    names = [name for name in args.models.split(',') if name] if args.models else list(TRANSFORMER_MODELS)
+    for name in names:
+        if name not in TRANSFORMER_MODELS:
+            raise SystemExit(f"Unknown model '{name}', expected one of {', '.join(TRANSFORMER_MODELS)}")
+        task, model_id, kwargs = TRANSFORMER_MODELS[name]
+        backend = MODEL_BACKENDS.get(name, DEFAULT_BACKEND)
+        # The ONNX export reads PyTorch weights
+        framework = PIPELINE_FRAMEWORK if backend == DEFAULT_BACKEND else "pt"
+        if not timed(results, f"transformers:{model_id}",
+                     lambda: bake_transformer_model(args.model_path, task, model_id, framework=framework, **kwargs)):
+            continue
+
+        if backend != DEFAULT_BACKEND:
+            def convert():
+                build_pipeline(task, model_id, backend=backend, cache_dir=args.model_path,
+                               source=transformer_model_directory(args.model_path, model_id), **kwargs)
+                if active_backends.get(model_id) != backend:
+                    raise RuntimeError(f"Conversion to {backend} failed, see the log")
+                return artifact_directory(args.model_path, model_id, backend)
+            timed(results, f"{backend}:{model_id}", convert)
+
+    print(json.dumps(results, indent=2))
+    if any("error" in result for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Collect concurrent single-item requests into batched calls
+
+    Callers block in `submit` while a background worker gathers up to
+    `max_batch_size` items, waiting at most `max_wait_ms` after the first one
+    arrives, runs `process_batch` once on the whole list and hands each caller
+    its own result. `process_batch` must return one result per input item.
+    If a batch of several items fails, they are retried one at a time so only
+    the callers whose items fail get the exception.
+    `on_batch`, if given, is called with the seconds each item of a batch
+    waited in the queue before the batch was processed.
+    """
+
+    def __init__(self, process_batch, max_batch_size=16, max_wait_ms=10, name="batcher", on_batch=None):
+        self.process_batch = process_batch
+        self.on_batch = on_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+    def submit(self, item):
+        """Queue an item and wait for its result"""
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.monotonic()))
+        return future.result()
+
+    def _ensure_worker(self):
+        # Worker threads do not survive fork, so restart them in child processes
+        if self._worker is not None and self._worker.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._worker = threading.Thread(target=self._run, name=f"{self.name}-worker", daemon=True)
+            self._worker.start()
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            if self.on_batch is not None:
+                started = time.monotonic()
+                try:
+                    self.on_batch([started - enqueued for _, _, enqueued in batch])
+                except Exception as e:
+                    logger.warning(f"Error in on_batch callback of {self.name}: {e}")
+            try:
+                results = self._process(items)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"Error processing item in {self.name}: {e}")
+                    batch[0][1].set_exception(e)
+                    continue
+                logger.warning(f"Error processing batch of {len(items)} in {self.name}, retrying items one by one: {e}")
+                for item, future, _ in batch:
+                    try:
+                        future.set_result(self._process([item])[0])
+                    except Exception as item_error:
+                        logger.error(f"Error processing item in {self.name}: {item_error}")
+                        future.set_exception(item_error)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _process(self, items):
+        results = self.process_batch(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} inputs")
+        return results
@@ -0,0 +1,95 @@
+"""Microbenchmark for the compiled contract patterns
+
+Compares scan_contract_text() against the previous approach of passing the
+raw pattern strings to re.search/re.findall with re.IGNORECASE, once per
+field, on synthetic documents of increasing size.
+
+Usage: python benchmarks/bench_patterns.py [--sizes 100000,1000000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+# Add the parent directory to sys.path to import patterns.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from patterns import contract_patterns, date_patterns, money_patterns, scan_contract_text
+
+FILLER = (
+    "the provider shall deliver the services described in the schedule within thirty days "
+    "of the order and the customer shall cooperate in good faith with reasonable requests"
+).split()
+
+CLAUSES = [
+    "This Agreement is made effective as of January 15, 2025 by and between Acme Corporation and Legal Services LLC.",
+    "Payment terms: the Client shall pay USD 5,000 per month within 30 days of invoice.",
+    "This Agreement shall terminate on December 31, 2026 unless renewed.",
+    "Governing law: the laws of the Kingdom of Saudi Arabia.",
+    "Late fees of 1,500.00 riyals apply after 15/02/2025."
+]
+
+
+def generate_document(size, seed=42):
+    """Synthetic contract text of roughly `size` characters"""
+    rng = random.Random(seed)
+    sentences = []
+    length = 0
+    while length < size:
+        if rng.random() < 0.05:
+            sentence = rng.choice(CLAUSES)
+        else:
+            sentence = " ".join(rng.choice(FILLER) for _ in range(rng.randint(10, 30))).capitalize() + "."
+        sentences.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def scan_per_field(text):
+    """The previous approach: raw patterns with re.IGNORECASE, one scan per field"""
+    result = {}
+    for field in ["effective_date", "termination_date", "payment_terms", "governing_law"]:
+        match = re.search(contract_patterns[field], text, re.IGNORECASE)
+        result[field] = match.group(1) if match else None
+    result["parties"] = [match.group(1) for match in re.finditer(contract_patterns["parties"], text, re.IGNORECASE)]
+    result["dates"] = [date for pattern in date_patterns for date in re.findall(pattern, text, re.IGNORECASE)]
+    result["monetary_values"] = [value for pattern in money_patterns for value in re.findall(pattern, text, re.IGNORECASE)]
+    return result
+
+
+def best_time(function, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10000,100000,1000000', help='comma-separated document sizes in characters')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        text = generate_document(size)
+        if scan_per_field(text) != scan_contract_text(text):
+            raise SystemExit(f"Results differ for a document of {size} characters")
+        baseline = best_time(scan_per_field, text, args.repeat)
+        compiled = best_time(scan_contract_text, text, args.repeat)
+        results.append({
+            "characters": len(text),
+            "per_field_seconds": round(baseline, 5),
+            "compiled_seconds": round(compiled, 5),
+            "speedup": round(baseline / compiled, 2)
+        })
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+"""Accuracy-vs-latency comparison of the inference backends
+
+Builds each selected transformer model with every backend, runs the same
+inputs through each of them and reports, per backend, the load time, the
+latency per input (mean, p50, p95), the size of the converted artifacts and
+the agreement with the default backend: label agreement for classifiers,
+entity F1 for NER, exact answer match for question answering and unigram F1
+for summaries. Use it to pick the MODEL_BACKENDS setting of each model.
+
+Usage: python benchmarks/compare_backends.py [--models ner_model,summarizer]
+       [--backends default,onnx,onnx-int8] [--repeat 3] [--cache-dir /tmp/models]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Add the parent directory to sys.path to import app.py and inference_backends.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app import MODEL_PATH, TRANSFORMER_MODELS
+from inference_backends import BACKENDS, DEFAULT_BACKEND, active_backends, artifact_directory, build_pipeline
+
+SENTENCES = [
+    "This Service Agreement is made effective as of January 15, 2025, by and between Acme Corporation and Legal Services LLC.",
+    "Client agrees to pay Provider $5,000 per month, payable within 30 days of receipt of invoice.",
+    "This Agreement shall be governed by the laws of the Kingdom of Saudi Arabia.",
+    "John Smith, acting on behalf of Gulf Trading Company in Riyadh, accepts unlimited liability for any breach.",
+    "Either party may terminate this Agreement without cause upon sixty days written notice.",
+    "The Receiving Party shall keep all Confidential Information strictly confidential for five years.",
+    "Sarah Johnson will represent the Company in any arbitration held in Dubai.",
+    "The terms of this lease are favorable and the landlord has been excellent to work with."
+]
+
+QUESTIONS = [
+    "What is the monthly payment amount?",
+    "Which law governs the agreement?",
+    "How much notice is required to terminate?",
+    "Who represents the Company in arbitration?"
+]
+
+DOCUMENT = " ".join(SENTENCES)
+
+
+def task_inputs(task):
+    """Inputs for one call per item of the comparison"""
+    if task == "question-answering":
+        return [{"question": question, "context": DOCUMENT} for question in QUESTIONS]
+    if task == "summarization":
+        return [DOCUMENT, " ".join(SENTENCES[:4]), " ".join(SENTENCES[4:])]
+    return SENTENCES
+
+
+def run(pipeline, task, item):
+    if task == "question-answering":
+        return pipeline(**item)
+    if task == "summarization":
+        return pipeline(item, max_length=60, min_length=10, do_sample=False, truncation=True)
+    return pipeline(item)
+
+
+def unigram_f1(reference, candidate):
+    reference_words = reference.lower().split()
+    candidate_words = candidate.lower().split()
+    common = sum(min(reference_words.count(word), candidate_words.count(word)) for word in set(candidate_words))
+    if not common:
+        return 0.0
+    precision = common / len(candidate_words)
+    recall = common / len(reference_words)
+    return 2 * precision * recall / (precision + recall)
+
+
+def set_f1(reference, candidate):
+    if not reference and not candidate:
+        return 1.0
+    common = len(reference & candidate)
+    if not common:
+        return 0.0
+    return 2 * common / (len(reference) + len(candidate))
+
+
+def agreement(task, reference, candidate):
+    """Similarity of one output to the default backend's output, between 0 and 1"""
+    if task == "question-answering":
+        return float(reference["answer"].strip() == candidate["answer"].strip())
+    if task == "summarization":
+        return unigram_f1(reference[0]["summary_text"], candidate[0]["summary_text"])
+    if task in ("ner", "token-classification"):
+        def entities(output):
+            return {(entity.get("entity_group", entity.get("entity")), entity["word"].strip()) for entity in output}
+        return set_f1(entities(reference), entities(candidate))
+    return float(reference[0]["label"] == candidate[0]["label"])
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def compare_model(name, backends, repeat, cache_dir):
+    task, model_id, kwargs = TRANSFORMER_MODELS[name]
+    inputs = task_inputs(task)
+    reference = None
+    results = []
+
+    for backend in backends:
+        started = time.perf_counter()
+        pipeline = build_pipeline(task, model_id, backend=backend, cache_dir=cache_dir, **kwargs)
+        load_seconds = time.perf_counter() - started
+        used = active_backends.get(model_id)
+
+        outputs = [run(pipeline, task, item) for item in inputs]  # warm-up
+        timings = []
+        for _ in range(repeat):
+            for item in inputs:
+                started = time.perf_counter()
+                run(pipeline, task, item)
+                timings.append(time.perf_counter() - started)
+
+        if backend == DEFAULT_BACKEND:
+            reference = outputs
+        result = {
+            "model": name,
+            "backend": backend,
+            "backend_used": used,
+            "load_seconds": round(load_seconds, 2),
+            "mean_ms": round(1000 * float(np.mean(timings)), 2),
+            "p50_ms": round(1000 * float(np.percentile(timings, 50)), 2),
+            "p95_ms": round(1000 * float(np.percentile(timings, 95)), 2)
+        }
+        if backend != DEFAULT_BACKEND:
+            result["artifact_mb"] = round(directory_size(artifact_directory(cache_dir, model_id, backend)) / 2**20, 1)
+        if reference is not None:
+            scores = [agreement(task, expected, actual) for expected, actual in zip(reference, outputs)]
+            result["agreement"] = round(float(np.mean(scores)), 3)
+        results.append(result)
+        del pipeline
+
+    baseline = next((result for result in results if result["backend"] == DEFAULT_BACKEND), None)
+    if baseline:
+        for result in results:
+            result["speedup"] = round(baseline["mean_ms"] / result["mean_ms"], 2) if result["mean_ms"] else None
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', default=",".join(TRANSFORMER_MODELS), help='comma-separated model names')
+    parser.add_argument('--backends', default=",".join(BACKENDS), help='comma-separated backends; include default for agreement scores')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cache-dir', default=MODEL_PATH, help='where converted artifacts are cached')
+    args = parser.parse_args()
+
+    backends = [backend for backend in args.backends.split(',') if backend]
+    # The default backend runs first so the others can be compared with it
+    backends.sort(key=lambda backend: backend != DEFAULT_BACKEND)
+
+    results = []
+    for name in [name for name in args.models.split(',') if name]:
+        if name not in TRANSFORMER_MODELS:
+            raise SystemExit(f"Unknown model '{name}', expected one of {', '.join(TRANSFORMER_MODELS)}")
+        results.extend(compare_model(name, backends, args.repeat, args.cache_dir))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Synthetic English and Arabic contracts for benchmarks and load tests
+
+Contracts are assembled from numbered clauses, one per clause type of
+contract_patterns, each seeded with risk terms from risk_assessment_rules and
+padded with boilerplate until the requested size is reached. The same seed,
+size and language always give the same text.
+
+Usage: python benchmarks/corpus.py [--count 10] [--sizes 2000,20000] [--languages en,ar]
+       [--seed 0] > corpus.jsonl
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+# Add the parent directory to sys.path to import contract_rules.py and patterns.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contract_rules import risk_assessment_rules
+from patterns import contract_patterns
+
+PARTIES = [
+    ("Acme Corporation", "Legal Services LLC"),
+    ("Gulf Trading Company", "Desert Logistics Ltd."),
+    ("Northwind Holdings Inc.", "Riyadh Consulting Company")
+]
+PEOPLE = ["John Smith", "Sarah Johnson", "Ahmed Al-Farsi", "Layla Haddad"]
+CITIES = ["Riyadh", "Jeddah", "Dubai", "London"]
+MONTHS = ["January", "March", "May", "July", "September", "November"]
+
+# One template per clause type of contract_patterns, each matching its pattern
+ENGLISH_CLAUSES = {
+    "parties": "This Agreement is entered into by and between {party_a} and {party_b}.",
+    "effective_date": "This Agreement is effective as of {date}.",
+    "termination_date": "This Agreement shall terminate on {end_date} unless renewed in writing.",
+    "payment_terms": "Payment terms: the Client shall pay {amount} per month within 30 days of invoice.",
+    "governing_law": "Governing law: the laws of the Kingdom of Saudi Arabia apply to this Agreement.",
+    "confidentiality": "Confidentiality obligations bind {person} and all employees of {party_b} for five years.",
+    "indemnification": "Indemnification is owed by {party_b} for claims arising from its services in {city}.",
+    "limitation_of_liability": "Limitation of liability applies to all claims except those caused by gross negligence.",
+    "force_majeure": "Force majeure events excuse delays for as long as they prevent performance.",
+    "dispute_resolution": "Arbitration in {city} shall settle any dispute arising under this Agreement."
+}
+
+ARABIC_CLAUSES = {
+    "parties": "أبرمت هذه الاتفاقية بين {party_a} و{party_b}.",
+    "effective_date": "تسري هذه الاتفاقية اعتبارًا من {date}.",
+    "termination_date": "تنتهي هذه الاتفاقية في {end_date} ما لم تجدد كتابيًا.",
+    "payment_terms": "شروط الدفع: يدفع العميل {amount} شهريًا خلال ثلاثين يومًا من تاريخ الفاتورة.",
+    "governing_law": "القانون الحاكم: تخضع هذه الاتفاقية لقوانين المملكة العربية السعودية.",
+    "confidentiality": "يلتزم الطرفان بالحفاظ على سرية المعلومات لمدة خمس سنوات.",
+    "indemnification": "يعوض المزود العميل عن أي مطالبات تنشأ عن خدماته في {city}.",
+    "limitation_of_liability": "تقتصر مسؤولية المزود على المبلغ الذي دفعه العميل بموجب هذه الاتفاقية.",
+    "force_majeure": "لا يتحمل أي طرف مسؤولية التأخير الناتج عن القوة القاهرة.",
+    "dispute_resolution": "يتم حل أي نزاع عن طريق التحكيم في {city}."
+}
+
+ENGLISH_FILLER = [
+    "The Provider shall perform the services with the skill and care expected of a professional firm.",
+    "Each party shall bear its own costs in connection with the negotiation of this Agreement.",
+    "Notices shall be delivered in writing to the addresses set out in the schedule.",
+    "The Client shall provide the information reasonably requested by the Provider in a timely manner.",
+    "No amendment of this Agreement is valid unless it is made in writing and signed by both parties.",
+    "The headings in this Agreement are for convenience only and do not affect its interpretation."
+]
+
+ARABIC_FILLER = [
+    "يقدم المزود الخدمات بالعناية المهنية المتوقعة من شركة متخصصة.",
+    "يتحمل كل طرف تكاليفه الخاصة المتعلقة بالتفاوض على هذه الاتفاقية.",
+    "ترسل الإشعارات كتابيًا إلى العناوين المحددة في الملحق.",
+    "لا يكون أي تعديل على هذه الاتفاقية نافذًا ما لم يكن مكتوبًا وموقعًا من الطرفين."
+]
+
+# Each English clause carries a term of a random risk level, so clauses get varied risk scores
+RISK_SENTENCE = "This clause is subject to {term} as agreed by the parties."
+
+ARABIC_TITLE = "اتفاقية تقديم خدمات"
+ENGLISH_TITLE = "SERVICE AGREEMENT"
+
+
+def clause_values(rng):
+    party_a, party_b = rng.choice(PARTIES)
+    year = rng.randint(2024, 2027)
+    return {
+        "party_a": party_a,
+        "party_b": party_b,
+        "person": rng.choice(PEOPLE),
+        "city": rng.choice(CITIES),
+        "date": f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {year}",
+        "end_date": f"{rng.choice(MONTHS)} {rng.randint(1, 28)}, {year + rng.randint(1, 3)}",
+        "amount": f"${rng.randint(1, 50) * 1000:,}" if rng.random() < 0.5 else f"SAR {rng.randint(1, 90) * 1000:,}"
+    }
+
+
+def generate_contract(characters, language="en", seed=0):
+    """Synthetic contract of at least `characters` characters in English or Arabic"""
+    if language not in ("en", "ar"):
+        raise ValueError(f"Unsupported language '{language}'")
+    rng = random.Random(f"{seed}-{language}-{characters}")
+    values = clause_values(rng)
+    templates = ARABIC_CLAUSES if language == "ar" else ENGLISH_CLAUSES
+    filler = ARABIC_FILLER if language == "ar" else ENGLISH_FILLER
+
+    clause_types = list(contract_patterns)
+    parts = [ARABIC_TITLE if language == "ar" else ENGLISH_TITLE]
+    length = len(parts[0])
+    number = 0
+    while length < characters:
+        clause_type = clause_types[number % len(clause_types)]
+        number += 1
+        sentences = [templates[clause_type].format(**values)]
+        if language == "en":
+            level = rng.choice(list(risk_assessment_rules))
+            sentences.append(RISK_SENTENCE.format(term=rng.choice(risk_assessment_rules[level])))
+        sentences.extend(rng.choice(filler) for _ in range(rng.randint(1, 4)))
+        clause = f"{number}. " + " ".join(sentences)
+        parts.append(clause)
+        length += len(clause) + 1
+    return "\n".join(parts)
+
+
+def generate_corpus(count, sizes, languages=("en", "ar"), seed=0):
+    """`count` documents per size and language, as dicts with id, language and text"""
+    documents = []
+    for language in languages:
+        for size in sizes:
+            for index in range(count):
+                documents.append({
+                    "id": f"{language}-{size}-{index}",
+                    "language": language,
+                    "text": generate_contract(size, language, seed=seed + index)
+                })
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=10, help='documents per size and language')
+    parser.add_argument('--sizes', default='2000,20000', help='comma-separated document sizes in characters')
+    parser.add_argument('--languages', default='en,ar')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    languages = [language for language in args.languages.split(',') if language]
+    for document in generate_corpus(args.count, sizes, languages, args.seed):
+        print(json.dumps(document, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
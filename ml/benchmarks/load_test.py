@@ -0,0 +1,401 @@
+"""Concurrency sweep of the HTTP endpoints, to size workers and autoscaling
+
+Starts the service under gunicorn (gunicorn.conf.py) once per worker count,
+with the deterministic stand-in models of stub_models.py, and drives it with
+a closed loop of N concurrent clients for each concurrency level. Each client
+sends requests back to back, drawn from a weighted endpoint mix and a
+weighted distribution of payload sizes of the synthetic corpus (corpus.py),
+so no network or model download is needed. Pass --url to drive a running
+instance instead (e.g. a pod with the real models, from another machine).
+
+Per level the report has the throughput, error rate, latency percentiles
+overall and per endpoint, and the CPU used by the server processes. For each
+worker count it marks the saturation point (the last level that raised
+throughput by at least --min-gain) and the latency knee (the level with the
+highest throughput per second of mean latency, beyond which extra load only
+queues), and it recommends WEB_CONCURRENCY and the thresholds of a
+HorizontalPodAutoscaler for kubernetes/ml-service-deployment.yaml.
+
+The stand-ins spin on a core for a time proportional to their input, so
+absolute numbers depend on the host and on --stub-latency; the clients share
+the host with the server unless --url points elsewhere.
+
+Usage: python benchmarks/load_test.py [--workers 1,2,4] [--concurrency 1,2,4,8,16,32]
+       [--duration 20] [--mix analyze-contract:3,summarize:1] [--sizes 2000:6,20000:3,100000:1]
+       [--arabic-share 0.3] [--url http://localhost:5000] [--output report.json]
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import numpy as np
+
+from corpus import generate_contract
+
+ML_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+QUESTION = "Which law governs the agreement?"
+
+# Request body of each endpoint for one document
+ENDPOINTS = {
+    "analyze-contract": ("/api/analyze-contract", lambda text, language: {"text": text, "language": language}),
+    "extract-entities": ("/api/extract-entities", lambda text, language: {"text": text, "language": language}),
+    "classify-document": ("/api/classify-document", lambda text, language: {"text": text, "language": language}),
+    "summarize": ("/api/summarize", lambda text, language: {"text": text}),
+    "answer-question": ("/api/answer-question", lambda text, language: {"text": text, "question": QUESTION}),
+    "analyze-sentiment": ("/api/analyze-sentiment", lambda text, language: {"text": text}),
+    "analyze-contract-batch": ("/api/analyze-contract/batch", lambda text, language: {
+        "documents": [{"id": str(i), "text": text, "language": language} for i in range(4)]
+    })
+}
+
+DEFAULT_MIX = "analyze-contract:4,extract-entities:2,classify-document:2,summarize:1,answer-question:1,analyze-sentiment:1"
+DEFAULT_SIZES = "2000:6,20000:3,100000:1"
+# Distinct documents per size and language, so requests are not all identical
+VARIANTS = 3
+
+
+def parse_weights(value, cast=str):
+    """Parse 'name:weight,...' into a dict; a missing weight counts as 1"""
+    weights = {}
+    for item in value.split(','):
+        if not item:
+            continue
+        name, _, weight = item.partition(':')
+        weights[cast(name)] = float(weight or 1)
+    if not weights or any(weight < 0 for weight in weights.values()) or not sum(weights.values()):
+        raise ValueError(f"Invalid weights '{value}'")
+    return weights
+
+
+def build_payloads(mix, sizes, arabic_share, seed=0):
+    """Encoded request bodies, grouped by endpoint, size and language"""
+    documents = {
+        (size, language): [generate_contract(size, language, seed + variant) for variant in range(VARIANTS)]
+        for size in sizes for language in ("en", "ar")
+    }
+    return {
+        endpoint: {
+            key: [json.dumps(ENDPOINTS[endpoint][1](text, key[1])).encode() for text in texts]
+            for key, texts in documents.items()
+        }
+        for endpoint in mix
+    }
+
+
+class RequestPicker:
+    """Draws (endpoint, body) pairs from the mix and the size distribution"""
+
+    def __init__(self, mix, sizes, arabic_share, payloads):
+        self.endpoints, self.endpoint_weights = zip(*mix.items())
+        self.sizes, self.size_weights = zip(*sizes.items())
+        self.arabic_share = arabic_share
+        self.payloads = payloads
+
+    def pick(self, rng):
+        endpoint = rng.choices(self.endpoints, self.endpoint_weights)[0]
+        size = rng.choices(self.sizes, self.size_weights)[0]
+        language = "ar" if rng.random() < self.arabic_share else "en"
+        return endpoint, rng.choice(self.payloads[endpoint][(size, language)])
+
+
+def percentiles(timings):
+    if not timings:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    return {
+        "p50_ms": round(1000 * float(np.percentile(timings, 50)), 1),
+        "p95_ms": round(1000 * float(np.percentile(timings, 95)), 1),
+        "p99_ms": round(1000 * float(np.percentile(timings, 99)), 1),
+        "mean_ms": round(1000 * float(np.mean(timings)), 1)
+    }
+
+
+def process_tree_cpu_seconds(pid):
+    """CPU seconds used so far by a process and its descendants; None where /proc is unavailable"""
+    try:
+        parents, times = {}, {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f'/proc/{entry}/stat') as f:
+                    fields = f.read().rsplit(')', 1)[1].split()
+            except OSError:
+                continue
+            parents[int(entry)] = int(fields[1])
+            times[int(entry)] = int(fields[11]) + int(fields[12])
+    except OSError:
+        return None
+    tree, added = {pid}, True
+    while added:
+        children = {child for child, parent in parents.items() if parent in tree} - tree
+        tree |= children
+        added = bool(children)
+    return sum(times.get(process, 0) for process in tree) / os.sysconf('SC_CLK_TCK')
+
+
+def run_level(base_url, picker, concurrency, duration, seed=0, server_pid=None, timeout=300):
+    """Run `concurrency` closed-loop clients for `duration` seconds and summarize their requests"""
+    url = urllib.parse.urlsplit(base_url)
+    samples = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(index):
+        rng = random.Random(f"{seed}-{concurrency}-{index}")
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+        while time.monotonic() < deadline:
+            endpoint, body = picker.pick(rng)
+            started = time.perf_counter()
+            try:
+                connection.request('POST', ENDPOINTS[endpoint][0], body, {'Content-Type': 'application/json'})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                status = None
+                connection.close()
+                connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=timeout)
+            with lock:
+                samples.append((endpoint, status, time.perf_counter() - started))
+        connection.close()
+
+    cpu_before = process_tree_cpu_seconds(server_pid) if server_pid else None
+    started = time.monotonic()
+    threads = [threading.Thread(target=client, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    cpu_after = process_tree_cpu_seconds(server_pid) if server_pid else None
+
+    succeeded = [seconds for _, status, seconds in samples if status == 200]
+    level = {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": len(samples),
+        "errors": len(samples) - len(succeeded),
+        "error_rate": round((len(samples) - len(succeeded)) / len(samples), 4) if samples else None,
+        "throughput": round(len(succeeded) / elapsed, 2),
+        **percentiles(succeeded),
+        "server_cpu_cores": round((cpu_after - cpu_before) / elapsed, 2) if cpu_before is not None and cpu_after is not None else None,
+        "endpoints": {}
+    }
+    for endpoint in sorted({endpoint for endpoint, _, _ in samples}):
+        timings = [seconds for name, status, seconds in samples if name == endpoint and status == 200]
+        level["endpoints"][endpoint] = {
+            "requests": sum(1 for name, _, _ in samples if name == endpoint),
+            "errors": sum(1 for name, status, _ in samples if name == endpoint and status != 200),
+            **percentiles(timings)
+        }
+    return level
+
+
+def find_saturation(levels, min_gain=0.1):
+    """Last level whose throughput beat the best so far by at least `min_gain`"""
+    saturation = levels[0]
+    for level in levels[1:]:
+        if level["throughput"] >= saturation["throughput"] * (1 + min_gain):
+            saturation = level
+    return saturation
+
+
+def find_knee(levels):
+    """Level with the highest throughput per second of mean latency (the optimal operating point)"""
+    usable = [level for level in levels if level["mean_ms"]]
+    return max(usable, key=lambda level: level["throughput"] / level["mean_ms"], default=None)
+
+
+def recommend(runs, cpu_request, headroom=0.8, tolerance=0.9):
+    """Worker count and autoscaling thresholds from the sweeps of each worker count
+
+    The smallest worker count whose knee throughput is within `tolerance` of
+    the best is recommended. Autoscaling targets `headroom` of the load at
+    its knee, as in-flight requests, requests per second and CPU utilization
+    relative to the pod's CPU request (cores), which is what the
+    HorizontalPodAutoscaler compares against.
+    """
+    candidates = [run for run in runs if run["knee"]]
+    if not candidates:
+        return None
+    best = max(run["knee"]["throughput"] for run in candidates)
+    chosen = min((run for run in candidates if run["knee"]["throughput"] >= tolerance * best),
+                 key=lambda run: run["workers"])
+    knee = chosen["knee"]
+    recommendation = {
+        "WEB_CONCURRENCY": chosen["workers"],
+        "max_requests_per_second_per_pod": knee["throughput"],
+        "target_requests_per_second_per_pod": round(headroom * knee["throughput"], 2),
+        "target_in_flight_requests_per_pod": max(1, int(headroom * knee["concurrency"])),
+        "p95_ms_at_target": knee["p95_ms"],
+        "saturation_concurrency": chosen["saturation"]["concurrency"],
+        "target_cpu_utilization": None
+    }
+    if knee.get("server_cpu_cores") and cpu_request:
+        utilization = 100 * headroom * knee["server_cpu_cores"] / cpu_request
+        # Kubernetes accepts utilizations above 100% of the request
+        recommendation["target_cpu_utilization"] = max(10, int(utilization // 5 * 5))
+    return recommendation
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_until_ready(base_url, process, timeout):
+    deadline = time.monotonic() + timeout
+    url = urllib.parse.urlsplit(base_url)
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=5)
+            connection.request('GET', '/health/ready')
+            if connection.getresponse().status == 200:
+                return
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+
+def start_server(workers, threads, stub_latency, work_directory, log):
+    """gunicorn with the stand-in models on a free local port; returns (process, url)"""
+    port = free_port()
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        WEB_CONCURRENCY=str(workers),
+        WEB_THREADS=str(threads),
+        PRELOAD_MODELS='',
+        READY_MODELS='',
+        RESULT_CACHE_ENABLED='false',
+        FINGERPRINT_ENABLED='false',
+        STUB_LATENCY_SCALE=str(stub_latency),
+        STUB_BURN_CPU='true',
+        JOB_QUEUE_DB=os.path.join(work_directory, f'jobs-{workers}.db'),
+        PROMETHEUS_MULTIPROC_DIR=os.path.join(work_directory, f'metrics-{workers}')
+    )
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--pythonpath', BENCHMARKS_DIRECTORY, 'stub_app:app'],
+        cwd=ML_DIRECTORY, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def sweep(base_url, picker, levels, duration, seed, server_pid, max_error_rate):
+    """Run increasing concurrency levels, stopping once errors exceed `max_error_rate`"""
+    results = []
+    for concurrency in levels:
+        level = run_level(base_url, picker, concurrency, duration, seed, server_pid)
+        print(json.dumps({key: value for key, value in level.items() if key != "endpoints"}), file=sys.stderr)
+        results.append(level)
+        if level["error_rate"] is not None and level["error_rate"] > max_error_rate:
+            break
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default=None, help='drive this running instance instead of starting local servers')
+    parser.add_argument('--workers', default='1,2,4', help='comma-separated WEB_CONCURRENCY values to start')
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '4')), help='WEB_THREADS per worker')
+    parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='comma-separated client counts')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per concurrency level')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"endpoint:weight list of {', '.join(ENDPOINTS)}")
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='characters:weight list of payload sizes')
+    parser.add_argument('--arabic-share', type=float, default=0.3)
+    parser.add_argument('--stub-latency', type=float, default=1.0, help='scale of the stand-in inference time')
+    parser.add_argument('--min-gain', type=float, default=0.1, help='throughput gain a level needs to count as unsaturated')
+    parser.add_argument('--max-error-rate', type=float, default=0.05)
+    parser.add_argument('--cpu-request', type=float, default=0.5, help='CPU request of the pod in cores')
+    parser.add_argument('--headroom', type=float, default=0.8, help='share of the knee load to scale out at')
+    parser.add_argument('--ready-timeout', type=float, default=300)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    mix = parse_weights(args.mix)
+    unknown = set(mix) - set(ENDPOINTS)
+    if unknown:
+        raise SystemExit(f"Unknown endpoints {', '.join(sorted(unknown))}, expected some of {', '.join(ENDPOINTS)}")
+    sizes = parse_weights(args.sizes, int)
+    levels = [int(level) for level in args.concurrency.split(',') if level]
+    picker = RequestPicker(mix, sizes, args.arabic_share, build_payloads(mix, sizes, args.arabic_share, args.seed))
+
+    runs = []
+    work_directory = tempfile.mkdtemp(prefix='ml-load-test-')
+    try:
+        for workers in ([None] if args.url else [int(workers) for workers in args.workers.split(',') if workers]):
+            process = None
+            base_url = args.url
+            if base_url is None:
+                log = open(os.path.join(work_directory, f'server-{workers}.log'), 'w')
+                process, base_url = start_server(workers, args.threads, args.stub_latency, work_directory, log)
+            try:
+                wait_until_ready(base_url, process, args.ready_timeout)
+                print(f"Load testing {base_url} with {workers or 'remote'} workers", file=sys.stderr)
+                results = sweep(base_url, picker, levels, args.duration, args.seed,
+                                process.pid if process else None, args.max_error_rate)
+            finally:
+                if process is not None:
+                    stop_server(process)
+                    log.close()
+            runs.append({
+                "workers": workers,
+                "threads": args.threads if process else None,
+                "levels": results,
+                "saturation": find_saturation(results, args.min_gain),
+                "knee": find_knee(results)
+            })
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "url": args.url,
+            "models": "remote" if args.url else "stub",
+            "stub_latency": None if args.url else args.stub_latency,
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "mix": mix,
+            "sizes": sizes,
+            "arabic_share": args.arabic_share,
+            "seed": args.seed
+        },
+        "runs": runs,
+        "recommendation": recommend(runs, args.cpu_request, args.headroom)
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Latency, throughput and memory benchmarks of the analysis helpers and endpoints
+
+Runs each benchmark on synthetic English and Arabic contracts of several
+sizes (see corpus.py) and reports, per benchmark, language and size, the
+latency percentiles (p50, p95, p99, mean), the throughput in calls and
+characters per second and the peak resident memory of the process so far.
+Helpers get a fresh DocumentContext per call and the result cache and the
+fingerprint store are disabled, so every call does the full work. Endpoints
+are called through the Flask test client, without network.
+
+With --models stub (the default) the models are the deterministic stand-ins
+of stub_models.py, so runs are comparable between machines and commits and
+measure the service's own overhead; --models real loads the configured
+models. Pass the JSON of an earlier run as --baseline to add the change of
+each p50 and throughput.
+
+Usage: python benchmarks/run_benchmarks.py [--models stub|real] [--sizes 2000,20000,100000]
+       [--languages en,ar] [--repeat 20] [--only analyze] [--baseline before.json] [--output after.json]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+# The service settings are read when app.py is imported
+os.environ['RESULT_CACHE_ENABLED'] = 'false'
+os.environ['FINGERPRINT_ENABLED'] = 'false'
+os.environ.setdefault('PRELOAD_MODELS', '')
+
+# Add the parent directory to sys.path to import app.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as service
+from document_context import DocumentContext
+from patterns import scan_contract_text
+
+from corpus import generate_contract
+from stub_models import install_stub_models
+
+QUESTION = "Which law governs the agreement?"
+
+
+def helper_benchmarks():
+    """Benchmarks calling one helper with (text, language)"""
+    return {
+        "split_sentences": lambda text, language: service.split_sentences(text),
+        "scan_contract_text": lambda text, language: scan_contract_text(text),
+        "analyze_contract_clauses": lambda text, language: service.analyze_contract_clauses(DocumentContext(text, language)),
+        "classify_document_type": lambda text, language: service.classify_document_context(DocumentContext(text, language)),
+        "extract_entities_with_spacy": lambda text, language: service.extract_entities_with_spacy(DocumentContext(text, language)),
+        "extract_entities_with_transformers": lambda text, language: service.extract_entities_with_transformers(
+            DocumentContext(text, language)
+        ),
+        "summarize_text": lambda text, language: service.summarize_text(DocumentContext(text, language)),
+        "analyze_contract_document": lambda text, language: service.analyze_contract_document(text, language)
+    }
+
+
+def endpoint_benchmarks(client):
+    """Benchmarks posting one document to an endpoint"""
+    def post(path, payload):
+        response = client.post(path, json=payload)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    return {
+        "POST /api/analyze-contract": lambda text, language: post('/api/analyze-contract', {"text": text, "language": language}),
+        "POST /api/extract-entities": lambda text, language: post('/api/extract-entities', {"text": text, "language": language}),
+        "POST /api/classify-document": lambda text, language: post('/api/classify-document', {"text": text, "language": language}),
+        "POST /api/summarize": lambda text, language: post('/api/summarize', {"text": text}),
+        "POST /api/answer-question": lambda text, language: post('/api/answer-question', {"text": text, "question": QUESTION}),
+        "POST /api/analyze-sentiment": lambda text, language: post('/api/analyze-sentiment', {"text": text}),
+        "POST /api/analyze-contract/batch": lambda text, language: post(
+            '/api/analyze-contract/batch', {"documents": [{"id": str(i), "text": text, "language": language} for i in range(4)]}
+        )
+    }
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process (ru_maxrss is in KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2**20 if sys.platform == 'darwin' else peak / 2**10, 1)
+
+
+def measure(function, text, language, repeat):
+    """Latency statistics of `repeat` calls after one untimed warm-up call"""
+    function(text, language)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text, language)
+        timings.append(time.perf_counter() - started)
+    total = sum(timings)
+    return {
+        "calls": repeat,
+        "p50_ms": round(1000 * float(np.percentile(timings, 50)), 3),
+        "p95_ms": round(1000 * float(np.percentile(timings, 95)), 3),
+        "p99_ms": round(1000 * float(np.percentile(timings, 99)), 3),
+        "mean_ms": round(1000 * total / repeat, 3),
+        "calls_per_second": round(repeat / total, 2) if total else None,
+        "characters_per_second": round(repeat * len(text) / total) if total else None,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def result_key(result):
+    return result["benchmark"], result["language"], result["characters"]
+
+
+def compare(results, baseline):
+    """Add the change of p50 latency and throughput against a baseline run"""
+    previous = {result_key(result): result for result in baseline["results"]}
+    for result in results:
+        before = previous.get(result_key(result))
+        if before is None or "error" in before or "error" in result:
+            continue
+        result["baseline_p50_ms"] = before["p50_ms"]
+        result["p50_change"] = round(result["p50_ms"] / before["p50_ms"] - 1, 3) if before["p50_ms"] else None
+        if before.get("calls_per_second") and result.get("calls_per_second"):
+            result["throughput_change"] = round(result["calls_per_second"] / before["calls_per_second"] - 1, 3)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models', choices=['stub', 'real'], default='stub')
+    parser.add_argument('--stub-latency', type=float, default=1.0,
+                        help='scale of the simulated inference time of the stub models (0 for none)')
+    parser.add_argument('--sizes', default='2000,20000,100000', help='comma-separated document sizes in characters')
+    parser.add_argument('--languages', default='en,ar')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', default=None, help='run only benchmarks whose name contains this text')
+    parser.add_argument('--baseline', default=None, help='JSON output of an earlier run to compare with')
+    parser.add_argument('--output', default=None, help='write the JSON here instead of stdout')
+    args = parser.parse_args()
+
+    if args.models == 'stub':
+        install_stub_models(service, args.stub_latency)
+
+    benchmarks = {**helper_benchmarks(), **endpoint_benchmarks(service.app.test_client())}
+    if args.only:
+        benchmarks = {name: function for name, function in benchmarks.items() if args.only in name}
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    languages = [language for language in args.languages.split(',') if language]
+
+    results = []
+    for name, function in benchmarks.items():
+        for language in languages:
+            for size in sizes:
+                text = generate_contract(size, language, args.seed)
+                result = {"benchmark": name, "language": language, "characters": size}
+                try:
+                    result.update(measure(function, text, language, args.repeat))
+                except Exception as e:
+                    result["error"] = str(e)
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "models": args.models,
+            "stub_latency": args.stub_latency if args.models == 'stub' else None,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "peak_rss_mb": peak_rss_mb()
+        },
+        "results": results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+"""WSGI entry point serving app.py with the stand-in models of stub_models.py
+
+Used by load_test.py to run the real server configuration without model
+downloads: gunicorn -c gunicorn.conf.py --pythonpath benchmarks stub_app:app
+(with PRELOAD_MODELS empty so the real models are not loaded first).
+STUB_LATENCY_SCALE scales the simulated inference time and STUB_BURN_CPU
+makes it spin on a core instead of sleeping.
+"""
+import os
+
+import app as service
+from stub_models import install_stub_models
+
+install_stub_models(
+    service,
+    latency_scale=float(os.getenv('STUB_LATENCY_SCALE', '1.0')),
+    burn_cpu=os.getenv('STUB_BURN_CPU', 'true').lower() == 'true'
+)
+# Loaded in the gunicorn master and shared by the workers, like the real models
+service.model_registry.preload(service.model_registry.keys())
+
+app = service.app
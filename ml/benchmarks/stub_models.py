@@ -0,0 +1,159 @@
+"""Deterministic stand-ins for the spaCy and transformer models
+
+The stand-ins return output in the format of the real pipelines, computed
+from the input text alone, and take a time proportional to the input to
+hold a worker like real inference would. By default they sleep (without
+holding the GIL); with burn_cpu they spin instead, using one core each like
+single-threaded inference, so load tests saturate on CPU. Batches pay the
+fixed cost once, so micro-batching and nlp.pipe still pay off. They have no
+tokenizer, so windowing and chunking fall back to word counts.
+
+Use install_stub_models() before the first request to benchmark or load test
+the service without model downloads or a GPU.
+"""
+import hashlib
+import re
+import time
+
+# Seconds per call and per 1000 input characters; the summarizer and the QA
+# model cost more per character, like their real counterparts
+CALL_SECONDS = 0.002
+SECONDS_PER_1K_CHARS = 0.001
+TASK_COST = {"summarization": 8.0, "question-answering": 2.0}
+
+ENTITY_PATTERN = re.compile(
+    r"\b(?P<ORG>(?:[A-Z][a-z]+ )+(?:Corporation|Company|LLC|Inc\.|Ltd\.))"
+    r"|\b(?P<PER>(?:John Smith|Sarah Johnson|Ahmed Al-Farsi|Layla Haddad))"
+    r"|\b(?P<LOC>(?:Riyadh|Jeddah|Dubai|London))\b"
+)
+SPACY_LABELS = {"ORG": "ORG", "PER": "PERSON", "LOC": "GPE"}
+
+
+def text_score(text):
+    """Stable pseudo-random score in [0.5, 1) derived from a text"""
+    digest = hashlib.md5(text.encode("utf-8")).digest()
+    return 0.5 + int.from_bytes(digest[:2], "big") / 2**17
+
+
+def simulate_inference(seconds, burn_cpu=False):
+    if seconds <= 0:
+        return
+    if not burn_cpu:
+        time.sleep(seconds)
+        return
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def find_entities(text):
+    return [(match.lastgroup, match.group(), match.start(), match.end()) for match in ENTITY_PATTERN.finditer(text)]
+
+
+class StubPipeline:
+    """Stand-in for a transformers pipeline of one task"""
+
+    tokenizer = None
+
+    def __init__(self, task, latency_scale=1.0, burn_cpu=False):
+        self.task = task
+        self.latency_scale = latency_scale
+        self.burn_cpu = burn_cpu
+
+    def _wait(self, texts):
+        characters = sum(len(text) for text in texts)
+        cost = TASK_COST.get(self.task, 1.0)
+        seconds = CALL_SECONDS + cost * SECONDS_PER_1K_CHARS * characters / 1000
+        simulate_inference(self.latency_scale * seconds, self.burn_cpu)
+
+    def _predict(self, text, question=None, max_length=150, **kwargs):
+        if self.task == "question-answering":
+            words = list(re.finditer(r"\S+", text))[:5]
+            if not words:
+                return {"answer": "", "score": 0.0, "start": 0, "end": 0}
+            start, end = words[0].start(), words[-1].end()
+            return {"answer": text[start:end], "score": text_score(question + text), "start": start, "end": end}
+        if self.task == "summarization":
+            return {"summary_text": " ".join(text.split()[:max_length])}
+        if self.task == "ner":
+            return [
+                {"entity_group": label, "word": word, "score": text_score(word), "start": start, "end": end}
+                for label, word, start, end in find_entities(text)
+            ]
+        score = text_score(text)
+        if self.task == "sentiment-analysis":
+            labels = [f"{stars} stars" for stars in range(1, 6)]
+            prediction = {"label": f"{int(score * 10) - 4} stars", "score": score}
+        else:
+            labels = ["POSITIVE", "NEGATIVE"]
+            prediction = {"label": "POSITIVE" if score >= 0.75 else "NEGATIVE", "score": score}
+        if "top_k" not in kwargs:
+            return prediction
+        # With top_k the classifiers return the scores of that many labels (all for None), best first
+        rest = (1 - score) / (len(labels) - 1)
+        ranked = [prediction] + [{"label": label, "score": rest} for label in labels if label != prediction["label"]]
+        return ranked if kwargs["top_k"] is None else ranked[:kwargs["top_k"]]
+
+    def __call__(self, inputs=None, question=None, context=None, **kwargs):
+        if self.task == "question-answering":
+            single = isinstance(question, str)
+            questions, contexts = ([question], [context]) if single else (question, context)
+            self._wait(contexts)
+            answers = [self._predict(text, question=asked) for asked, text in zip(questions, contexts)]
+            return answers[0] if single else answers
+
+        single = isinstance(inputs, str)
+        texts = [inputs] if single else list(inputs)
+        self._wait(texts)
+        outputs = [self._predict(text, **kwargs) for text in texts]
+        # Classifiers (without top_k) and the summarizer wrap a single input's result in a list
+        if single:
+            return outputs[0] if self.task == "ner" or "top_k" in kwargs else [outputs[0]]
+        return outputs
+
+
+class StubEntity:
+    def __init__(self, text, label):
+        self.text = text
+        self.label_ = label
+
+
+class StubDoc:
+    def __init__(self, text):
+        self.text = text
+        self.ents = [StubEntity(word, SPACY_LABELS[label]) for label, word, _, _ in find_entities(text)]
+
+
+class StubSpacy:
+    """Stand-in for a spaCy pipeline with only entity recognition"""
+
+    max_length = 1000000
+    pipe_names = ["ner"]
+
+    def __init__(self, latency_scale=1.0, burn_cpu=False):
+        self.latency_scale = latency_scale
+        self.burn_cpu = burn_cpu
+
+    def pipe(self, texts, batch_size=None, n_process=1):
+        texts = list(texts)
+        characters = sum(len(text) for text in texts)
+        seconds = CALL_SECONDS + SECONDS_PER_1K_CHARS * characters / 1000
+        simulate_inference(self.latency_scale * seconds, self.burn_cpu)
+        return [StubDoc(text) for text in texts]
+
+    def __call__(self, text):
+        return self.pipe([text])[0]
+
+
+def install_stub_models(service, latency_scale=1.0, burn_cpu=False):
+    """Register the stand-ins under every model name of the service (app.py)
+
+    Loaded models are evicted first so the stand-ins take effect immediately.
+    """
+    registry = service.model_registry
+    for name in service.SPACY_PACKAGES:
+        registry.evict(name)
+        registry.register(name, lambda: StubSpacy(latency_scale, burn_cpu))
+    for name, (task, _, _) in service.TRANSFORMER_MODELS.items():
+        registry.evict(name)
+        registry.register(name, lambda task=task: StubPipeline(task, latency_scale, burn_cpu))
@@ -0,0 +1,329 @@
+import logging
+import os
+import threading
+from bisect import bisect_right
+
+from nltk.tokenize import sent_tokenize
+
+from artifacts import MissingArtifactError, ensure_nltk_data, nltk_data_directory
+from document_context import DocumentContext
+from metrics import timed
+from term_matcher import TermMatcher
+from patterns import (
+    compiled_contract_patterns, scan_contract_text, find_dates, find_monetary_values, arabic_character_count
+)
+
+logger = logging.getLogger(__name__)
+
+# NLTK data lives with the models; in offline mode it must have been baked there
+NLTK_DATA_DIR = os.getenv('NLTK_DATA_DIR', nltk_data_directory(os.getenv('MODEL_PATH', '/app/models')))
+OFFLINE_MODE = os.getenv('OFFLINE_MODE', 'false').lower() == 'true'
+
+# NLTK resources are downloaded the first time a tokenizer is needed
+nltk_resources_lock = threading.Lock()
+nltk_resources_ready = False
+
+def ensure_nltk_resources():
+    """Find or download necessary NLTK data once per process"""
+    global nltk_resources_ready
+    if nltk_resources_ready:
+        return
+    with nltk_resources_lock:
+        if nltk_resources_ready:
+            return
+        try:
+            ensure_nltk_data(NLTK_DATA_DIR, offline=OFFLINE_MODE)
+        except MissingArtifactError:
+            raise
+        except Exception as e:
+            logger.error(f"Error downloading NLTK resources: {e}")
+        nltk_resources_ready = True
+
+@timed("split_sentences")
+def split_sentences(text):
+    """Split text into sentences with the NLTK tokenizer"""
+    ensure_nltk_resources()
+    return sent_tokenize(text)
+
+# Contract clause risk assessment rules
+risk_assessment_rules = {
+    "high_risk_terms": [
+        "unlimited liability", "sole discretion", "unilateral", "without notice", 
+        "without cause", "without limitation", "without consent", "irrevocable", 
+        "perpetual", "unrestricted", "unconditional", "non-negotiable"
+    ],
+    "medium_risk_terms": [
+        "reasonable efforts", "commercially reasonable", "material breach", 
+        "substantial", "significant", "best efforts", "good faith"
+    ],
+    "low_risk_terms": [
+        "mutual", "reasonable notice", "written consent", "written notice", 
+        "limited liability", "reasonable time", "jointly"
+    ]
+}
+
+# Document type classification rules
+document_types = {
+    "contract": ["agreement", "contract", "terms", "conditions", "covenant", "deed", "license"],
+    "legal_opinion": ["opinion", "legal opinion", "advice", "counsel", "recommendation"],
+    "court_filing": ["complaint", "motion", "petition", "pleading", "brief", "memorandum", "affidavit"],
+    "corporate_document": ["bylaws", "articles", "incorporation", "resolution", "minutes", "certificate"],
+    "regulatory_filing": ["filing", "report", "disclosure", "compliance", "regulatory", "statement"]
+}
+
+# Literal keywords, one of which must occur in a sentence for its contract pattern to match
+clause_triggers = {
+    "effective_date": ["effective"],
+    "termination_date": ["terminat", "expir", "end"],
+    "payment_terms": ["payment"],
+    "governing_law": ["law"],
+    "parties": ["between", "among", "party"],
+    "confidentiality": ["confidential", "non-disclosure"],
+    "indemnification": ["indemnif", "hold"],
+    "limitation_of_liability": ["limit"],
+    "force_majeure": ["force", "act"],
+    "dispute_resolution": ["dispute", "arbitration", "mediation"]
+}
+
+# One automaton for all rule terms, built once at startup
+legal_term_matcher = TermMatcher({
+    **{f"risk:{level}": terms for level, terms in risk_assessment_rules.items()},
+    **{f"document_type:{doc_type}": keywords for doc_type, keywords in document_types.items()},
+    **{f"clause:{clause_type}": triggers for clause_type, triggers in clause_triggers.items()}
+})
+
+# Helper functions
+def scan_legal_terms(text, text_lower=None):
+    """Find risk terms, document type keywords and clause triggers in one pass
+
+    Returns {"risk": ..., "document_type": ..., "clause": ...}, each mapping a
+    rule name to the {term: positions} found for it.
+    """
+    grouped = legal_term_matcher.group_hits(legal_term_matcher.scan(text, text_lower))
+    term_hits = {"risk": {}, "document_type": {}, "clause": {}}
+    for group, terms in grouped.items():
+        kind, name = group.split(":", 1)
+        term_hits[kind][name] = terms
+    return term_hits
+
+def locate_sentences(text, sentences):
+    """Character offsets of each sentence in the text, or None if one is not found"""
+    spans = []
+    position = 0
+    for sentence in sentences:
+        start = text.find(sentence, position)
+        if start == -1:
+            return None
+        spans.append((start, start + len(sentence)))
+        position = start + len(sentence)
+    return spans
+
+# Per-request document derivations, each computed at most once per DocumentContext
+def context_language(context):
+    """Language given with the request, or detected from the text"""
+    return context.get("language", lambda c: detect_language(c.text))
+
+def context_sentences(context):
+    """Sentences of the document"""
+    return context.get("sentences", lambda c: split_sentences(c.text))
+
+def context_sentence_spans(context):
+    """Character offsets of the document sentences, or None if they cannot be recovered"""
+    return context.get("sentence_spans", lambda c: locate_sentences(c.text, context_sentences(c)))
+
+def context_term_hits(context):
+    """Rule term matches of the whole document"""
+    return context.get("term_hits", find_term_hits)
+
+@timed("scan_legal_terms")
+def find_term_hits(context):
+    """Scan the whole document for risk terms, document type keywords and clause triggers"""
+    return scan_legal_terms(context.text, context.text_lower)
+
+def context_contract_fields(context):
+    """Contract dates, payment terms, governing law, parties and amounts"""
+    return context.get("contract_fields", find_contract_fields)
+
+@timed("scan_contract_text")
+def find_contract_fields(context):
+    """Scan the document for all contract fields at once"""
+    return scan_contract_text(context.text, context.text_lower)
+
+def context_dates(context):
+    """Date expressions in the document"""
+    return context.get("dates", lambda c: find_dates(c.text, c.text_lower))
+
+def context_monetary_values(context):
+    """Monetary amounts in the document"""
+    return context.get("monetary_values", lambda c: find_monetary_values(c.text, c.text_lower))
+
+def sentence_clause_candidates(context):
+    """Map each sentence to the clause types whose trigger keywords it contains
+
+    Returns None when sentence positions cannot be recovered, in which case
+    every pattern has to be tried on every sentence.
+    """
+    if len(context.text_lower) != len(context.text):
+        return None
+    spans = context_sentence_spans(context)
+    if spans is None:
+        return None
+    
+    starts = [start for start, _ in spans]
+    ends = [end for _, end in spans]
+    candidates = [set() for _ in spans]
+    for clause_type, terms in context_term_hits(context)["clause"].items():
+        for term, positions in terms.items():
+            for term_start in positions:
+                index = bisect_right(starts, term_start) - 1
+                if index >= 0 and term_start + len(term) <= ends[index]:
+                    candidates[index].add(clause_type)
+    return candidates
+
+def detect_language(text):
+    """Detect if text is primarily in English or Arabic"""
+    # Simple heuristic: check for Arabic characters
+    # If more than 10% of the text contains Arabic characters, consider it Arabic
+    if arabic_character_count(text) > len(text) * 0.1:
+        return "ar"
+    return "en"
+
+def assess_clause_risk(clause_text):
+    """Assess the risk level of a contract clause"""
+    risk_hits = scan_legal_terms(clause_text)["risk"]
+    
+    # Count risk terms
+    high_risk_count = len(risk_hits["high_risk_terms"])
+    medium_risk_count = len(risk_hits["medium_risk_terms"])
+    low_risk_count = len(risk_hits["low_risk_terms"])
+    
+    # Determine risk level
+    if high_risk_count > 0:
+        return "high"
+    elif medium_risk_count > low_risk_count:
+        return "medium"
+    else:
+        return "low"
+
+def score_document_type(context):
+    """Score document types based on keyword presence"""
+    return context.get("document_type_scores", keyword_type_scores)
+
+@timed("score_document_type")
+def keyword_type_scores(context):
+    """Most frequent document type among the keyword hits, with its share of all hits"""
+    keyword_hits = context_term_hits(context)["document_type"]
+    
+    # Count occurrences of type-specific keywords
+    type_scores = {}
+    for doc_type in document_types:
+        type_scores[doc_type] = len(keyword_hits[doc_type])
+    
+    # Find the document type with the highest score
+    max_score = 0
+    doc_type = "unknown"
+    for t, score in type_scores.items():
+        if score > max_score:
+            max_score = score
+            doc_type = t
+    
+    confidence = max_score / (sum(type_scores.values()) or 1)  # Avoid division by zero
+    return doc_type, confidence
+
+def analyze_contract_clauses(context):
+    """Analyze contract text to identify and assess clauses"""
+    return context.get("clauses", find_contract_clauses)
+
+@timed("analyze_contract_clauses")
+def find_contract_clauses(context):
+    """Group sentences into clauses starting at a contract pattern match, with their risk levels"""
+    # Split text into sentences
+    sentences = context_sentences(context)
+    
+    # Clause trigger keywords found in the whole text, per sentence
+    candidates = sentence_clause_candidates(context)
+    
+    # Identify potential clauses
+    clauses = []
+    current_clause = ""
+    current_clause_type = ""
+    
+    for index, sentence in enumerate(sentences):
+        # Check if sentence starts a new clause, trying only patterns whose trigger it contains
+        new_clause_type = None
+        sentence_lower = sentence.lower()
+        for clause_type, pattern in compiled_contract_patterns.items():
+            if candidates is not None and clause_type not in candidates[index]:
+                continue
+            if pattern.search(sentence, sentence_lower):
+                new_clause_type = clause_type
+                break
+        
+        if new_clause_type:
+            # If we have a previous clause, add it to the list
+            if current_clause and current_clause_type:
+                risk_level = assess_clause_risk(current_clause)
+                clauses.append({
+                    "type": current_clause_type,
+                    "text": current_clause.strip(),
+                    "risk_level": risk_level
+                })
+            
+            # Start a new clause
+            current_clause = sentence
+            current_clause_type = new_clause_type
+        elif current_clause_type:
+            # Continue the current clause
+            current_clause += " " + sentence
+    
+    # Add the last clause if there is one
+    if current_clause and current_clause_type:
+        risk_level = assess_clause_risk(current_clause)
+        clauses.append({
+            "type": current_clause_type,
+            "text": current_clause.strip(),
+            "risk_level": risk_level
+        })
+    
+    return clauses
+
+def calculate_contract_risk_score(clauses):
+    """Calculate overall risk score based on clause risk levels"""
+    if not clauses:
+        return 0.0
+    
+    # Assign weights to risk levels
+    risk_weights = {"high": 1.0, "medium": 0.5, "low": 0.1}
+    
+    # Calculate weighted risk score
+    total_weight = 0
+    risk_sum = 0
+    
+    for clause in clauses:
+        risk_level = clause.get("risk_level", "low")
+        risk_sum += risk_weights.get(risk_level, 0.1)
+        total_weight += 1
+    
+    # Normalize to 0-1 range
+    if total_weight > 0:
+        normalized_score = risk_sum / (total_weight * 1.0)
+    else:
+        normalized_score = 0.0
+    
+    return round(normalized_score, 2)
+
+# Context values derived by the rule stages and sent back from worker processes;
+# term hits are left out, being large and only needed to derive the others
+RULE_CONTEXT_VALUES = ("sentences", "contract_fields", "document_type_scores", "clauses")
+
+def rule_analysis(text):
+    """Run the rule-based stages on one document, returning the context values they derive
+
+    Only the text goes in and only plain lists and dicts come out, so the call
+    is cheap to send to a worker process.
+    """
+    context = DocumentContext(text)
+    context_contract_fields(context)
+    score_document_type(context)
+    analyze_contract_clauses(context)
+    return context.export(RULE_CONTEXT_VALUES)
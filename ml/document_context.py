@@ -0,0 +1,49 @@
+import threading
+
+
+class DocumentContext:
+    """Values derived from one document, computed lazily and at most once
+
+    Analysis helpers ask the context for what they need (lowercased text,
+    sentences, term scans, a spaCy Doc...) instead of deriving it from the raw
+    text, so a request that runs several helpers over the same document pays
+    for each derivation once. Values are computed on first access; concurrent
+    requests for the same value wait for the first computation.
+    """
+
+    def __init__(self, text, language=None):
+        self.text = text
+        self._values = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        if language:
+            self._values["language"] = language
+
+    def get(self, name, compute):
+        """Return the value stored under `name`, calling `compute(self)` the first time"""
+        if name in self._values:
+            return self._values[name]
+        with self._lock:
+            key_lock = self._key_locks.setdefault(name, threading.Lock())
+        with key_lock:
+            if name not in self._values:
+                self._values[name] = compute(self)
+        return self._values[name]
+
+    def seed(self, values):
+        """Store values derived elsewhere, keeping any already computed here"""
+        with self._lock:
+            for name, value in values.items():
+                self._values.setdefault(name, value)
+
+    def export(self, names):
+        """The values derived so far among `names`"""
+        return {name: self._values[name] for name in names if name in self._values}
+
+    def computed(self):
+        """Names of the values derived so far"""
+        return sorted(self._values)
+
+    @property
+    def text_lower(self):
+        return self.get("text_lower", lambda context: context.text.lower())
@@ -0,0 +1,216 @@
+import difflib
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from result_cache import normalize_text
+
+SHINGLE_WORDS = 5
+# 32 bands of 4 rows make documents sharing 60% of their shingles candidates
+# with ~99% probability, and those sharing a third of them with ~33%
+NUM_PERMUTATIONS = 128
+BANDS = 32
+MERSENNE_PRIME = (1 << 61) - 1
+
+_generator = np.random.RandomState(1)
+# a and b below 2**31 keep a * x + b within 64 bits for 32-bit shingle hashes
+PERMUTATION_A = _generator.randint(1, 2**31, size=NUM_PERMUTATIONS, dtype=np.uint64)
+PERMUTATION_B = _generator.randint(0, 2**31, size=NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+def fingerprint_text(text):
+    """Normalized form of a text for comparisons: lowercase with collapsed whitespace"""
+    return normalize_text(text).lower()
+
+
+def text_hash(text):
+    """Hash of the normalized text, equal for formatting-only differences"""
+    return hashlib.blake2b(fingerprint_text(text).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def shingle_hashes(text, size=SHINGLE_WORDS):
+    """32-bit hashes of the overlapping `size`-word sequences of a text"""
+    words = fingerprint_text(text).split(' ')
+    shingles = {' '.join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter((zlib.crc32(shingle.encode('utf-8')) for shingle in shingles), dtype=np.uint64)
+
+
+def minhash_signature(text):
+    """MinHash signature of the word shingles of a text"""
+    hashes = shingle_hashes(text)
+    permuted = (np.outer(hashes, PERMUTATION_A) + PERMUTATION_B) % np.uint64(MERSENNE_PRIME) & np.uint64(0xffffffff)
+    return permuted.min(axis=0)
+
+
+def estimated_similarity(signature, other):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return float(np.mean(signature == other))
+
+
+def band_keys(signature):
+    rows = NUM_PERMUTATIONS // BANDS
+    return [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(BANDS)]
+
+
+def clause_fingerprints(clauses):
+    """Type, risk level and normalized hash of each clause; no clause text is kept"""
+    return [
+        {
+            "type": clause["type"],
+            "risk_level": clause.get("risk_level"),
+            "hash": text_hash(clause["text"])
+        }
+        for clause in clauses
+    ]
+
+
+def diff_clauses(clauses, template_clauses):
+    """Compare the clauses of a document with those of its template
+
+    Clauses are matched in order by normalized text. A replaced clause of the
+    same type as its template counterpart is reported as changed; others as
+    added or removed.
+    """
+    hashes = [clause["hash"] for clause in clauses]
+    template_hashes = [clause["hash"] for clause in template_clauses]
+    unchanged, changed, added, removed = 0, [], [], []
+    for operation, template_start, template_end, start, end in difflib.SequenceMatcher(
+            None, template_hashes, hashes, autojunk=False).get_opcodes():
+        if operation == "equal":
+            unchanged += end - start
+            continue
+        indexes = list(range(start, end))
+        template_indexes = list(range(template_start, template_end))
+        if operation == "replace":
+            for index, template_index in zip(indexes, template_indexes):
+                if clauses[index]["type"] == template_clauses[template_index]["type"]:
+                    changed.append({
+                        "index": index,
+                        "template_index": template_index,
+                        "type": clauses[index]["type"],
+                        "risk_level": clauses[index]["risk_level"],
+                        "template_risk_level": template_clauses[template_index]["risk_level"]
+                    })
+                else:
+                    added.append(index)
+                    removed.append(template_index)
+            paired = min(len(indexes), len(template_indexes))
+            indexes, template_indexes = indexes[paired:], template_indexes[paired:]
+        added.extend(indexes)
+        removed.extend(template_indexes)
+
+    return {
+        "unchanged_clauses": unchanged,
+        "changed_clauses": changed,
+        "added_clauses": [
+            {"index": index, "type": clauses[index]["type"], "risk_level": clauses[index]["risk_level"]}
+            for index in sorted(added)
+        ],
+        "removed_clauses": [
+            {"template_index": index, "type": template_clauses[index]["type"]}
+            for index in sorted(removed)
+        ]
+    }
+
+
+class SummaryMemo:
+    """Summaries of texts by content, seeded with those of a similar document
+
+    Records every summary a document needed (reused or new), so they can be
+    stored with its fingerprint for the next similar document.
+    """
+
+    def __init__(self, known=None):
+        self.known = dict(known or {})
+        self.used = {}
+        self.reused = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, max_length):
+        return f"{max_length}:{text_hash(text)}"
+
+    def get(self, text, max_length):
+        key = self.key(text, max_length)
+        with self._lock:
+            summary = self.known.get(key)
+            if summary is not None:
+                self.used[key] = summary
+                self.reused += 1
+            return summary
+
+    def put(self, text, max_length, summary):
+        with self._lock:
+            self.used[self.key(text, max_length)] = summary
+
+
+class FingerprintStore:
+    """Recently analyzed documents, searchable by near-duplicate similarity
+
+    Each document keeps its MinHash signature, clause fingerprints and the
+    summaries of its chunks. Candidates are found by locality-sensitive
+    hashing of the signature bands; the most similar one at or above
+    `min_similarity` is returned. The oldest documents beyond `max_documents`
+    are forgotten.
+    """
+
+    def __init__(self, max_documents=1000, min_similarity=0.6):
+        self.max_documents = max_documents
+        self.min_similarity = min_similarity
+        self._documents = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._documents)
+
+    def closest(self, text, signature=None):
+        """(document id, entry, similarity) of the most similar stored document, or None"""
+        if signature is None:
+            signature = minhash_signature(text)
+        with self._lock:
+            candidates = set()
+            for key in band_keys(signature):
+                candidates.update(self._buckets.get(key, ()))
+            best = None
+            for document_id in candidates:
+                entry = self._documents[document_id]
+                similarity = estimated_similarity(signature, entry["signature"])
+                if similarity >= self.min_similarity and (best is None or similarity > best[2]):
+                    best = (document_id, entry, similarity)
+            if best is not None:
+                self._documents.move_to_end(best[0])
+            return best
+
+    def add(self, text, clauses, summaries=None, signature=None):
+        """Store the fingerprints of an analyzed document; returns its id"""
+        if signature is None:
+            signature = minhash_signature(text)
+        document_id = text_hash(text)
+        entry = {"signature": signature, "clauses": clause_fingerprints(clauses), "summaries": dict(summaries or {})}
+        with self._lock:
+            if document_id in self._documents:
+                self._remove(document_id)
+            self._documents[document_id] = entry
+            for key in band_keys(signature):
+                self._buckets.setdefault(key, set()).add(document_id)
+            while len(self._documents) > self.max_documents:
+                self._remove(next(iter(self._documents)))
+        return document_id
+
+    def _remove(self, document_id):
+        entry = self._documents.pop(document_id)
+        for key in band_keys(entry["signature"]):
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.discard(document_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self._buckets.clear()
@@ -0,0 +1,67 @@
+"""gunicorn settings for the ML service
+
+Run with: gunicorn -c gunicorn.conf.py app:app
+
+The application is imported in the master, which loads the fork-safe models
+(the spaCy pipelines) before forking the workers, so their weights are shared
+copy-on-write instead of being loaded once per worker. The transformer models'
+thread pools do not survive a fork, so each worker loads its own. With
+ENABLE_GPU the master does not preload at all. Either way each worker gets an
+equal share of the CPUs for its inference threads and loads and warms up the
+READY_MODELS (all by default) in the background; readiness fails until it is done.
+"""
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = "gthread"
+threads = int(os.getenv('WEB_THREADS', '4'))
+# Long analyses must not trip the worker timeout; the warm-up runs in the background
+timeout = int(os.getenv('WEB_TIMEOUT', '300'))
+graceful_timeout = int(os.getenv('WEB_GRACEFUL_TIMEOUT', '60'))
+accesslog = "-"
+
+# CUDA state does not survive a fork, so GPU workers load their own models
+# (in the background warm-up that post_worker_init starts)
+gpu = os.getenv('ENABLE_GPU', 'false').lower() == 'true'
+preload_app = os.getenv('WEB_PRELOAD', 'false' if gpu else 'true').lower() == 'true'
+if preload_app:
+    os.environ.setdefault('PRELOAD_MODELS', 'all')
+    # The master only preloads the models that survive the fork
+    os.environ['FORK_WORKERS'] = 'true'
+
+# Split the CPUs between workers; the thread pools read these when first imported
+inference_threads = int(os.getenv('INFERENCE_THREADS', '0')) or max(1, (os.cpu_count() or 1) // workers)
+os.environ['INFERENCE_THREADS'] = str(inference_threads)
+for variable in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+    os.environ.setdefault(variable, str(inference_threads))
+# Tokenizers used before a fork would otherwise disable their parallelism with a warning
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+# Sizes RULE_PROCESS_WORKERS=auto
+os.environ.setdefault('WEB_CONCURRENCY', str(workers))
+
+# Each worker writes its metrics to files here and /metrics merges them; values
+# left from a previous run are cleared
+metrics_directory = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ml-service-metrics')
+)
+shutil.rmtree(metrics_directory, ignore_errors=True)
+os.makedirs(metrics_directory, exist_ok=True)
+
+
+def when_ready(server):
+    if preload_app:
+        from app import prepare_fork
+        prepare_fork()
+
+
+def post_worker_init(worker):
+    from app import init_worker
+    init_worker()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,179 @@
+import glob
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+logger = logging.getLogger(__name__)
+
+# "default" is the plain transformers pipeline; the ONNX backends need the
+# optional optimum[onnxruntime] (requirements-onnx.txt), which installs PyTorch
+DEFAULT_BACKEND = "default"
+ONNX_BACKEND = "onnx"
+ONNX_INT8_BACKEND = "onnx-int8"
+BACKENDS = (DEFAULT_BACKEND, ONNX_BACKEND, ONNX_INT8_BACKEND)
+
+# optimum model class for each pipeline task
+ORT_MODEL_CLASSES = {
+    "text-classification": "ORTModelForSequenceClassification",
+    "sentiment-analysis": "ORTModelForSequenceClassification",
+    "ner": "ORTModelForTokenClassification",
+    "token-classification": "ORTModelForTokenClassification",
+    "question-answering": "ORTModelForQuestionAnswering",
+    "summarization": "ORTModelForSeq2SeqLM"
+}
+
+# Marker written once an artifact directory is complete
+COMPLETE_MARKER = "export-complete"
+
+# Backend actually serving each model, for the health endpoint
+active_backends = {}
+
+
+def parse_model_backends(value):
+    """Parse "name=backend,name=backend" into a dict, ignoring unknown backends"""
+    backends = {}
+    for item in value.split(','):
+        if '=' not in item:
+            continue
+        name, backend = (part.strip() for part in item.split('=', 1))
+        if backend not in BACKENDS:
+            logger.warning(f"Unknown inference backend '{backend}' for {name}, using {DEFAULT_BACKEND}")
+            continue
+        backends[name] = backend
+    return backends
+
+
+def artifact_directory(cache_dir, model_id, backend):
+    """Where converted artifacts of a model are cached"""
+    return os.path.join(cache_dir, backend, model_id.replace('/', '__'))
+
+
+def ort_model_class(task):
+    import optimum.onnxruntime
+    if task not in ORT_MODEL_CLASSES:
+        raise ValueError(f"No ONNX Runtime model class for task '{task}'")
+    return getattr(optimum.onnxruntime, ORT_MODEL_CLASSES[task])
+
+
+def build_artifact(directory, build):
+    """Run `build(staging_directory)` and move the result into place atomically
+
+    Several workers may convert the same model at once; the first finished
+    copy wins and the others are discarded.
+    """
+    if os.path.exists(os.path.join(directory, COMPLETE_MARKER)):
+        return directory
+    parent = os.path.dirname(directory)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+    try:
+        build(staging)
+        open(os.path.join(staging, COMPLETE_MARKER), 'w').close()
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            if not os.path.exists(os.path.join(directory, COMPLETE_MARKER)):
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return directory
+
+
+def export_onnx(task, model_id, cache_dir, source=None):
+    """Export a model to ONNX under `cache_dir`, unless already exported"""
+    def build(staging):
+        from transformers import AutoTokenizer
+        started = time.time()
+        model = ort_model_class(task).from_pretrained(source or model_id, export=True)
+        model.save_pretrained(staging)
+        AutoTokenizer.from_pretrained(source or model_id).save_pretrained(staging)
+        logger.info(f"Exported {model_id} to ONNX in {time.time() - started:.1f}s")
+    return build_artifact(artifact_directory(cache_dir, model_id, ONNX_BACKEND), build)
+
+
+def quantize_onnx(task, model_id, cache_dir, source=None):
+    """Dynamically quantize the ONNX export of a model to int8, unless already done"""
+    source = export_onnx(task, model_id, cache_dir, source)
+
+    def build(staging):
+        from optimum.onnxruntime import ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        started = time.time()
+        config = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+        # Seq2seq exports have several graphs (encoder, decoder, decoder with past)
+        for onnx_file in sorted(glob.glob(os.path.join(source, "*.onnx"))):
+            quantizer = ORTQuantizer.from_pretrained(source, file_name=os.path.basename(onnx_file))
+            quantizer.quantize(save_dir=staging, quantization_config=config)
+        for name in os.listdir(source):
+            if not name.endswith(".onnx") and name != COMPLETE_MARKER and not os.path.exists(os.path.join(staging, name)):
+                shutil.copy(os.path.join(source, name), staging)
+        logger.info(f"Quantized {model_id} to int8 in {time.time() - started:.1f}s")
+    return build_artifact(artifact_directory(cache_dir, model_id, ONNX_INT8_BACKEND), build)
+
+
+def ort_session_options(intra_op_threads):
+    """ONNX Runtime session options limiting the threads of each inference"""
+    import onnxruntime
+    options = onnxruntime.SessionOptions()
+    if intra_op_threads > 0:
+        options.intra_op_num_threads = intra_op_threads
+    return options
+
+
+def load_ort_model(task, directory, quantized, intra_op_threads=0):
+    """Load exported ONNX graphs with ONNX Runtime"""
+    model_class = ort_model_class(task)
+    session_options = ort_session_options(intra_op_threads)
+    if not quantized:
+        return model_class.from_pretrained(directory, session_options=session_options)
+    if task == "summarization":
+        file_names = {
+            "encoder_file_name": "encoder_model_quantized.onnx",
+            "decoder_file_name": "decoder_model_quantized.onnx"
+        }
+        if os.path.exists(os.path.join(directory, "decoder_with_past_model_quantized.onnx")):
+            file_names["decoder_with_past_file_name"] = "decoder_with_past_model_quantized.onnx"
+        else:
+            file_names["use_cache"] = False
+        return model_class.from_pretrained(directory, session_options=session_options, **file_names)
+    return model_class.from_pretrained(directory, file_name="model_quantized.onnx", session_options=session_options)
+
+
+def build_pipeline(task, model_id, backend=DEFAULT_BACKEND, cache_dir=None, device=-1, intra_op_threads=0,
+                   source=None, framework=None, **kwargs):
+    """Build a transformers pipeline served by the requested backend
+
+    Weights are read from the local directory `source` when given, otherwise
+    from the hub. ONNX artifacts are converted on first use and cached under
+    `cache_dir`; `intra_op_threads` (0 for the ONNX Runtime default) bounds
+    their sessions.
+    When the backend cannot be used (missing optimum, failed export, no GPU
+    support...), the plain pipeline is returned instead. It uses `framework`
+    ("tf" or "pt"); transformers would otherwise prefer PyTorch whenever it
+    is installed.
+    """
+    from transformers import pipeline
+
+    if backend != DEFAULT_BACKEND:
+        try:
+            from transformers import AutoTokenizer
+            if cache_dir is None:
+                raise ValueError("No cache directory for converted models")
+            if backend == ONNX_INT8_BACKEND:
+                directory = quantize_onnx(task, model_id, cache_dir, source)
+            else:
+                directory = export_onnx(task, model_id, cache_dir, source)
+            model = load_ort_model(task, directory, quantized=backend == ONNX_INT8_BACKEND,
+                                   intra_op_threads=intra_op_threads)
+            tokenizer = AutoTokenizer.from_pretrained(directory)
+            ort_pipeline = pipeline(task, model=model, tokenizer=tokenizer, **kwargs)
+            active_backends[model_id] = backend
+            return ort_pipeline
+        except Exception as e:
+            logger.warning(f"Could not use the {backend} backend for {model_id}, falling back to {DEFAULT_BACKEND}: {e}")
+
+    default_pipeline = pipeline(task, model=source or model_id, device=device, framework=framework, **kwargs)
+    active_backends[model_id] = DEFAULT_BACKEND
+    return default_pipeline
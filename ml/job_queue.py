@@ -0,0 +1,235 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are waiting"""
+
+
+class JobQueue:
+    """Persistent job queue backed by SQLite, drained by a pool of worker threads
+
+    Jobs survive process restarts and are shared by every process using the
+    same `db_path`; each process runs up to `workers` jobs at a time. The
+    worker running a job refreshes its heartbeat every `heartbeat_interval`
+    seconds; a job whose worker died (no heartbeat for `stale_after` seconds)
+    is queued again, up to `max_attempts` times. Finished jobs are deleted
+    `result_ttl` seconds after they complete. Job ids start with `id_prefix`.
+    """
+
+    def __init__(self, db_path, handlers, workers=2, max_queued=1000, result_ttl=86400,
+                 stale_after=300, heartbeat_interval=30, max_attempts=3, poll_interval=1.0, id_prefix=""):
+        self.db_path = db_path
+        self.id_prefix = id_prefix
+        self.handlers = handlers
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.stale_after = stale_after
+        self.heartbeat_interval = min(heartbeat_interval, stale_after / 3)
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._pid = None
+        self._wakeup = threading.Event()
+        self._last_maintenance = 0.0
+
+    def submit(self, kind, payload):
+        """Queue a job and return its id"""
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job type '{kind}'")
+        job_id = self.id_prefix + uuid.uuid4().hex
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            queued = db.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued >= self.max_queued:
+                raise JobQueueFull(f"Job queue is full ({queued} jobs waiting)")
+            db.execute(
+                "INSERT INTO jobs (id, kind, payload, status, created_at, attempts) VALUES (?, ?, ?, ?, ?, 0)",
+                (job_id, kind, json.dumps(payload), QUEUED, time.time())
+            )
+        self._ensure_workers()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id, include_result=False):
+        """Job status as a dict, or None for an unknown id"""
+        columns = "id, kind, status, created_at, started_at, finished_at, attempts, error"
+        if include_result:
+            columns += ", result"
+        row = self._connection().execute(f"SELECT {columns} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(["id", "type", "status", "created_at", "started_at", "finished_at", "attempts", "error"], row))
+        if include_result:
+            job["result"] = json.loads(row[8]) if row[8] is not None else None
+        if job["error"] is None:
+            del job["error"]
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the job status afterwards
+
+        A running job cannot be interrupted, but its result is discarded.
+        """
+        db = self._connection()
+        with db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING)
+            )
+        return self.get(job_id)
+
+    def stats(self):
+        """Number of jobs per status"""
+        counts = dict(self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in (QUEUED, RUNNING) + FINISHED_STATUSES}
+
+    def start(self):
+        """Start the worker threads of this process"""
+        self._ensure_workers()
+
+    def _connection(self):
+        # One connection per thread; connections must not cross a fork
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, result TEXT, error TEXT, heartbeat_at REAL)"
+            )
+            # Queues created before heartbeats lack the column
+            if "heartbeat_at" not in [column[1] for column in db.execute("PRAGMA table_info(jobs)")]:
+                db.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at)")
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    def _ensure_workers(self):
+        # Worker threads do not survive fork, so start them in each process
+        if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            if self._pid == os.getpid() and all(thread.is_alive() for thread in self._threads):
+                return
+            if self._pid != os.getpid():
+                self._threads = []
+                self._wakeup = threading.Event()
+            self._pid = os.getpid()
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._run, name=f"job-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _claim(self):
+        db = self._connection()
+        now = time.time()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, heartbeat_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, now, now, row[0])
+            )
+        return row
+
+    def _finish(self, job_id, status, result=None, error=None):
+        # Only running jobs are updated, so a cancellation is never overwritten
+        db = self._connection()
+        with db:
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ? AND status = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id, RUNNING)
+            )
+
+    def _heartbeat(self, job_id, done):
+        # Runs beside the job, so it stays fresh however long the handler takes
+        while not done.wait(self.heartbeat_interval):
+            try:
+                db = self._connection()
+                with db:
+                    db.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?",
+                               (time.time(), job_id, RUNNING))
+            except sqlite3.Error as e:
+                logger.warning(f"Error refreshing heartbeat of job {job_id}: {e}")
+
+    def _maintain(self):
+        now = time.time()
+        if now - self._last_maintenance < self.poll_interval * 30:
+            return
+        self._last_maintenance = now
+        db = self._connection()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, error = ? "
+                "WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ? AND attempts >= ?",
+                (FAILED, now, "Job was interrupted too many times", RUNNING, now - self.stale_after, self.max_attempts)
+            )
+            requeued = db.execute(
+                "UPDATE jobs SET status = ? WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+                (QUEUED, RUNNING, now - self.stale_after)
+            ).rowcount
+            db.execute("DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?",
+                       FINISHED_STATUSES + (now - self.result_ttl,))
+        if requeued:
+            logger.warning(f"Requeued {requeued} interrupted jobs")
+
+    def _run(self):
+        while True:
+            try:
+                self._maintain()
+                job = self._claim()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading job queue: {e}")
+                time.sleep(self.poll_interval)
+                continue
+            if job is None:
+                # Jobs submitted by other processes are picked up on the next poll
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            job_id, kind, payload = job
+            logger.info(f"Running {kind} job {job_id}")
+            done = threading.Event()
+            threading.Thread(target=self._heartbeat, args=(job_id, done), name="job-heartbeat", daemon=True).start()
+            try:
+                result = self.handlers[kind](json.loads(payload))
+                self._finish(job_id, SUCCEEDED, result=result)
+            except Exception as e:
+                logger.error(f"Error running {kind} job {job_id}: {e}")
+                try:
+                    self._finish(job_id, FAILED, error=str(e))
+                except sqlite3.Error as db_error:
+                    logger.error(f"Error recording failure of job {job_id}: {db_error}")
+            finally:
+                done.set()
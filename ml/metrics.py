@@ -0,0 +1,95 @@
+import os
+import time
+from functools import wraps
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Latencies from 1 ms to 2 minutes
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+CHARACTER_BUCKETS = (100, 300, 1000, 3000, 10000, 30000, 100000, 300000, 1000000)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 384, 512, 1024)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+helper_seconds = Histogram(
+    "ml_helper_seconds", "Latency of analysis helpers", ["helper"], buckets=LATENCY_BUCKETS
+)
+helper_input_characters = Histogram(
+    "ml_helper_input_characters", "Characters of text handed to analysis helpers", ["helper"],
+    buckets=CHARACTER_BUCKETS
+)
+stage_seconds = Histogram(
+    "ml_analysis_stage_seconds", "Latency of contract analysis stages", ["stage"], buckets=LATENCY_BUCKETS
+)
+model_seconds = Histogram(
+    "ml_model_inference_seconds", "Latency of one model call or batch", ["model"], buckets=LATENCY_BUCKETS
+)
+model_batch_size = Histogram(
+    "ml_model_batch_size", "Inputs per model call", ["model"], buckets=BATCH_BUCKETS
+)
+model_input_tokens = Histogram(
+    "ml_model_input_tokens", "Tokens per model input window", ["model"], buckets=TOKEN_BUCKETS
+)
+batch_queue_seconds = Histogram(
+    "ml_batch_queue_wait_seconds", "Time a request waits in a micro-batcher queue", ["model"],
+    buckets=LATENCY_BUCKETS
+)
+cache_lookups = Counter(
+    "ml_result_cache_lookups", "Result cache lookups, by hit or miss", ["result"]
+)
+http_seconds = Histogram(
+    "ml_http_request_seconds", "Latency of HTTP requests until the response starts", ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+
+def text_size(value):
+    """Characters of a text, a document context or a list of either; None for anything else"""
+    if isinstance(value, str):
+        return len(value)
+    text = getattr(value, "text", None)
+    if isinstance(text, str):
+        return len(text)
+    if isinstance(value, (list, tuple)):
+        sizes = [text_size(item) for item in value]
+        return sum(sizes) if sizes and None not in sizes else None
+    return None
+
+
+def timed(helper, text_arg=0):
+    """Decorator recording the latency of a helper and the size of its positional argument `text_arg`"""
+    def decorate(function):
+        seconds = helper_seconds.labels(helper)
+        characters = helper_input_characters.labels(helper)
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds.observe(time.perf_counter() - started)
+                size = text_size(args[text_arg]) if len(args) > text_arg else None
+                if size is not None:
+                    characters.observe(size)
+        return wrapper
+    return decorate
+
+
+def observe_model_call(model, seconds, batch_size=1):
+    model_seconds.labels(model).observe(seconds)
+    model_batch_size.labels(model).observe(batch_size)
+
+
+def render_metrics():
+    """Metrics in the Prometheus text format and their content type
+
+    With PROMETHEUS_MULTIPROC_DIR set (as gunicorn.conf.py does), the values
+    written by every worker process are merged.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,203 @@
+import gc
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Bytes per parameter used to estimate the footprint of float32 weights
+BYTES_PER_PARAMETER = 4
+
+
+def estimate_model_size(model):
+    """Estimate the memory footprint of a loaded model in bytes"""
+    # Transformers pipelines expose the underlying model as `.model`
+    inner = getattr(model, "model", model)
+    num_parameters = getattr(inner, "num_parameters", None)
+    if callable(num_parameters):
+        try:
+            return int(num_parameters()) * BYTES_PER_PARAMETER
+        except Exception:
+            pass
+    return 0
+
+
+class ModelRegistry:
+    """Registry that loads models on first use and evicts them under a memory budget
+
+    Models are registered with a loader callable and are only built when first
+    requested through `get`. Each model has its own lock so concurrent first
+    requests wait for a single load instead of loading the same weights twice.
+    When `memory_budget` (in bytes) is set, the least recently used models are
+    dropped after a load pushes the total estimated footprint over the budget.
+    A model that fails to load is unavailable until it is retried, first after
+    `retry_after` seconds, then after twice as long each time, up to
+    `max_retry_after`.
+    """
+
+    def __init__(self, memory_budget=0, retry_after=30, max_retry_after=600):
+        self.memory_budget = memory_budget
+        self.retry_after = retry_after
+        self.max_retry_after = max_retry_after
+        self._loaders = {}
+        self._size_hints = {}
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._load_times = {}
+        self._inference_times = {}
+        self._inference_counts = {}
+        self._errors = {}
+        self._failures = {}
+        self._retry_at = {}
+        self._model_locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, size_hint=0):
+        """Register a model loader; `size_hint` (bytes) is used when the size cannot be measured"""
+        with self._lock:
+            self._loaders[name] = loader
+            self._size_hints[name] = size_hint
+            self._model_locks[name] = threading.Lock()
+            self._errors.pop(name, None)
+            self._failures.pop(name, None)
+            self._retry_at.pop(name, None)
+
+    def __contains__(self, name):
+        """A model is available when it is registered and has not failed to load, or is due for a retry"""
+        if name not in self._loaders:
+            return False
+        return name not in self._errors or time.monotonic() >= self._retry_at.get(name, 0)
+
+    def failures(self, name):
+        """Number of consecutive failed loads of a model"""
+        return self._failures.get(name, 0)
+
+    def keys(self):
+        """Names of all available models, loaded or not"""
+        return [name for name in self._loaders if name in self]
+
+    def loaded(self):
+        """Names of the models currently held in memory"""
+        with self._lock:
+            return list(self._models.keys())
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def get(self, name):
+        """Return the named model, loading it on first use; None if unavailable"""
+        if name not in self:
+            return None
+
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+                return model
+
+        with self._model_locks[name]:
+            # Another thread may have finished loading while we waited
+            with self._lock:
+                model = self._models.get(name)
+                if model is not None:
+                    self._models.move_to_end(name)
+                    return model
+            if name not in self:
+                return None
+
+            logger.info(f"Loading model '{name}'")
+            start = time.perf_counter()
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                failures = self._failures.get(name, 0) + 1
+                delay = min(self.max_retry_after, self.retry_after * 2 ** (failures - 1))
+                logger.error(f"Error loading model '{name}' (attempt {failures}, retrying in {delay:.0f}s): {e}")
+                self._failures[name] = failures
+                self._retry_at[name] = time.monotonic() + delay
+                self._errors[name] = str(e)
+                return None
+            elapsed = time.perf_counter() - start
+            self._errors.pop(name, None)
+            self._failures.pop(name, None)
+
+            size = estimate_model_size(model) or self._size_hints.get(name, 0)
+            with self._lock:
+                self._models[name] = model
+                self._sizes[name] = size
+                self._load_times[name] = elapsed
+            logger.info(f"Model '{name}' loaded in {elapsed:.2f}s (~{size / 2**20:.0f} MB)")
+
+        self._enforce_budget(keep=name)
+        return model
+
+    def preload(self, names):
+        """Eagerly load the given models, e.g. from the PRELOAD_MODELS setting"""
+        for name in names:
+            if name not in self._loaders:
+                logger.warning(f"Cannot preload unknown model '{name}'")
+                continue
+            self.get(name)
+
+    def name_of(self, model):
+        """Name under which a loaded model object is held, or None"""
+        with self._lock:
+            return next((name for name, loaded in self._models.items() if loaded is model), None)
+
+    def record_inference(self, name, seconds):
+        """Record the latency of one call (or batch) of a model"""
+        if name is None:
+            return
+        with self._lock:
+            self._inference_times[name] = seconds
+            self._inference_counts[name] = self._inference_counts.get(name, 0) + 1
+
+    def evict(self, name):
+        """Drop a loaded model; it will be reloaded on next use"""
+        with self._lock:
+            model = self._models.pop(name, None)
+            self._sizes.pop(name, None)
+        if model is not None:
+            logger.info(f"Evicted model '{name}'")
+            del model
+            gc.collect()
+            return True
+        return False
+
+    def memory_usage(self):
+        """Total estimated footprint of the loaded models in bytes"""
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _enforce_budget(self, keep=None):
+        if not self.memory_budget:
+            return
+        while self.memory_usage() > self.memory_budget:
+            with self._lock:
+                candidates = [name for name in self._models if name != keep]
+            if not candidates:
+                logger.warning(f"Model '{keep}' alone exceeds the memory budget")
+                return
+            # The OrderedDict keeps the least recently used model first
+            self.evict(candidates[0])
+
+    def status(self):
+        """Per-model load state for the health endpoint"""
+        with self._lock:
+            return {
+                "memory_budget_mb": round(self.memory_budget / 2**20, 1),
+                "memory_used_mb": round(sum(self._sizes.values()) / 2**20, 1),
+                "models": {
+                    name: {
+                        "loaded": name in self._models,
+                        "size_mb": round(self._sizes.get(name, 0) / 2**20, 1),
+                        "load_time": round(self._load_times.get(name, 0.0), 3),
+                        "last_inference_ms": round(1000 * self._inference_times[name], 2) if name in self._inference_times else None,
+                        "inferences": self._inference_counts.get(name, 0),
+                        "error": self._errors.get(name),
+                        "failed_loads": self._failures.get(name, 0)
+                    }
+                    for name in self._loaders
+                }
+            }
@@ -0,0 +1,147 @@
+import re
+
+# Contract analysis patterns and rules
+contract_patterns = {
+    "effective_date": r"(?i)effective\s+(?:as\s+of\s+)?(?:the\s+)?(?:date\s+(?:of|on|hereof)|date)?\s*:?\s*([A-Za-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}|\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4})",
+    "termination_date": r"(?i)(?:terminat(?:ion|e)|expir(?:ation|e)|end)\s+(?:date|on)\s*:?\s*([A-Za-z]+\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}|\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4})",
+    "payment_terms": r"(?i)(?:payment\s+terms|terms\s+of\s+payment)\s*:?\s*([^\.;]+)",
+    "governing_law": r"(?i)(?:governing\s+law|law\s+govern(?:s|ing))\s*:?\s*([^\.;]+)",
+    "parties": r"(?i)(?:between|among|party)\s+([A-Z][A-Za-z\s,]+(?:LLC|Inc\.|Corporation|Corp\.|Ltd\.|Limited|Co\.|Company))",
+    "confidentiality": r"(?i)(?:confidential(?:ity)?|non-disclosure)\s+([^\.;]+)",
+    "indemnification": r"(?i)(?:indemnif(?:y|ication)|hold\s+harmless)\s+([^\.;]+)",
+    "limitation_of_liability": r"(?i)(?:limit(?:ation|ing)?\s+(?:of|on)\s+liability)\s+([^\.;]+)",
+    "force_majeure": r"(?i)(?:force\s+majeure|act(?:s)?\s+of\s+god)\s+([^\.;]+)",
+    "dispute_resolution": r"(?i)(?:dispute\s+resolution|arbitration|mediation)\s+([^\.;]+)"
+}
+
+date_patterns = [
+    r'\d{1,2}[\/\.-]\d{1,2}[\/\.-]\d{2,4}',  # DD/MM/YYYY, MM/DD/YYYY, etc.
+    r'(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}',  # Month DD, YYYY
+    r'\d{1,2}(?:st|nd|rd|th)?\s+(?:of\s+)?(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?,?\s+\d{4}'  # DD Month YYYY
+]
+
+money_patterns = [
+    r'(?:USD|US\$|\$|SAR|SR|€|EUR|£|GBP)\s*\d+(?:,\d{3})*(?:\.\d{2})?',  # Currency symbol followed by amount
+    r'\d+(?:,\d{3})*(?:\.\d{2})?\s*(?:dollars|USD|SAR|riyals|euros|EUR|pounds|GBP)'  # Amount followed by currency name
+]
+
+arabic_pattern = re.compile(r'[\u0600-\u06FF\u0750-\u077F\u08A0-\u08FF]+')
+
+# Metadata fields for which only the first match in a document is used
+FIRST_MATCH_FIELDS = ["effective_date", "termination_date", "payment_terms", "governing_law"]
+
+
+def fold_case_pattern(pattern):
+    """Rewrite a case-insensitive pattern to match lowercased text case-sensitively
+
+    Literal letters and character class bounds are lowercased while escapes
+    (\\d, \\S, ...) and group names are kept. CPython's `re` is several times
+    faster without IGNORECASE, so lowercasing the text once and running the
+    folded patterns beats running the original patterns with the flag.
+    """
+    if pattern.startswith("(?i)"):
+        pattern = pattern[4:]
+    folded = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\":
+            folded.append(pattern[i:i + 2])
+            i += 2
+        elif pattern.startswith("(?P<", i):
+            end = pattern.index(">", i)
+            folded.append(pattern[i:end + 1])
+            i = end + 1
+        else:
+            folded.append(char.lower())
+            i += 1
+    return "".join(folded)
+
+
+class FoldedPattern:
+    """A case-insensitive pattern compiled for matching against lowercased text
+
+    Match positions in the lowercased text are used to slice the original text,
+    so returned values keep their case. Lowercasing changes the length of a
+    few non-ASCII characters; for such texts the IGNORECASE version is used.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.folded = re.compile(fold_case_pattern(pattern))
+        self.ignorecase = re.compile(pattern[4:] if pattern.startswith("(?i)") else pattern, re.IGNORECASE)
+
+    def _target(self, text, text_lower):
+        if text_lower is None:
+            text_lower = text.lower()
+        if len(text_lower) == len(text):
+            return self.folded, text_lower
+        return self.ignorecase, text
+
+    def search(self, text, text_lower=None):
+        """Return True if the pattern matches anywhere in the text"""
+        regex, target = self._target(text, text_lower)
+        return regex.search(target) is not None
+
+    def first(self, text, text_lower=None, group=0):
+        """Original text of the first match (or one of its groups), or None"""
+        regex, target = self._target(text, text_lower)
+        match = regex.search(target)
+        if match is None:
+            return None
+        start, end = match.span(group)
+        return text[start:end] if start >= 0 else ""
+
+    def all(self, text, text_lower=None, group=0):
+        """Original text of every non-overlapping match (or one of its groups)"""
+        regex, target = self._target(text, text_lower)
+        values = []
+        for match in regex.finditer(target):
+            start, end = match.span(group)
+            values.append(text[start:end] if start >= 0 else "")
+        return values
+
+
+compiled_contract_patterns = {name: FoldedPattern(pattern) for name, pattern in contract_patterns.items()}
+compiled_date_patterns = [FoldedPattern(pattern) for pattern in date_patterns]
+compiled_money_patterns = [FoldedPattern(pattern) for pattern in money_patterns]
+
+
+def find_dates(text, text_lower=None):
+    """All date expressions in the text"""
+    if text_lower is None:
+        text_lower = text.lower()
+    return [date for pattern in compiled_date_patterns for date in pattern.all(text, text_lower)]
+
+
+def find_monetary_values(text, text_lower=None):
+    """All monetary amounts in the text"""
+    if text_lower is None:
+        text_lower = text.lower()
+    return [value for pattern in compiled_money_patterns for value in pattern.all(text, text_lower)]
+
+
+def scan_contract_text(text, text_lower=None):
+    """Extract contract dates, payment terms, governing law, parties, dates and money
+
+    The text is lowercased once and every pattern runs over that copy with
+    case-sensitive, precompiled regexes; first-match fields stop at their
+    first hit. Returns a dict with the first match of each FIRST_MATCH_FIELDS
+    entry (or None), all "parties" captures, "dates" and "monetary_values".
+    """
+    if text_lower is None:
+        text_lower = text.lower()
+
+    result = {
+        field: compiled_contract_patterns[field].first(text, text_lower, group=1)
+        for field in FIRST_MATCH_FIELDS
+    }
+    result["parties"] = compiled_contract_patterns["parties"].all(text, text_lower, group=1)
+    result["dates"] = find_dates(text, text_lower)
+    result["monetary_values"] = find_monetary_values(text, text_lower)
+    return result
+
+
+def arabic_character_count(text):
+    """Number of characters in Arabic script runs"""
+    return sum(len(match) for match in arabic_pattern.findall(text))
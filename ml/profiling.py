@@ -0,0 +1,261 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"),
+    ("socket.py", "accept"), ("socket.py", "readinto"), ("thread.py", "_worker"), ("profiling.py", "finish")
+}
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9a-z-]+$")
+
+# tracemalloc and the sampler are process-wide, so one session runs at a time
+session_lock = threading.Lock()
+
+
+class ProfilingBusy(Exception):
+    """Raised when a profiling session is already running in this process"""
+
+
+def frame_name(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_firstlineno}({code.co_name})"
+
+
+class StackSampler:
+    """Statistical profiler recording the stack of every thread each `interval` seconds
+
+    Unlike cProfile it sees the work done in executor and batcher threads, and
+    its overhead does not grow with the number of calls. Stacks are kept in
+    the folded format (root;...;leaf) used by flame graph tools.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    self.idle_samples += 1
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_name(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def top(self, limit=30):
+        """Functions with the most samples on top of the stack (self) and anywhere on it (total)"""
+        active = sum(self.stacks.values())
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                total[name] += count
+
+        def rows(counter):
+            return [{"function": name, "samples": count, "percent": round(100 * count / active, 1)}
+                    for name, count in counter.most_common(limit)]
+        return {"samples": active, "idle_samples": self.idle_samples, "self": rows(own), "total": rows(total)}
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def cprofile_rows(profile, sort, limit):
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": calls,
+            "self_ms": round(1000 * own, 3),
+            "cumulative_ms": round(1000 * cumulative, 3)
+        })
+    key = "cumulative_ms" if sort == "cumulative" else "self_ms"
+    return sorted(rows, key=lambda row: row[key], reverse=True)[:limit]
+
+
+class ProfileSession:
+    """CPU and memory profile of a stretch of work in this process
+
+    Combines a cProfile of the thread that calls start() (exact call counts and
+    times, e.g. of one request), a StackSampler over all threads and the
+    difference between two tracemalloc snapshots. Only one session can run
+    at a time; start() raises ProfilingBusy otherwise.
+    """
+
+    def __init__(self, label, interval=0.005, cprofile=True, trace_frames=1):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.label = label
+        self.sampler = StackSampler(interval)
+        self.profile = cProfile.Profile() if cprofile else None
+        self.trace_frames = trace_frames
+        self.started = None
+        self.seconds = None
+        self._started_tracing = False
+        self._before = None
+        self._after = None
+        self._traced_peak = None
+
+    def start(self):
+        if not session_lock.acquire(blocking=False):
+            raise ProfilingBusy("A profiling session is already running")
+        try:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.trace_frames)
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+            self._before = tracemalloc.take_snapshot()
+            self.sampler.start()
+            self.started = time.perf_counter()
+            if self.profile is not None:
+                self.profile.enable()
+        except Exception:
+            session_lock.release()
+            raise
+        return self
+
+    def stop(self):
+        if self.seconds is not None:
+            return self
+        try:
+            if self.profile is not None:
+                self.profile.disable()
+            self.seconds = time.perf_counter() - self.started
+            self.sampler.stop()
+            self._after = tracemalloc.take_snapshot()
+            self._traced_peak = tracemalloc.get_traced_memory()[1]
+            if self._started_tracing:
+                tracemalloc.stop()
+        finally:
+            session_lock.release()
+        return self
+
+    def allocations(self, limit=30):
+        """Lines that allocated the most memory still held when the session stopped"""
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")
+        ]
+        after = self._after.filter_traces(filters)
+        before = self._before.filter_traces(filters)
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff
+            }
+            for stat in after.compare_to(before, "lineno")[:limit]
+        ]
+
+    def report(self, limit=30):
+        return {
+            "id": self.id,
+            "label": self.label,
+            "pid": os.getpid(),
+            "seconds": round(self.seconds, 3),
+            "cpu_profile": {
+                "cumulative": cprofile_rows(self.profile, "cumulative", limit),
+                "self": cprofile_rows(self.profile, "self", limit)
+            } if self.profile is not None else None,
+            "samples": dict(self.sampler.top(limit), interval_ms=1000 * self.sampler.interval),
+            "memory": {
+                "traced_peak_mb": round(self._traced_peak / 2**20, 2),
+                "allocations": self.allocations(limit)
+            }
+        }
+
+    def save(self, directory, keep=50, limit=30):
+        """Write the report (.json), the folded stacks (.folded) and the cProfile stats (.prof)
+
+        The oldest profiles beyond `keep` are deleted. Returns the report.
+        """
+        os.makedirs(directory, exist_ok=True)
+        report = self.report(limit)
+        path = os.path.join(directory, self.id)
+        if self.profile is not None:
+            self.profile.dump_stats(path + ".prof")
+        with open(path + ".folded", "w") as f:
+            f.write(self.sampler.folded())
+        with open(path + ".json", "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"Saved profile {self.id} of {self.label} ({report['seconds']}s) to {directory}")
+        prune_profiles(directory, keep)
+        return report
+
+
+def list_profiles(directory):
+    """Stored profile ids, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    reports = [name for name in os.listdir(directory) if name.endswith(".json")]
+    reports.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)), reverse=True)
+    return [name[:-len(".json")] for name in reports]
+
+
+def profile_path(directory, profile_id, extension):
+    """Path of a stored profile file, or None if the id is malformed or unknown"""
+    if not PROFILE_ID_PATTERN.match(profile_id) or extension not in ("json", "prof", "folded"):
+        return None
+    path = os.path.join(directory, f"{profile_id}.{extension}")
+    return path if os.path.exists(path) else None
+
+
+def prune_profiles(directory, keep):
+    for profile_id in list_profiles(directory)[keep:]:
+        for extension in ("json", "prof", "folded"):
+            try:
+                os.remove(os.path.join(directory, f"{profile_id}.{extension}"))
+            except FileNotFoundError:
+                pass
+
+
+def profile_window(seconds, directory, interval=0.005, keep=50):
+    """Sample every thread of this process for `seconds`, then save the profile
+
+    Runs in a background thread; returns the started session.
+    """
+    session = ProfileSession("window", interval=interval, cprofile=False).start()
+
+    def finish():
+        time.sleep(seconds)
+        try:
+            session.stop().save(directory, keep)
+        except Exception as e:
+            logger.error(f"Error saving profile {session.id}: {e}")
+
+    threading.Thread(target=finish, name="profile-window", daemon=True).start()
+    return session
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Collapse whitespace so formatting-only differences share a cache entry"""
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def make_cache_key(endpoint, text, params=None, version="", normalize=True):
+    """Content-addressed key for an analysis result
+
+    With `normalize` texts differing only in whitespace share a key; results
+    holding character offsets into the text must be keyed by the exact text.
+    """
+    digest = hashlib.sha256()
+    digest.update(endpoint.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update((normalize_text(text) if normalize else text).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache for JSON-serializable analysis results
+
+    The first tier is an in-process LRU bounded by entry count and total
+    serialized size. The optional second tier is a SQLite database that is
+    shared by every worker process pointing at the same `db_path`. Entries in
+    both tiers expire after `ttl` seconds.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 2**20, ttl=3600, db_path=None, max_db_entries=100000):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_db_entries = max_db_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._db_lock = threading.Lock()
+        self._db_writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    def get(self, key):
+        """Return the cached result for a key, or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(payload)
+                self._remove(key)
+
+        if self.db_path:
+            row = self._db_get(key, now)
+            if row is not None:
+                stored_at, payload = row
+                self._remember(key, payload, stored_at)
+                with self._lock:
+                    self._stats["disk_hits"] += 1
+                return json.loads(payload)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, key, value):
+        """Store a result in both tiers"""
+        try:
+            payload = json.dumps(value)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Result is not cacheable: {e}")
+            return
+        stored_at = time.time()
+        self._remember(key, payload, stored_at)
+        if self.db_path:
+            self._db_set(key, payload, stored_at)
+        with self._lock:
+            self._stats["stores"] += 1
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.db_path:
+            try:
+                with self._db_lock:
+                    self._connection().execute("DELETE FROM results")
+            except sqlite3.Error as e:
+                logger.error(f"Error clearing result cache database: {e}")
+
+    def stats(self):
+        """Hit/miss counters and tier sizes for the health endpoint"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+            stats["memory_entries"] = len(self._entries)
+            stats["memory_bytes"] = self._bytes
+        stats["disk_enabled"] = bool(self.db_path)
+        return stats
+
+    def _remember(self, key, payload, stored_at):
+        size = len(payload)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (stored_at, payload)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def _remove(self, key):
+        # Caller must hold self._lock
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _connection(self):
+        # SQLite connections must not be shared with forked children
+        if self._db is None or self._db_pid != os.getpid():
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, stored_at REAL NOT NULL, payload TEXT NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS results_stored_at ON results (stored_at)")
+            self._db_pid = os.getpid()
+        return self._db
+
+    def _db_get(self, key, now):
+        try:
+            with self._db_lock:
+                row = self._connection().execute(
+                    "SELECT stored_at, payload FROM results WHERE key = ? AND stored_at >= ?",
+                    (key, now - self.ttl)
+                ).fetchone()
+            return row
+        except sqlite3.Error as e:
+            logger.error(f"Error reading result cache database: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return None
+
+    def _db_set(self, key, payload, stored_at):
+        try:
+            with self._db_lock:
+                db = self._connection()
+                db.execute(
+                    "INSERT OR REPLACE INTO results (key, stored_at, payload) VALUES (?, ?, ?)",
+                    (key, stored_at, payload)
+                )
+                self._db_writes += 1
+                # Prune periodically rather than on every write
+                if self._db_writes % 100 == 0:
+                    db.execute("DELETE FROM results WHERE stored_at < ?", (stored_at - self.ttl,))
+                    db.execute(
+                        "DELETE FROM results WHERE key IN ("
+                        "SELECT key FROM results ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_db_entries,)
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Error writing result cache database: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
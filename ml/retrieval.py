@@ -0,0 +1,121 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+WORD_SPAN_PATTERN = re.compile(r'\S+')
+
+
+def split_passages(text, passage_words=120, stride_words=60):
+    """Split text into overlapping word windows
+
+    Returns a list of (start, end) character offsets into `text`; consecutive
+    passages start `stride_words` words apart so an answer that straddles one
+    window boundary is fully contained in the next window.
+    """
+    words = [match.span() for match in WORD_SPAN_PATTERN.finditer(text)]
+    if not words:
+        return []
+    stride_words = max(1, min(stride_words, passage_words))
+
+    passages = []
+    for first in range(0, len(words), stride_words):
+        last = min(first + passage_words, len(words)) - 1
+        passages.append((words[first][0], words[last][1]))
+        if last == len(words) - 1:
+            break
+    return passages
+
+
+class PassageIndex:
+    """BM25 index over the passages of one document
+
+    The document is split into overlapping passages once; `rank` then scores
+    any number of questions against them without re-reading the document.
+    """
+
+    def __init__(self, text, passage_words=120, stride_words=60, k1=1.5, b=0.75):
+        self.text = text
+        self.spans = split_passages(text, passage_words, stride_words)
+        self.passages = [text[start:end] for start, end in self.spans]
+        self.k1 = k1
+        self.b = b
+        self._vectorizer = None
+        self._term_frequencies = None
+        if self.passages:
+            try:
+                self._vectorizer = CountVectorizer(lowercase=True)
+                self._term_frequencies = self._vectorizer.fit_transform(self.passages).tocsc()
+            except ValueError:
+                # Raised when the passages contain no indexable words
+                self._vectorizer = None
+        if self._vectorizer is not None:
+            lengths = np.asarray(self._term_frequencies.sum(axis=1)).ravel()
+            document_frequency = np.diff(self._term_frequencies.indptr)
+            count = len(self.passages)
+            self._idf = np.log((count - document_frequency + 0.5) / (document_frequency + 0.5) + 1.0)
+            self._length_norm = self.k1 * (1 - self.b + self.b * lengths / (lengths.mean() or 1.0))
+
+    def __len__(self):
+        return len(self.passages)
+
+    def scores(self, question):
+        """BM25 score of every passage for a question"""
+        if self._vectorizer is None:
+            return np.zeros(len(self.passages))
+        terms = self._vectorizer.transform([question]).indices
+        scores = np.zeros(len(self.passages))
+        for term in np.unique(terms):
+            column = self._term_frequencies[:, term]
+            rows = column.indices
+            frequency = column.data
+            scores[rows] += self._idf[term] * frequency * (self.k1 + 1) / (frequency + self._length_norm[rows])
+        return scores
+
+    def rank(self, question, top_k=3):
+        """Indexes of the `top_k` best passages for a question, best first"""
+        if not self.passages:
+            return []
+        scores = self.scores(question)
+        order = np.argsort(-scores, kind="stable")
+        return [int(index) for index in order[:top_k]]
+
+
+class PassageIndexCache:
+    """LRU cache of PassageIndex objects keyed by document content
+
+    Follow-up questions about a document that was recently indexed reuse its
+    passages and BM25 statistics instead of rebuilding them.
+    """
+
+    def __init__(self, max_entries=32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, passage_words=120, stride_words=60):
+        """Return the index for a document, building it on a miss"""
+        key = (hashlib.sha256(text.encode('utf-8')).hexdigest(), passage_words, stride_words)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return index
+            self.misses += 1
+
+        index = PassageIndex(text, passage_words, stride_words)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
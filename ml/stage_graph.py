@@ -0,0 +1,172 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+# How often to check whether a queued required stage has started, so its deadline can be enforced
+QUEUED_POLL_SECONDS = 0.05
+
+
+class StageError(Exception):
+    """A required stage failed, missed its deadline or lost a dependency"""
+
+    def __init__(self, stage, reason):
+        super().__init__(f"Stage '{stage}' {reason}")
+        self.stage = stage
+        self.reason = reason
+
+
+class Stage:
+    """One step of an analysis, called with the outputs of its dependencies
+
+    The `timeout` of a required stage is measured from the moment it starts
+    running, so time spent queued behind other analyses does not count against
+    it; that of an optional stage from the moment it is submitted, so one stuck
+    in the queue is given up on too. An optional stage that fails or times out
+    is left out of the results (and so are the stages that depend on it); a
+    required one aborts the whole run.
+    """
+
+    def __init__(self, name, run, depends_on=(), timeout=None, optional=False):
+        self.name = name
+        self.run = run
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.optional = optional
+
+
+class StageResults:
+    """Outputs of a stage run, plus the optional stages that did not finish"""
+
+    def __init__(self):
+        self.values = {}
+        self.failed = {}
+        self.durations = {}
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    @property
+    def partial(self):
+        return bool(self.failed)
+
+    def fail(self, stage, reason):
+        if not stage.optional:
+            raise StageError(stage.name, reason)
+        logger.warning(f"Optional stage '{stage.name}' {reason}")
+        self.failed[stage.name] = reason
+
+
+def order_stages(stages):
+    """Stages in dependency order; raises ValueError for unknown names or cycles"""
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"Duplicate stage '{stage.name}'")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dependency in stage.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    ordered = []
+    done = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [stage for stage in remaining if all(dependency in done for dependency in stage.depends_on)]
+        if not ready:
+            raise ValueError(f"Stage dependencies form a cycle: {[stage.name for stage in remaining]}")
+        for stage in ready:
+            ordered.append(stage)
+            done.add(stage.name)
+            remaining.remove(stage)
+    return ordered
+
+
+def run_stages(stages, executor=None, optional_executor=None):
+    """Run stages as soon as their dependencies have finished
+
+    Independent stages run concurrently on `executor`; without an executor
+    they run one after another in dependency order and timeouts are not
+    enforced. A stage that misses its deadline keeps running in its worker
+    thread, but its result is discarded. Optional stages run on
+    `optional_executor` when given, so those left running after their
+    deadline cannot delay the required stages of later runs.
+    """
+    results = StageResults()
+    started_at = {}
+
+    def call(stage):
+        started = started_at[stage.name] = time.monotonic()
+        try:
+            return stage.run(*[results.values[dependency] for dependency in stage.depends_on])
+        finally:
+            results.durations[stage.name] = time.monotonic() - started
+
+    def deadline(stage, submitted):
+        if stage.timeout is None:
+            return None
+        if stage.optional:
+            return submitted + stage.timeout
+        started = started_at.get(stage.name)
+        return started + stage.timeout if started is not None else None
+
+    def blocked(stage):
+        return next((dependency for dependency in stage.depends_on if dependency in results.failed), None)
+
+    if executor is None:
+        for stage in order_stages(stages):
+            dependency = blocked(stage)
+            if dependency is not None:
+                results.fail(stage, f"skipped because '{dependency}' did not finish")
+                continue
+            try:
+                results.values[stage.name] = call(stage)
+            except StageError:
+                raise
+            except Exception as e:
+                results.fail(stage, f"failed: {e}")
+        return results
+
+    waiting = order_stages(stages)
+    running = {}
+    while waiting or running:
+        for stage in list(waiting):
+            dependency = blocked(stage)
+            if dependency is not None:
+                waiting.remove(stage)
+                results.fail(stage, f"skipped because '{dependency}' did not finish")
+            elif all(dependency in results.values for dependency in stage.depends_on):
+                waiting.remove(stage)
+                stage_executor = optional_executor if stage.optional and optional_executor is not None else executor
+                running[stage_executor.submit(call, stage)] = (stage, time.monotonic())
+        if not running:
+            break
+
+        deadlines = [deadline(stage, submitted) for stage, submitted in running.values()]
+        deadlines = [stage_deadline for stage_deadline in deadlines if stage_deadline is not None]
+        timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+        queued = [
+            stage for stage, _ in running.values()
+            if stage.timeout is not None and not stage.optional and stage.name not in started_at
+        ]
+        if queued:
+            timeout = QUEUED_POLL_SECONDS if timeout is None else min(timeout, QUEUED_POLL_SECONDS)
+        done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            stage, _ = running.pop(future)
+            try:
+                results.values[stage.name] = future.result()
+            except Exception as e:
+                results.fail(stage, f"failed: {e}")
+
+        now = time.monotonic()
+        for future, (stage, submitted) in list(running.items()):
+            stage_deadline = deadline(stage, submitted)
+            if stage_deadline is not None and now >= stage_deadline:
+                del running[future]
+                future.cancel()
+                results.fail(stage, f"timed out after {stage.timeout}s")
+    return results
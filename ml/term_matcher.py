@@ -0,0 +1,117 @@
+import re
+from collections import defaultdict
+
+
+def build_trie_pattern(terms):
+    """Build a regex alternation with common prefixes factored into a trie
+
+    The regex engine then checks each distinct next character once instead of
+    trying every term at every position, so adding terms stays cheap.
+    Alternatives are greedy, so the longest term starting at a position wins.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        is_end = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if is_end else body
+
+    return build(trie)
+
+
+class TermMatcher:
+    """Find every occurrence of a fixed set of terms in one pass over a text
+
+    Terms are organized in named groups (a term may belong to several groups)
+    and matched case-insensitively as plain substrings, which is the same
+    semantics as `term.lower() in text.lower()`. A single precompiled trie
+    regex finds the longest term at each match position; terms hidden inside
+    or overlapping a match (e.g. "limited liability" inside "unlimited
+    liability") are recovered from tables computed once at construction, so
+    the result lists all occurrences, including overlapping ones.
+    """
+
+    def __init__(self, groups):
+        self.groups = {}
+        self._term_groups = defaultdict(list)
+        for group, terms in groups.items():
+            lowered = []
+            for term in terms:
+                term = term.lower()
+                if term and term not in lowered:
+                    lowered.append(term)
+                    self._term_groups[term].append(group)
+            self.groups[group] = lowered
+
+        self.terms = sorted(self._term_groups, key=len, reverse=True)
+        self._pattern = re.compile(build_trie_pattern(self.terms)) if self.terms else None
+
+        # Terms found entirely inside each term, with their offsets
+        self._contained = {
+            term: [(other, offset) for other in self.terms if other != term
+                   for offset in self._offsets(term, other)]
+            for term in self.terms
+        }
+        # Terms that start inside each term and may continue past its end
+        self._overlapping = {
+            term: [(other, offset) for other in self.terms
+                   for offset in range(1, len(term))
+                   if len(term) - offset < len(other) and other.startswith(term[offset:])]
+            for term in self.terms
+        }
+
+    @staticmethod
+    def _offsets(term, other):
+        offsets = []
+        position = term.find(other)
+        while position != -1:
+            offsets.append(position)
+            position = term.find(other, position + 1)
+        return offsets
+
+    def scan(self, text, text_lower=None):
+        """Return a dict mapping each term found to its sorted start positions
+
+        Positions refer to `text.lower()`, which has the same length as `text`
+        except for a few non-ASCII characters. Pass `text_lower` when the
+        lowercased text is already at hand.
+        """
+        hits = defaultdict(list)
+        if self._pattern is None:
+            return hits
+        if text_lower is None:
+            text_lower = text.lower()
+        for match in self._pattern.finditer(text_lower):
+            term = match.group(0)
+            start = match.start()
+            hits[term].append(start)
+            for other, offset in self._contained[term]:
+                hits[other].append(start + offset)
+            for other, offset in self._overlapping[term]:
+                if text_lower.startswith(other, start + offset):
+                    hits[other].append(start + offset)
+        for positions in hits.values():
+            positions.sort()
+        return hits
+
+    def group_hits(self, hits):
+        """Group scan results as {group: {term: positions}}"""
+        grouped = {group: {} for group in self.groups}
+        for term, positions in hits.items():
+            for group in self._term_groups[term]:
+                grouped[group][term] = positions
+        return grouped
+
+    def count_terms(self, hits):
+        """Number of distinct terms of each group present in the scan results"""
+        return {group: len(terms) for group, terms in self.group_hits(hits).items()}
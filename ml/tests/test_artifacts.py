@@ -0,0 +1,68 @@
+import unittest
+import os
+import sys
+import tempfile
+import types
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to sys.path to import artifacts.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artifacts import (
+    MissingArtifactError, bake_spacy_model, baked, ensure_nltk_data, missing_nltk_resources, spacy_model_directory,
+    transformer_model_directory
+)
+from inference_backends import COMPLETE_MARKER
+
+def find_except(*missing):
+    """nltk.data.find stand-in that only lacks the given resources"""
+    def find(resource):
+        if resource in missing:
+            raise LookupError(resource)
+        return resource
+    return find
+
+class TestArtifacts(unittest.TestCase):
+    def test_baked_requires_complete_marker(self):
+        """A model directory only counts once the bake step has finished it"""
+        with tempfile.TemporaryDirectory() as model_path:
+            directory = transformer_model_directory(model_path, "org/model")
+            self.assertEqual(os.path.basename(directory), "org__model")
+            self.assertFalse(baked(directory))
+            os.makedirs(directory)
+            self.assertFalse(baked(directory))
+            open(os.path.join(directory, COMPLETE_MARKER), 'w').close()
+            self.assertTrue(baked(directory))
+
+    def test_offline_mode_fails_fast_on_missing_nltk_data(self):
+        """Offline mode raises instead of downloading missing NLTK data"""
+        with tempfile.TemporaryDirectory() as directory:
+            with patch('nltk.data.find', find_except("tokenizers/punkt")), patch('nltk.download') as download:
+                self.assertEqual(missing_nltk_resources(directory), ["punkt"])
+                with self.assertRaises(MissingArtifactError):
+                    ensure_nltk_data(directory, offline=True)
+                download.assert_not_called()
+
+                ensure_nltk_data(directory)
+                download.assert_called_once_with("punkt", download_dir=directory, quiet=True, raise_on_error=True)
+
+    def test_present_nltk_data_is_not_downloaded(self):
+        """Nothing is downloaded when every NLTK package is found"""
+        with tempfile.TemporaryDirectory() as directory:
+            with patch('nltk.data.find', find_except()), patch('nltk.download') as download:
+                ensure_nltk_data(directory, offline=True)
+                download.assert_not_called()
+
+    def test_unknown_spacy_package_fails_without_exiting(self):
+        """A spaCy download that exits is reported as an ordinary error"""
+        spacy = types.ModuleType("spacy")
+        spacy.load = MagicMock(side_effect=OSError("not installed"))
+        spacy_cli = types.ModuleType("spacy.cli")
+        spacy_cli.download = MagicMock(side_effect=SystemExit(1))
+        with tempfile.TemporaryDirectory() as model_path, \
+                patch.dict(sys.modules, {"spacy": spacy, "spacy.cli": spacy_cli}):
+            with self.assertRaises(RuntimeError):
+                bake_spacy_model(model_path, "ar_core_news_sm")
+            self.assertFalse(baked(spacy_model_directory(model_path, "ar_core_news_sm")))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the parent directory to sys.path to import batching.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batching import MicroBatcher
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_requests_share_batches(self):
+        """Concurrent submissions are grouped and each caller gets its own result"""
+        batch_sizes = []
+        def process_batch(items):
+            batch_sizes.append(len(items))
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher(process_batch, max_batch_size=8, max_wait_ms=50)
+        results = {}
+        def submit(text):
+            results[text] = batcher.submit(text)
+
+        threads = [threading.Thread(target=submit, args=(f"text-{i}",)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {f"text-{i}": f"TEXT-{i}" for i in range(16)})
+        self.assertEqual(sum(batch_sizes), 16)
+        self.assertLess(len(batch_sizes), 16)
+        self.assertLessEqual(max(batch_sizes), 8)
+
+    def test_batch_errors_reach_callers(self):
+        """An exception in the batch function is raised to every waiting caller"""
+        def process_batch(items):
+            raise ValueError("model failed")
+
+        batcher = MicroBatcher(process_batch, max_wait_ms=1)
+        with self.assertRaises(ValueError):
+            batcher.submit("text")
+
+        # The worker keeps serving after a failed batch
+        batcher.process_batch = lambda items: items
+        self.assertEqual(batcher.submit("text"), "text")
+
+    def test_failed_batch_is_retried_item_by_item(self):
+        """One bad item in a shared batch only fails its own caller"""
+        batch_sizes = []
+        def process_batch(items):
+            batch_sizes.append(len(items))
+            if "bad" in items:
+                raise ValueError("bad input")
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher(process_batch, max_batch_size=8, max_wait_ms=200)
+        results, errors = {}, {}
+        def submit(text):
+            try:
+                results[text] = batcher.submit(text)
+            except ValueError as e:
+                errors[text] = e
+
+        threads = [threading.Thread(target=submit, args=(text,)) for text in ("one", "bad", "two")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, {"one": "ONE", "two": "TWO"})
+        self.assertEqual(list(errors), ["bad"])
+        self.assertEqual(batch_sizes[0], 3)
+
+    def test_queue_waits_are_reported(self):
+        """on_batch receives the queue wait of every item in the batch"""
+        waits = []
+        batcher = MicroBatcher(lambda items: items, max_wait_ms=1, on_batch=waits.append)
+        self.assertEqual(batcher.submit("text"), "text")
+        self.assertEqual(len(waits), 1)
+        self.assertEqual(len(waits[0]), 1)
+        self.assertGreaterEqual(waits[0][0], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+import unittest
+import os
+import random
+import sys
+from types import SimpleNamespace
+
+# Add the parent and benchmarks directories to sys.path to import corpus.py and stub_models.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from contract_rules import detect_language
+from corpus import generate_contract, generate_corpus
+from load_test import RequestPicker, build_payloads, find_knee, find_saturation, parse_weights, recommend
+from model_registry import ModelRegistry
+from patterns import contract_patterns, scan_contract_text
+from stub_models import StubPipeline, install_stub_models
+from windowing import aggregate_window_scores
+
+class TestBenchmarkCorpus(unittest.TestCase):
+    def test_contracts_are_deterministic(self):
+        """The same seed, size and language give the same text"""
+        self.assertEqual(generate_contract(5000, "en", seed=3), generate_contract(5000, "en", seed=3))
+        self.assertNotEqual(generate_contract(5000, "en", seed=3), generate_contract(5000, "en", seed=4))
+        self.assertGreaterEqual(len(generate_contract(5000, "ar")), 5000)
+
+    def test_contracts_contain_every_clause(self):
+        """English contracts fill the contract fields, Arabic ones are detected as Arabic"""
+        text = generate_contract(6000, "en")
+        fields = scan_contract_text(text)
+        for field in ["effective_date", "termination_date", "payment_terms", "governing_law"]:
+            self.assertIsNotNone(fields[field], field)
+        self.assertGreater(text.count("\n"), len(contract_patterns) - 1)
+        self.assertEqual(detect_language(generate_contract(3000, "ar")), "ar")
+
+    def test_corpus_sizes_and_languages(self):
+        documents = generate_corpus(2, [1000, 4000], ["en", "ar"])
+        self.assertEqual(len(documents), 8)
+        self.assertEqual(len({document["id"] for document in documents}), 8)
+
+class TestStubModels(unittest.TestCase):
+    def test_stub_outputs_match_pipeline_formats(self):
+        """Stand-ins return the output format of the real pipelines"""
+        text = "This Agreement is between Acme Corporation and John Smith of Riyadh."
+        classifier = StubPipeline("text-classification", latency_scale=0)
+        self.assertEqual(classifier(text), classifier([text]))
+        self.assertEqual(len(aggregate_window_scores(classifier([text, text]), [10, 10])), 1)
+        self.assertEqual([len(scores) for scores in classifier([text, text], top_k=None)], [2, 2])
+        self.assertEqual(len(StubPipeline("sentiment-analysis", latency_scale=0)(text, top_k=None)), 5)
+
+        entities = StubPipeline("ner", latency_scale=0)(text)
+        self.assertEqual({entity["entity_group"] for entity in entities}, {"ORG", "PER", "LOC"})
+
+        summary = StubPipeline("summarization", latency_scale=0)([text], max_length=3)
+        self.assertEqual(summary, [{"summary_text": "This Agreement is"}])
+
+        qa_model = StubPipeline("question-answering", latency_scale=0)
+        answer = qa_model(question="Who?", context=text)
+        self.assertEqual(text[answer["start"]:answer["end"]], answer["answer"])
+        self.assertEqual(len(qa_model(question=["Who?", "Where?"], context=[text, text])), 2)
+
+        rating = StubPipeline("sentiment-analysis", latency_scale=0)(text)[0]["label"]
+        self.assertIn(rating, [f"{stars} stars" for stars in range(1, 6)])
+
+    def test_install_replaces_every_model(self):
+        registry = ModelRegistry()
+        service = SimpleNamespace(
+            model_registry=registry,
+            SPACY_PACKAGES={"spacy_en": ["en_core_web_sm"]},
+            TRANSFORMER_MODELS={"ner_model": ("ner", "some/model", {})}
+        )
+        registry.register("ner_model", lambda: None)
+        install_stub_models(service, latency_scale=0)
+        self.assertEqual(registry.get("ner_model").task, "ner")
+        doc = registry.get("spacy_en")("Signed in Dubai by Layla Haddad.")
+        self.assertEqual({(ent.text, ent.label_) for ent in doc.ents}, {("Dubai", "GPE"), ("Layla Haddad", "PERSON")})
+
+def load_level(concurrency, throughput, mean_ms, cpu=None):
+    return {"concurrency": concurrency, "throughput": throughput, "mean_ms": mean_ms, "p95_ms": 2 * mean_ms,
+            "server_cpu_cores": cpu}
+
+class TestLoadTest(unittest.TestCase):
+    def test_parse_weights(self):
+        self.assertEqual(parse_weights("summarize:2,analyze-contract"), {"summarize": 2.0, "analyze-contract": 1.0})
+        self.assertEqual(parse_weights("2000:3,20000:1", int), {2000: 3.0, 20000: 1.0})
+        with self.assertRaises(ValueError):
+            parse_weights("summarize:0")
+
+    def test_requests_follow_the_mix(self):
+        """Requests are drawn from the endpoint mix only"""
+        mix, sizes = {"summarize": 1.0, "answer-question": 0.0}, {500: 1.0}
+        picker = RequestPicker(mix, sizes, 0.5, build_payloads(mix, sizes, 0.5))
+        rng = random.Random(0)
+        picks = [picker.pick(rng) for _ in range(20)]
+        self.assertEqual({endpoint for endpoint, _ in picks}, {"summarize"})
+        self.assertTrue(all(b'"text"' in body for _, body in picks))
+
+    def test_saturation_and_knee(self):
+        """Saturation is where throughput stops growing, the knee where throughput per latency peaks"""
+        levels = [load_level(1, 10, 100), load_level(2, 19, 105), load_level(4, 30, 133),
+                  load_level(8, 32, 250), load_level(16, 32.5, 480)]
+        self.assertEqual(find_saturation(levels)["concurrency"], 4)
+        self.assertEqual(find_knee(levels)["concurrency"], 4)
+
+    def test_recommendation(self):
+        """The smallest worker count near the best throughput is recommended, with headroom"""
+        runs = [
+            {"workers": 1, "saturation": load_level(2, 20, 100), "knee": load_level(2, 20, 100, cpu=0.5)},
+            {"workers": 2, "saturation": load_level(4, 38, 105), "knee": load_level(4, 38, 105, cpu=1.0)},
+            {"workers": 4, "saturation": load_level(8, 40, 200), "knee": load_level(4, 40, 100, cpu=1.0)}
+        ]
+        recommendation = recommend(runs, cpu_request=0.5, headroom=0.8)
+        self.assertEqual(recommendation["WEB_CONCURRENCY"], 2)
+        self.assertEqual(recommendation["target_requests_per_second_per_pod"], 30.4)
+        self.assertEqual(recommendation["target_in_flight_requests_per_pod"], 3)
+        self.assertEqual(recommendation["target_cpu_utilization"], 160)
+
+if __name__ == '__main__':
+    unittest.main()
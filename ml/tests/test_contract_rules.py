@@ -0,0 +1,45 @@
+import unittest
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+# Add the parent directory to sys.path to import contract_rules.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from contract_rules import analyze_contract_clauses, rule_analysis, score_document_type
+from document_context import DocumentContext
+
+CONTRACT = (
+    "This Agreement is made effective as of January 15, 2025. "
+    "The parties agree to the following terms. "
+    "Payment Terms: Client shall pay $5,000 within 30 days. "
+    "Late payments bear interest. "
+    "This Agreement shall be governed by the laws of Saudi Arabia. "
+    "Provider accepts unlimited liability for any breach."
+)
+
+class TestContractRules(unittest.TestCase):
+    def test_rule_analysis_matches_inline_analysis(self):
+        """The values sent back by rule_analysis are the ones computed inline"""
+        context = DocumentContext(CONTRACT)
+        values = rule_analysis(CONTRACT)
+        self.assertEqual(values["clauses"], analyze_contract_clauses(context))
+        self.assertEqual(values["document_type_scores"], score_document_type(context))
+        self.assertNotIn("term_hits", values)
+
+    def test_seeded_values_skip_inline_analysis(self):
+        """A context seeded with rule values does not derive them again"""
+        context = DocumentContext(CONTRACT)
+        context.seed(rule_analysis(CONTRACT))
+        self.assertEqual(analyze_contract_clauses(context), analyze_contract_clauses(DocumentContext(CONTRACT)))
+        self.assertIn("payment_terms", [clause["type"] for clause in analyze_contract_clauses(context)])
+        self.assertNotIn("term_hits", context.computed())
+
+    def test_rule_analysis_in_spawned_process(self):
+        """rule_analysis can run in a spawned worker process"""
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            values = pool.submit(rule_analysis, CONTRACT).result(timeout=60)
+        self.assertEqual(values, rule_analysis(CONTRACT))
+
+if __name__ == '__main__':
+    unittest.main()
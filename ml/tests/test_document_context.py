@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+import threading
+
+# Add the parent directory to sys.path to import document_context.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from document_context import DocumentContext
+
+class TestDocumentContext(unittest.TestCase):
+    def test_values_are_computed_once(self):
+        """A derived value is computed on first access and reused"""
+        context = DocumentContext("Payment Terms: Net 30.")
+        calls = []
+
+        def sentences(c):
+            calls.append(c.text)
+            return [c.text]
+
+        self.assertEqual(context.get("sentences", sentences), ["Payment Terms: Net 30."])
+        self.assertEqual(context.get("sentences", sentences), ["Payment Terms: Net 30."])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(context.text_lower, "payment terms: net 30.")
+        self.assertEqual(context.computed(), ["sentences", "text_lower"])
+
+    def test_given_language_is_not_recomputed(self):
+        """A language passed with the request is used as is"""
+        context = DocumentContext("text", language="ar")
+        self.assertEqual(context.get("language", lambda c: "en"), "ar")
+
+    def test_concurrent_access_computes_once(self):
+        """Threads asking for the same value wait for a single computation"""
+        context = DocumentContext("text")
+        calls = []
+        started = threading.Event()
+
+        def slow(c):
+            calls.append(1)
+            started.wait(0.1)
+            return len(calls)
+
+        threads = [threading.Thread(target=context.get, args=("value", slow)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        started.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(context.get("value", slow), 1)
+
+    def test_seeded_values_keep_computed_ones(self):
+        """Values derived elsewhere are stored unless already computed"""
+        context = DocumentContext("text")
+        context.get("sentences", lambda c: ["computed"])
+        context.seed({"sentences": ["seeded"], "clauses": []})
+        self.assertEqual(context.get("sentences", lambda c: None), ["computed"])
+        self.assertEqual(context.get("clauses", lambda c: None), [])
+        self.assertEqual(context.export(["clauses", "sentences", "missing"]), {"clauses": [], "sentences": ["computed"]})
+
+if __name__ == '__main__':
+    unittest.main()
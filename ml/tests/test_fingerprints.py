@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import fingerprints.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fingerprints import (
+    FingerprintStore, SummaryMemo, clause_fingerprints, diff_clauses, estimated_similarity, minhash_signature, text_hash
+)
+
+CLAUSES = [
+    ("parties", "This Agreement is made between Acme Corporation and Legal Services LLC."),
+    ("payment_terms", "Payment terms: the Client shall pay $5,000 per month within 30 days."),
+    ("confidentiality", "Confidentiality obligations apply for five years after termination."),
+    ("governing_law", "Governing law: the laws of the Kingdom of Saudi Arabia."),
+    ("force_majeure", "Force majeure events excuse delays while they last.")
+]
+
+def clauses(items):
+    return [{"type": clause_type, "text": text, "risk_level": "low"} for clause_type, text in items]
+
+def document(items):
+    filler = " The Provider shall perform the services with professional care and skill in every respect."
+    return "\n".join(text + filler * 3 for _, text in items)
+
+class TestFingerprints(unittest.TestCase):
+    def test_text_hash_ignores_formatting(self):
+        self.assertEqual(text_hash("Governing  law:\nSaudi Arabia"), text_hash("governing law: saudi arabia"))
+        self.assertNotEqual(text_hash("five years"), text_hash("seven years"))
+
+    def test_similarity_of_edits(self):
+        """Small edits keep a high similarity, unrelated texts a low one"""
+        original = document(CLAUSES)
+        edited = original.replace("five years", "seven years")
+        unrelated = " ".join(f"word{i}" for i in range(300))
+        signature = minhash_signature(original)
+        self.assertEqual(estimated_similarity(signature, minhash_signature(original)), 1.0)
+        self.assertGreater(estimated_similarity(signature, minhash_signature(edited)), 0.8)
+        self.assertLess(estimated_similarity(signature, minhash_signature(unrelated)), 0.1)
+
+    def test_diff_clauses(self):
+        """Clauses are reported as unchanged, changed, added or removed"""
+        template = clause_fingerprints(clauses(CLAUSES))
+        edited = list(CLAUSES)
+        edited[2] = ("confidentiality", "Confidentiality obligations apply for seven years after termination.")
+        del edited[3]
+        edited.append(("dispute_resolution", "Arbitration in Riyadh settles any dispute."))
+        diff = diff_clauses(clause_fingerprints(clauses(edited)), template)
+
+        self.assertEqual(diff["unchanged_clauses"], 3)
+        self.assertEqual([(c["index"], c["template_index"]) for c in diff["changed_clauses"]], [(2, 2)])
+        self.assertEqual(diff["removed_clauses"], [{"template_index": 3, "type": "governing_law"}])
+        self.assertEqual([(c["index"], c["type"]) for c in diff["added_clauses"]], [(4, "dispute_resolution")])
+
+    def test_store_finds_closest_document(self):
+        store = FingerprintStore(max_documents=2)
+        first = document(CLAUSES)
+        second = document(CLAUSES[::-1]).replace("Provider", "Supplier")
+        first_id = store.add(first, clauses(CLAUSES), {"150:abc": "summary"})
+        store.add(second, clauses(CLAUSES[::-1]))
+
+        template_id, template, similarity = store.closest(first.replace("five years", "seven years"))
+        self.assertEqual(template_id, first_id)
+        self.assertGreater(similarity, 0.8)
+        self.assertEqual(template["summaries"], {"150:abc": "summary"})
+        self.assertIsNone(store.closest(" ".join(f"word{i}" for i in range(300))))
+
+    def test_store_forgets_oldest_documents(self):
+        store = FingerprintStore(max_documents=1)
+        store.add(document(CLAUSES), clauses(CLAUSES))
+        store.add(document(CLAUSES[:2]), clauses(CLAUSES[:2]))
+        self.assertEqual(len(store), 1)
+        self.assertIsNone(store.closest(document(CLAUSES[2:])))
+
+    def test_summary_memo(self):
+        """Known summaries are reused and every summary used is recorded"""
+        memo = SummaryMemo({SummaryMemo.key("First chunk.", 150): "first"})
+        self.assertEqual(memo.get("first  chunk.", 150), "first")
+        self.assertIsNone(memo.get("First chunk.", 60))
+        memo.put("Second chunk.", 150, "second")
+        self.assertEqual(memo.reused, 1)
+        self.assertEqual(sorted(memo.used.values()), ["first", "second"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import sys
+import tempfile
+import types
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to sys.path to import inference_backends.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference_backends import (
+    COMPLETE_MARKER, DEFAULT_BACKEND, active_backends, artifact_directory, build_artifact, build_pipeline,
+    parse_model_backends
+)
+
+class TestInferenceBackends(unittest.TestCase):
+    def test_parse_model_backends(self):
+        """Backends are read per model and unknown backends are ignored"""
+        backends = parse_model_backends("ner_model=onnx-int8, summarizer = onnx,qa_model=tensorrt,garbage")
+        self.assertEqual(backends, {"ner_model": "onnx-int8", "summarizer": "onnx"})
+        self.assertEqual(parse_model_backends(""), {})
+
+    def test_artifacts_are_built_once(self):
+        """Converted artifacts are cached and a failed build leaves nothing behind"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            directory = artifact_directory(cache_dir, "facebook/bart-large-cnn", "onnx")
+            self.assertEqual(directory, os.path.join(cache_dir, "onnx", "facebook__bart-large-cnn"))
+            builds = []
+
+            def build(staging):
+                builds.append(staging)
+                with open(os.path.join(staging, "model.onnx"), "w") as f:
+                    f.write("graph")
+
+            def broken(staging):
+                raise RuntimeError("export failed")
+
+            with self.assertRaises(RuntimeError):
+                build_artifact(directory, broken)
+            self.assertFalse(os.path.exists(directory))
+
+            self.assertEqual(build_artifact(directory, build), directory)
+            self.assertEqual(build_artifact(directory, build), directory)
+            self.assertEqual(len(builds), 1)
+            self.assertTrue(os.path.exists(os.path.join(directory, COMPLETE_MARKER)))
+            self.assertEqual(os.listdir(os.path.dirname(directory)), ["facebook__bart-large-cnn"])
+
+    def test_fallback_pipeline_keeps_framework(self):
+        """The plain pipeline is built with the requested framework, also when a backend falls back"""
+        transformers = types.ModuleType("transformers")
+        transformers.pipeline = MagicMock(return_value="pipeline")
+        transformers.AutoTokenizer = MagicMock()
+        with patch.dict(sys.modules, {"transformers": transformers, "optimum": None, "optimum.onnxruntime": None}):
+            self.assertEqual(build_pipeline("ner", "ner-model", framework="tf"), "pipeline")
+            with tempfile.TemporaryDirectory() as cache_dir:
+                self.assertEqual(build_pipeline("ner", "onnx-model", backend="onnx", cache_dir=cache_dir, framework="tf"), "pipeline")
+        for call in transformers.pipeline.call_args_list:
+            self.assertEqual(call.kwargs["framework"], "tf")
+        self.assertEqual(active_backends["onnx-model"], DEFAULT_BACKEND)
+
+if __name__ == '__main__':
+    unittest.main()
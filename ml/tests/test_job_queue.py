@@ -0,0 +1,118 @@
+import unittest
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path to import job_queue.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from job_queue import JobQueue, JobQueueFull
+
+def wait_for_status(queue, job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id, include_result=True)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.directory.name, "jobs.db")
+        self.release = threading.Event()
+
+        def slow(payload):
+            self.release.wait(5)
+            return {"length": len(payload["text"])}
+
+        def broken(payload):
+            raise RuntimeError("model unavailable")
+
+        self.handlers = {"length": lambda payload: {"length": len(payload["text"])}, "slow": slow, "broken": broken}
+
+    def tearDown(self):
+        self.release.set()
+        self.directory.cleanup()
+
+    def test_job_runs_and_stores_result(self):
+        """A submitted job is run by a worker and its result kept"""
+        queue = JobQueue(self.db_path, self.handlers, workers=1, poll_interval=0.01)
+        job_id = queue.submit("length", {"text": "contract"})
+
+        job = wait_for_status(queue, job_id, ["succeeded"])
+        self.assertEqual(job["result"], {"length": 8})
+        self.assertEqual(job["attempts"], 1)
+        self.assertIsNone(queue.get("unknown"))
+
+    def test_job_ids_carry_prefix(self):
+        queue = JobQueue(self.db_path, self.handlers, workers=1, poll_interval=0.01, id_prefix="ml-service-a.")
+        job_id = queue.submit("length", {"text": "contract"})
+        self.assertTrue(job_id.startswith("ml-service-a."))
+        self.assertEqual(wait_for_status(queue, job_id, ["succeeded"])["result"], {"length": 8})
+
+    def test_failed_job_records_error(self):
+        """Handler exceptions mark the job failed with the error message"""
+        queue = JobQueue(self.db_path, self.handlers, workers=1, poll_interval=0.01)
+        job = wait_for_status(queue, queue.submit("broken", {"text": ""}), ["failed"])
+        self.assertIn("model unavailable", job["error"])
+
+    def test_cancelled_job_keeps_cancelled_status(self):
+        """Cancelling a running job discards its result"""
+        queue = JobQueue(self.db_path, self.handlers, workers=1, poll_interval=0.01)
+        job_id = queue.submit("slow", {"text": "contract"})
+        wait_for_status(queue, job_id, ["running"])
+
+        self.assertEqual(queue.cancel(job_id)["status"], "cancelled")
+        self.release.set()
+        time.sleep(0.1)
+        job = queue.get(job_id, include_result=True)
+        self.assertEqual(job["status"], "cancelled")
+        self.assertIsNone(job["result"])
+
+    def test_running_job_with_heartbeat_is_not_requeued(self):
+        """A job that runs longer than stale_after keeps its heartbeat and runs once"""
+        calls = []
+        def long_job(payload):
+            calls.append(1)
+            time.sleep(1)
+            return {"done": True}
+
+        queue = JobQueue(self.db_path, {"long": long_job}, workers=2, stale_after=0.3, heartbeat_interval=0.03,
+                         poll_interval=0.001)
+        job = wait_for_status(queue, queue.submit("long", {}), ["succeeded", "failed"])
+        self.assertEqual(job["status"], "succeeded")
+        self.assertEqual(job["attempts"], 1)
+        self.assertEqual(len(calls), 1)
+
+    def test_job_without_heartbeat_is_requeued(self):
+        """A running job whose worker stopped refreshing its heartbeat is run again"""
+        queue = JobQueue(self.db_path, self.handlers, workers=1, stale_after=60, poll_interval=0.01)
+        job_id = queue.submit("length", {"text": "abc"})
+        wait_for_status(queue, job_id, ["succeeded"])
+        db = queue._connection()
+        db.execute("UPDATE jobs SET status = 'running', heartbeat_at = ? WHERE id = ?", (time.time() - 120, job_id))
+        queue._last_maintenance = 0.0
+
+        job = wait_for_status(queue, job_id, ["succeeded"])
+        self.assertEqual(job["attempts"], 2)
+
+    def test_queue_persists_and_is_bounded(self):
+        """Queued jobs survive a new queue instance and the queue length is capped"""
+        queue = JobQueue(self.db_path, self.handlers, workers=1, max_queued=1, poll_interval=0.01)
+        queue._ensure_workers = lambda: None
+        job_id = queue.submit("length", {"text": "abc"})
+        with self.assertRaises(JobQueueFull):
+            queue.submit("length", {"text": "abcd"})
+        with self.assertRaises(ValueError):
+            queue.submit("unknown", {})
+
+        restarted = JobQueue(self.db_path, self.handlers, workers=1, poll_interval=0.01)
+        restarted.start()
+        self.assertEqual(wait_for_status(restarted, job_id, ["succeeded"])["result"], {"length": 3})
+        self.assertEqual(restarted.stats()["succeeded"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import metrics.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from document_context import DocumentContext
+from metrics import REGISTRY, render_metrics, text_size, timed
+
+def sample(name, labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+class TestMetrics(unittest.TestCase):
+    def test_text_size(self):
+        """Input sizes are measured on texts, contexts and lists of them"""
+        self.assertEqual(text_size("abc"), 3)
+        self.assertEqual(text_size(DocumentContext("abcd")), 4)
+        self.assertEqual(text_size(["ab", DocumentContext("cde")]), 5)
+        self.assertIsNone(text_size(object()))
+        self.assertIsNone(text_size([object()]))
+
+    def test_timed_records_latency_and_size(self):
+        """Decorated helpers record one latency and one input size per call, even when they fail"""
+        @timed("test_helper")
+        def helper(text):
+            if not text:
+                raise ValueError("empty")
+            return text.upper()
+
+        labels = {"helper": "test_helper"}
+        calls = sample("ml_helper_seconds_count", labels)
+        characters = sample("ml_helper_input_characters_sum", labels)
+        self.assertEqual(helper("abcde"), "ABCDE")
+        with self.assertRaises(ValueError):
+            helper("")
+        self.assertEqual(sample("ml_helper_seconds_count", labels), calls + 2)
+        self.assertEqual(sample("ml_helper_input_characters_sum", labels), characters + 5)
+
+    def test_render_prometheus_text(self):
+        """Metrics are rendered in the Prometheus text format"""
+        body, content_type = render_metrics()
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn(b"# TYPE ml_helper_seconds histogram", body)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,16 @@
 import unittest
 import json
+import time
 import os
+import shutil
 import sys
+import tempfile
 from flask import Flask
 from unittest.mock import patch, MagicMock
 
 # Add the parent directory to sys.path to import app.py
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import app as service
 from app import app as flask_app
 
 class TestMLService(unittest.TestCase):
@@ -22,6 +26,19 @@ class TestMLService(unittest.TestCase):
         self.assertEqual(data['status'], 'healthy')
         self.assertIn('models_loaded', data)
         
+    def test_repeated_requests_use_result_cache(self):
+        """Test that repeated analyses are served from the result cache"""
+        before = json.loads(self.app.get('/health').data)['cache']
+        
+        payload = {'text': 'This Agreement is governed by the laws of Saudi Arabia. Payment is due monthly.', 'max_length': 60}
+        first = self.app.post('/api/summarize', json=payload, content_type='application/json')
+        second = self.app.post('/api/summarize', json=payload, content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.data), json.loads(second.data))
+        
+        after = json.loads(self.app.get('/health').data)['cache']
+        self.assertGreater(after['memory_hits'] + after['disk_hits'], before['memory_hits'] + before['disk_hits'])
+        
     def test_analyze_contract(self):
         """Test the contract analysis endpoint"""
         test_contract = """
@@ -175,6 +192,92 @@ class TestMLService(unittest.TestCase):
             self.assertIn('answer', data)
             self.assertIn('confidence', data)
         
+    def test_answer_questions(self):
+        """Test answering several questions about one document"""
+        test_context = """
+        This Service Agreement is made effective as of January 15, 2025, by and between Acme Corporation and Legal Services LLC.
+        Client agrees to pay Provider $5,000 per month, payable within 30 days of receipt of invoice.
+        This Agreement shall be governed by the laws of Saudi Arabia.
+        """
+        test_questions = ["What is the monthly payment amount?", "Which law governs the agreement?"]
+        
+        response = self.app.post('/api/answer-questions', 
+                                json={'text': test_context, 'questions': test_questions},
+                                content_type='application/json')
+        
+        # Even if the model doesn't work, the API should respond
+        self.assertIn(response.status_code, [200, 500])
+        
+        if response.status_code == 200:
+            data = json.loads(response.data)
+            self.assertEqual([answer['question'] for answer in data['answers']], test_questions)
+            for answer in data['answers']:
+                self.assertIn('answer', answer)
+                self.assertIn('confidence', answer)
+        
+        response = self.app.post('/api/answer-questions', 
+                                json={'text': test_context, 'questions': []},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        
+    def test_answer_offsets_refer_to_the_request_text(self):
+        """Test that cached answers are not reused for a text with different whitespace"""
+        def qa_model(question, context, batch_size=1):
+            return [
+                {"answer": "$5,000", "score": 0.9, "start": text.find("$5,000"), "end": text.find("$5,000") + 6}
+                for text in context
+            ]
+        get_model = service.model_registry.get
+        with patch.object(service.model_registry, 'get', lambda name: qa_model if name == "qa_model" else get_model(name)):
+            for text in ["Client pays $5,000 per month.", "        Client    pays $5,000 per month."]:
+                response = self.app.post('/api/answer-question', 
+                                        json={'text': text, 'question': "How much does the client pay?"},
+                                        content_type='application/json')
+                self.assertEqual(response.status_code, 200)
+                data = json.loads(response.data)
+                self.assertEqual(text[data['start']:data['end']], "$5,000")
+        
+    def test_windowed_classifier_combines_every_label(self):
+        """Test that window scores are combined over all labels, not each window's best one"""
+        window_scores = {
+            "first window": {"1 star": 0.5, "3 stars": 0.45, "5 stars": 0.05},
+            "second window": {"5 stars": 0.5, "3 stars": 0.45, "1 star": 0.05}
+        }
+        def classifier(texts, batch_size=1, top_k=1):
+            ranked = [
+                [{"label": label, "score": score} for label, score in window_scores[text].items()]
+                for text in texts
+            ]
+            return ranked if top_k is None else [scores[0] for scores in ranked]
+        get_model = service.model_registry.get
+        with patch.object(service.model_registry, 'get',
+                          lambda name: classifier if name == "sentiment_analyzer" else get_model(name)), \
+                patch.object(service, 'model_windows', return_value=[("first window", 100), ("second window", 100)]):
+            scores = service.run_windowed_classifier("sentiment_analyzer", ["a long review"])[0]
+        self.assertEqual(scores[0]["label"], "3 stars")
+        self.assertAlmostEqual(scores[0]["score"], 0.45)
+        self.assertEqual(len(scores), 3)
+        
+    def test_fallback_results_are_not_cached(self):
+        """Test that a result computed while a model fails to load is not cached as a model result"""
+        loader = service.model_registry._loaders["summarizer"]
+        def failing_loader():
+            raise RuntimeError("weights missing")
+        
+        text = "The Supplier shall deliver the goods to Jeddah within ninety days of the order."
+        service.model_registry.register("summarizer", failing_loader)
+        try:
+            key = service.result_cache_key("summarize", text, {"max_length": 150})
+            response = self.app.post('/api/summarize', json={'text': text}, content_type='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNone(service.result_cache.get(key[0]))
+            
+            # Later requests know the model is unavailable and cache under their own key
+            self.app.post('/api/summarize', json={'text': text}, content_type='application/json')
+            self.assertIsNotNone(service.cached_result(service.result_cache_key("summarize", text, {"max_length": 150})))
+        finally:
+            service.model_registry.register("summarizer", loader)
+        
     def test_analyze_sentiment(self):
         """Test the sentiment analysis endpoint"""
         test_positive = "This is an excellent agreement with favorable terms."
@@ -200,6 +303,168 @@ class TestMLService(unittest.TestCase):
         self.assertIn('sentiment', data)
         self.assertIn('score', data)
         
+    def test_analyze_contract_batch(self):
+        """Test the batch contract analysis endpoint"""
+        documents = [
+            {"id": "a", "text": "This Agreement is made by and between Acme Corporation and Legal Services LLC. Governing law: the laws of Saudi Arabia."},
+            "This Agreement is subject to arbitration in Riyadh. Payment terms: net 30 days.",
+            {"id": "missing"}
+        ]
+        
+        response = self.app.post('/api/analyze-contract/batch', 
+                                json={'documents': documents},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        results = data['results']
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        self.assertEqual(results[0]['id'], 'a')
+        self.assertEqual(results[0]['contract_type'], 'contract')
+        self.assertIn('Saudi Arabia', results[0]['governing_law'])
+        self.assertIn('clauses', results[1])
+        self.assertIn('error', results[2])
+        
+    def test_batch_and_single_analyses_are_cached_apart(self):
+        """Test that a batch analysis does not answer a single analysis from the cache"""
+        text = "This Agreement is governed by the laws of the Kingdom of Bahrain. Payment is due within 45 days."
+        self.app.post('/api/analyze-contract/batch', json={'documents': [text]}, content_type='application/json')
+        self.assertNotEqual(service.result_cache_key("analyze-contract-batch", text, {"language": "en"}),
+                            service.result_cache_key("analyze-contract", text, {"language": "en"}))
+        self.assertIsNone(service.cached_result(service.result_cache_key("analyze-contract", text, {"language": "en"})))
+        
+    def test_classify_batch_reports_item_errors(self):
+        """Test that a document failing classification does not fail the rest of the batch"""
+        score_document_type = service.score_document_type
+        def failing_score(context):
+            if "unreadable" in context.text:
+                raise ValueError("cannot score")
+            return score_document_type(context)
+        
+        documents = ["SERVICE AGREEMENT between Acme and Legal Services LLC.", "An unreadable contract."]
+        with patch.object(service, 'score_document_type', failing_score):
+            response = self.app.post('/api/classify-document/batch', 
+                                    json={'documents': documents},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(response.data)['results']
+        self.assertEqual(results[0]['document_type'], 'contract')
+        self.assertIn('error', results[1])
+        
+    def test_batch_endpoints_validate_input(self):
+        """Test that batch endpoints reject malformed requests"""
+        for endpoint in ['/api/analyze-contract/batch', '/api/extract-entities/batch', '/api/classify-document/batch']:
+            response = self.app.post(endpoint, json={'text': 'not a batch'}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+            response = self.app.post(endpoint, json={'documents': []}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        
+    def test_extract_entities_batch(self):
+        """Test the batch entity extraction endpoint"""
+        documents = [
+            "John Smith from Acme Corporation will pay $50,000 on March 15, 2025.",
+            {"text": "Sarah Johnson of Legal Services LLC met in Riyadh on 01/02/2025.", "language": "en"}
+        ]
+        
+        response = self.app.post('/api/extract-entities/batch', 
+                                json={'documents': documents},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertEqual(len(data['results']), 2)
+        for result in data['results']:
+            self.assertIn('people', result)
+            self.assertIn('organizations', result)
+            self.assertEqual(result['language'], 'en')
+        self.assertIn('$50,000', data['results'][0]['monetary_values'])
+        
+    def test_classify_document_batch(self):
+        """Test the batch document classification endpoint"""
+        documents = [
+            "SERVICE AGREEMENT. This Agreement is made between Acme Corporation and Legal Services LLC.",
+            "MOTION TO DISMISS. The defendant files this motion and supporting affidavit."
+        ]
+        
+        response = self.app.post('/api/classify-document/batch', 
+                                json={'documents': documents},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        
+        self.assertEqual(data['results'][0]['document_type'], 'contract')
+        self.assertEqual(data['results'][1]['document_type'], 'court_filing')
+        for result in data['results']:
+            self.assertIn('confidence', result)
+            self.assertIn('summary', result)
+        
+    def test_streaming_ndjson_responses(self):
+        """Test NDJSON streaming of batch and summary results"""
+        documents = ["This Agreement is a contract.", {"id": "nda", "text": "This non-disclosure agreement is confidential."}, {}]
+        response = self.app.post('/api/classify-document/batch', 
+                                json={'documents': documents},
+                                headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(sorted(line['index'] for line in lines), [0, 1, 2])
+        self.assertIn('error', next(line for line in lines if line['index'] == 2))
+        self.assertEqual(next(line for line in lines if line['index'] == 1)['id'], 'nda')
+        
+        response = self.app.post('/api/summarize', 
+                                json={'text': 'The parties agree to the terms. Payment is due monthly.'},
+                                headers={'Accept': 'application/x-ndjson'})
+        self.assertEqual(response.status_code, 200)
+        lines = [json.loads(line) for line in response.data.decode('utf-8').splitlines()]
+        self.assertEqual(lines[-1]['type'], 'summary')
+        self.assertTrue(len(lines[-1]['summary']) > 0)
+        
+    def test_submit_and_poll_job(self):
+        """Test the asynchronous job endpoints"""
+        response = self.app.post('/api/jobs', 
+                                json={'type': 'classify-document', 'text': 'This Agreement is a contract between the parties.'},
+                                content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        job_id = json.loads(response.data)['job_id']
+        
+        for _ in range(500):
+            response = self.app.get(f'/api/jobs/{job_id}/result')
+            if response.status_code != 202:
+                break
+            time.sleep(0.01)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['status'], 'succeeded')
+        self.assertIn('document_type', data['result'])
+        
+        # Finished jobs cannot be cancelled, unknown jobs are reported
+        self.assertEqual(self.app.delete(f'/api/jobs/{job_id}').status_code, 409)
+        self.assertEqual(self.app.get('/api/jobs/unknown').status_code, 404)
+        self.assertEqual(self.app.post('/api/jobs', json={'type': 'unknown', 'text': 'x'}).status_code, 400)
+        
+    def test_job_requests_reach_the_owning_replica(self):
+        """Test that requests for a job owned by another replica are relayed to it"""
+        owner_response = MagicMock(status=200)
+        owner_response.read.return_value = b'{"status": "running"}'
+        owner_response.headers.get_content_type.return_value = 'application/json'
+        owner_response.__enter__.return_value = owner_response
+        
+        with patch.object(service, 'JOB_OWNER', 'ml-service-a'), patch.object(service, 'JOB_PEER_DOMAIN', 'ml-jobs'), \
+                patch.object(service.urllib.request, 'urlopen', return_value=owner_response) as urlopen:
+            response = self.app.get('/api/jobs/ml-service-b.0123abcd')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data), {"status": "running"})
+            forwarded = urlopen.call_args[0][0]
+            self.assertEqual(forwarded.full_url, 'http://ml-service-b.ml-jobs:5000/api/jobs/ml-service-b.0123abcd')
+            
+            # Jobs of this replica, relayed requests and ids without an owner are answered here
+            urlopen.reset_mock()
+            self.assertEqual(self.app.get('/api/jobs/ml-service-a.0123abcd').status_code, 404)
+            self.assertEqual(self.app.get('/api/jobs/ml-service-b.0123abcd', headers={'X-Job-Forwarded': '1'}).status_code, 404)
+            self.assertEqual(self.app.get('/api/jobs/0123abcd').status_code, 404)
+            urlopen.assert_not_called()
+        
     def test_arabic_support(self):
         """Test Arabic language support"""
         test_arabic = """
@@ -246,5 +511,172 @@ class TestMLService(unittest.TestCase):
         self.assertIn('language', data)
         self.assertEqual(data['language'], 'ar')
 
+    def test_worker_warm_up(self):
+        """Test that loaded models run the warm-up input once a worker starts"""
+        inputs = []
+        service.model_registry.register("warm_up_stub", lambda: inputs.append)
+        try:
+            service.model_registry.get("warm_up_stub")
+            timings = service.warm_up_models()
+            self.assertEqual(inputs, [service.WARM_UP_TEXT])
+            self.assertIn("warm_up_stub", timings)
+        finally:
+            service.model_registry.evict("warm_up_stub")
+
+    def test_liveness_and_readiness(self):
+        """Test that readiness waits for the required models to be warmed up"""
+        response = self.app.get('/health/live')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['status'], 'alive')
+        
+        service.model_registry.register("ready_stub", lambda: (lambda text: [{"label": "ok", "score": 1.0}]))
+        try:
+            with patch.object(service, 'READY_MODELS', ['ready_stub']), patch.object(service, 'start_warm_up'):
+                response = self.app.get('/health/ready')
+                self.assertEqual(response.status_code, 503)
+                self.assertEqual(json.loads(response.data)['pending'], ['ready_stub'])
+                
+                service.warm_up_models(['ready_stub'])
+                service.run_pipeline('ready_stub', 'text')
+                response = self.app.get('/health/ready')
+                self.assertEqual(response.status_code, 200)
+                data = json.loads(response.data)
+                self.assertEqual(data['status'], 'ready')
+                model = data['models']['ready_stub']
+                self.assertTrue(model['loaded'])
+                self.assertTrue(model['required'])
+                self.assertIsNotNone(model['warm_up_ms'])
+                self.assertIsNotNone(model['last_inference_ms'])
+        finally:
+            service.model_registry.evict("ready_stub")
+            service.warmed_models.pop("ready_stub", None)
+
+    def test_readiness_retries_and_liveness_gives_up(self):
+        """Test that failed warm-ups are retried and repeated load failures fail liveness"""
+        loads = []
+        def flaky_loader():
+            loads.append(1)
+            if len(loads) == 1:
+                raise RuntimeError("hub unavailable")
+            return lambda text: [{"label": "ok", "score": 1.0}]
+        
+        service.model_registry.register("flaky_stub", flaky_loader)
+        try:
+            with patch.object(service, 'READY_MODELS', ['flaky_stub']), patch.object(service, 'start_warm_up'), \
+                    patch.object(service.model_registry, 'retry_after', 0):
+                service.warm_up_models()
+                self.assertEqual(self.app.get('/health/ready').status_code, 503)
+                service.warm_up_retry.join(5)
+                self.assertEqual(self.app.get('/health/ready').status_code, 200)
+                
+                with patch.object(service.model_registry, 'failures', return_value=service.MODEL_LOAD_MAX_ATTEMPTS):
+                    response = self.app.get('/health/live')
+                    self.assertEqual(response.status_code, 503)
+                    self.assertEqual(json.loads(response.data)['failed_models'], ['flaky_stub'])
+        finally:
+            service.model_registry.evict("flaky_stub")
+            service.warmed_models.pop("flaky_stub", None)
+            service.warm_up_errors.pop("flaky_stub", None)
+
+    def test_prepare_fork_only_keeps_fork_safe_models(self):
+        """Test that models other than the spaCy pipelines are left to the workers"""
+        service.model_registry.register("fork_stub", lambda: object())
+        try:
+            service.model_registry.get("fork_stub")
+            unsafe = service.fork_unsafe_models()
+            self.assertIn("fork_stub", unsafe)
+            self.assertFalse(set(unsafe) & set(service.SPACY_PACKAGES))
+            # Other loaded models stay loaded for the tests that follow
+            with patch.object(service, 'per_worker_models', []) as per_worker_models, \
+                    patch.object(service, 'fork_unsafe_models', return_value=["fork_stub"]), patch('gc.freeze'):
+                service.prepare_fork()
+                self.assertFalse(service.model_registry.is_loaded("fork_stub"))
+                self.assertEqual(per_worker_models, ["fork_stub"])
+        finally:
+            service.model_registry.evict("fork_stub")
+
+    def test_readiness_requires_every_model_by_default(self):
+        """Test that readiness waits for every model even when none is preloaded"""
+        with patch.object(service, 'READY_MODELS', ['all']), patch.object(service, 'PRELOAD_MODELS', []):
+            self.assertEqual(set(service.required_models()), set(service.SPACY_PACKAGES) | set(service.TRANSFORMER_MODELS))
+        with patch.object(service, 'READY_MODELS', []):
+            self.assertEqual(service.required_models(), [])
+
+    def test_metrics_endpoint(self):
+        """Test that helper, stage and request timings are exposed for Prometheus"""
+        self.app.post('/api/analyze-contract', json={'text': 'Payment Terms: Net 30 days. This Agreement is governed by the laws of Riyadh.'})
+        response = self.app.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith('text/plain'))
+        body = response.data.decode()
+        self.assertIn('ml_helper_seconds_count{helper="analyze_contract_clauses"}', body)
+        self.assertIn('ml_analysis_stage_seconds_count{stage="clauses"}', body)
+        self.assertIn('ml_http_request_seconds_count{endpoint="/api/analyze-contract",method="POST",status="200"}', body)
+        self.assertIn('ml_result_cache_lookups_total{result="miss"}', body)
+
+    def test_template_differences(self):
+        """Test that a contract close to an earlier one reports the clauses that differ from it"""
+        template = (
+            "This Agreement is made between Acme Corporation and Legal Services LLC for consulting services in Riyadh. "
+            "Payment Terms: the Client shall pay $5,000 per month within 30 days of each invoice issued by the Provider. "
+            "Confidentiality obligations bind both parties for a period of five years after the end of this Agreement. "
+            "Governing law: this Agreement is governed by the laws of the Kingdom of Saudi Arabia in all respects."
+        )
+        edited = template.replace("five years", "ten years, with unlimited liability for any breach")
+        service.fingerprint_store.clear()
+        
+        response = self.app.post('/api/analyze-contract', json={'text': template})
+        self.assertNotIn('template', json.loads(response.data))
+        response = self.app.post('/api/analyze-contract', json={'text': edited})
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(data['template']['similarity'], 0.6)
+        self.assertEqual(data['template']['unchanged_clauses'], 3)
+        changed = data['template']['changed_clauses']
+        self.assertEqual([clause['type'] for clause in changed], ['confidentiality'])
+        self.assertEqual((changed[0]['template_risk_level'], changed[0]['risk_level']), ('low', 'high'))
+        # Nothing identifies or quotes the earlier contract
+        self.assertNotIn('template_id', data['template'])
+        self.assertNotIn('Acme', json.dumps(data['template']))
+
+    def test_request_profiling(self):
+        """Test that admin requests can be profiled and their profiles fetched"""
+        directory = tempfile.mkdtemp()
+        headers = {'X-Profile-Token': 'secret', 'X-Profile': '1'}
+        text = 'Payment Terms: Net 30 days. This Agreement is governed by the laws of Riyadh.'
+        try:
+            with patch.object(service, 'PROFILING_TOKEN', ''), patch.object(service, 'PROFILES_DIR', directory):
+                response = self.app.post('/api/analyze-contract', json={'text': text}, headers=headers)
+                self.assertNotIn('X-Profile-Id', response.headers)
+                self.assertEqual(self.app.get('/admin/profiles', headers=headers).status_code, 404)
+
+            with patch.object(service, 'PROFILING_TOKEN', 'secret'), patch.object(service, 'PROFILES_DIR', directory):
+                self.assertEqual(self.app.get('/admin/profiles', headers={'X-Profile-Token': 'wrong'}).status_code, 403)
+                response = self.app.post('/api/analyze-contract', json={'text': text}, headers=headers)
+                try:
+                    self.assertEqual(response.status_code, 200)
+                    profile_id = response.headers['X-Profile-Id']
+                finally:
+                    # Closing the response stops its profiling session, so a failed
+                    # assertion cannot leave the session lock held for other tests
+                    response.close()
+
+                self.assertIn(profile_id, self.app.get('/admin/profiles', headers=headers).get_json()['profiles'])
+                report = self.app.get(f'/admin/profiles/{profile_id}', headers=headers).get_json()
+                self.assertEqual(report['label'], '/api/analyze-contract')
+                functions = [row['function'] for row in report['cpu_profile']['cumulative']]
+                self.assertTrue(any('analyze_contract' in function for function in functions))
+                self.assertIn('allocations', report['memory'])
+                response = self.app.get(f'/admin/profiles/{profile_id}?format=prof', headers=headers)
+                try:
+                    self.assertEqual(response.status_code, 200)
+                finally:
+                    response.close()
+
+                response = self.app.post('/admin/profile', json={'seconds': 0}, headers=headers)
+                self.assertEqual(response.status_code, 400)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add the parent directory to sys.path to import model_registry.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_registry import ModelRegistry
+
+class TestModelRegistry(unittest.TestCase):
+    def test_loads_on_first_use(self):
+        """Models are only built when first requested"""
+        calls = []
+        registry = ModelRegistry()
+        registry.register("model", lambda: calls.append(1) or "weights")
+
+        self.assertEqual(calls, [])
+        self.assertIn("model", registry)
+        self.assertEqual(registry.get("model"), "weights")
+        self.assertEqual(registry.get("model"), "weights")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(registry.loaded(), ["model"])
+
+    def test_concurrent_first_use_loads_once(self):
+        """Concurrent first requests share a single load"""
+        calls = []
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return object()
+
+        registry = ModelRegistry()
+        registry.register("model", slow_loader)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get("model"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(set(id(result) for result in results)), 1)
+
+    def test_failed_load_is_unavailable(self):
+        """A model that fails to load is reported and not retried before its backoff"""
+        def broken_loader():
+            raise RuntimeError("no weights")
+
+        registry = ModelRegistry()
+        registry.register("model", broken_loader)
+
+        self.assertIsNone(registry.get("model"))
+        self.assertNotIn("model", registry)
+        self.assertEqual(registry.status()["models"]["model"]["error"], "no weights")
+        self.assertIsNone(registry.get("unknown"))
+
+    def test_failed_load_is_retried_with_backoff(self):
+        """A failed model is loaded again once its retry delay has passed"""
+        attempts = []
+        def flaky_loader():
+            attempts.append(time.monotonic())
+            if len(attempts) < 3:
+                raise RuntimeError("hub unavailable")
+            return "model"
+
+        registry = ModelRegistry(retry_after=0.05)
+        registry.register("model", flaky_loader)
+        self.assertIsNone(registry.get("model"))
+        self.assertIsNone(registry.get("model"))
+        self.assertEqual(registry.failures("model"), 1)
+
+        time.sleep(0.06)
+        self.assertIsNone(registry.get("model"))
+        self.assertEqual(registry.failures("model"), 2)
+        self.assertNotIn("model", registry)
+        time.sleep(0.11)
+        self.assertEqual(registry.get("model"), "model")
+        self.assertEqual(registry.failures("model"), 0)
+        self.assertIsNone(registry.status()["models"]["model"]["error"])
+
+    def test_evicts_least_recently_used(self):
+        """Loading past the memory budget evicts the least recently used model"""
+        registry = ModelRegistry(memory_budget=250)
+        for name in ["a", "b", "c"]:
+            registry.register(name, lambda name=name: name, size_hint=100)
+
+        registry.get("a")
+        registry.get("b")
+        registry.get("a")
+        registry.get("c")
+
+        self.assertEqual(sorted(registry.loaded()), ["a", "c"])
+        self.assertEqual(registry.memory_usage(), 200)
+        # Evicted models are reloaded transparently
+        self.assertEqual(registry.get("b"), "b")
+
+    def test_records_inference_latency(self):
+        """The last inference latency of a model is reported in its status"""
+        model = object()
+        registry = ModelRegistry()
+        registry.register("model", lambda: model)
+        self.assertIsNone(registry.status()["models"]["model"]["last_inference_ms"])
+
+        registry.get("model")
+        self.assertEqual(registry.name_of(model), "model")
+        self.assertIsNone(registry.name_of(object()))
+        registry.record_inference("model", 0.25)
+        registry.record_inference(None, 1.0)
+        status = registry.status()["models"]["model"]
+        self.assertEqual(status["last_inference_ms"], 250.0)
+        self.assertEqual(status["inferences"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
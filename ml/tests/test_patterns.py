@@ -0,0 +1,41 @@
+import unittest
+import os
+import re
+import sys
+
+# Add the parent directory to sys.path to import patterns.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from patterns import contract_patterns, date_patterns, money_patterns, fold_case_pattern, scan_contract_text
+
+class TestPatterns(unittest.TestCase):
+    def test_fold_case_pattern_keeps_escapes(self):
+        """Only literals are lowercased; escapes and group names are kept"""
+        self.assertEqual(fold_case_pattern(r"(?i)US\$\s*\d+\S[A-Z]"), r"us\$\s*\d+\S[a-z]")
+        self.assertEqual(fold_case_pattern(r"(?P<Amount>EUR)"), r"(?P<Amount>eur)")
+
+    def test_scan_matches_ignorecase_patterns(self):
+        """The combined scan returns the same values as the raw IGNORECASE patterns"""
+        text = (
+            "This Agreement is EFFECTIVE AS OF January 15, 2025 by and between Acme Corporation and Legal Services LLC. "
+            "PAYMENT TERMS: USD 5,000 per month; late fees of 1,500.00 riyals. "
+            "It shall terminate on 31/12/2026. Governing Law: the laws of Saudi Arabia. "
+            "Signed on the 3rd of March 2025."
+        )
+        result = scan_contract_text(text)
+
+        for field in ["effective_date", "termination_date", "payment_terms", "governing_law"]:
+            self.assertEqual(result[field], re.search(contract_patterns[field], text, re.IGNORECASE).group(1))
+        self.assertEqual(result["parties"], [m.group(1) for m in re.finditer(contract_patterns["parties"], text, re.IGNORECASE)])
+        self.assertEqual(result["dates"], [d for p in date_patterns for d in re.findall(p, text, re.IGNORECASE)])
+        self.assertEqual(result["monetary_values"], [v for p in money_patterns for v in re.findall(p, text, re.IGNORECASE)])
+        self.assertEqual(result["effective_date"], "January 15, 2025")
+
+    def test_scan_handles_length_changing_case(self):
+        """Texts whose lowercase form changes length still return original slices"""
+        text = "İstanbul office. Effective date: March 1, 2025. Fee: $1,000."
+        result = scan_contract_text(text)
+        self.assertEqual(result["effective_date"], "March 1, 2025")
+        self.assertEqual(result["monetary_values"], ["$1,000"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path to import profiling.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from profiling import ProfileSession, ProfilingBusy, list_profiles, profile_path, profile_window
+
+def scan_clauses(text):
+    return [match.group() for match in re.finditer(r"\bshall\b \w+", text)]
+
+class TestProfiling(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_session_reports_calls_samples_and_allocations(self):
+        """A session has the calls of its thread, stack samples of other threads and new allocations"""
+        text = "The Provider shall deliver the services. " * 2000
+        held = []
+        session = ProfileSession("test", interval=0.001).start()
+        try:
+            def work():
+                # Keep working until the sampler has caught this thread in scan_clauses
+                deadline = time.monotonic() + 10
+                while time.monotonic() < deadline:
+                    held.append(scan_clauses(text))
+                    if any("scan_clauses" in stack for stack in list(session.sampler.stacks)):
+                        break
+            worker = threading.Thread(target=work)
+            worker.start()
+            worker.join()
+            held.append(scan_clauses(text))
+        finally:
+            session.stop()
+        report = session.report()
+
+        functions = [row["function"] for row in report["cpu_profile"]["cumulative"]]
+        self.assertTrue(any("scan_clauses" in function for function in functions))
+        self.assertGreater(report["samples"]["samples"], 0)
+        self.assertTrue(any("scan_clauses" in row["function"] for row in report["samples"]["total"]))
+        self.assertGreater(sum(row["size_diff_kb"] for row in report["memory"]["allocations"]), 0)
+
+    def test_one_session_at_a_time(self):
+        session = ProfileSession("first").start()
+        try:
+            with self.assertRaises(ProfilingBusy):
+                ProfileSession("second").start()
+        finally:
+            session.stop()
+        ProfileSession("third").start().stop()
+
+    def test_save_and_prune(self):
+        """Saved profiles can be listed and read back; the oldest are deleted beyond `keep`"""
+        ids = []
+        for _ in range(3):
+            session = ProfileSession("test").start()
+            scan_clauses("It shall work.")
+            session.stop().save(self.directory, keep=2)
+            ids.append(session.id)
+            time.sleep(0.01)
+        self.assertEqual(list_profiles(self.directory), ids[:0:-1])
+        for extension in ("json", "prof", "folded"):
+            self.assertIsNotNone(profile_path(self.directory, ids[-1], extension))
+        self.assertIsNone(profile_path(self.directory, "../secret", "json"))
+        self.assertIsNone(profile_path(self.directory, ids[-1], "txt"))
+
+    def test_profile_window(self):
+        """A window samples for the given time, then stores its profile"""
+        session = profile_window(0.05, self.directory, interval=0.001)
+        deadline = time.monotonic() + 5
+        while profile_path(self.directory, session.id, "json") is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNotNone(profile_path(self.directory, session.id, "json"))
+        self.assertIsNone(profile_path(self.directory, session.id, "prof"))
+
+if __name__ == '__main__':
+    unittest.main()
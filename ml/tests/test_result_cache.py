@@ -0,0 +1,62 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to sys.path to import result_cache.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from result_cache import ResultCache, make_cache_key
+
+class TestResultCache(unittest.TestCase):
+    def test_key_normalizes_text_and_includes_parameters(self):
+        """Whitespace differences share a key; parameters and versions do not"""
+        key = make_cache_key("summarize", "Some  contract\n text", {"max_length": 150}, "v1")
+        self.assertEqual(key, make_cache_key("summarize", " Some contract text ", {"max_length": 150}, "v1"))
+        self.assertNotEqual(key, make_cache_key("summarize", "Some contract text", {"max_length": 100}, "v1"))
+        self.assertNotEqual(key, make_cache_key("summarize", "Some contract text", {"max_length": 150}, "v2"))
+        self.assertNotEqual(key, make_cache_key("classify-document", "Some contract text", {"max_length": 150}, "v1"))
+
+    def test_exact_text_keys(self):
+        """Without normalization, whitespace differences get separate keys"""
+        key = make_cache_key("answer-question", "Pays  $5,000", normalize=False)
+        self.assertNotEqual(key, make_cache_key("answer-question", "Pays $5,000", normalize=False))
+        self.assertEqual(key, make_cache_key("answer-question", "Pays  $5,000", normalize=False))
+
+    def test_memory_tier_lru_and_stats(self):
+        """The in-process tier evicts least recently used entries and counts hits"""
+        cache = ResultCache(max_entries=2)
+        cache.set("a", {"value": 1})
+        cache.set("b", {"value": 2})
+        self.assertEqual(cache.get("a"), {"value": 1})
+        cache.set("c", {"value": 3})
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), {"value": 3})
+        stats = cache.stats()
+        self.assertEqual(stats["memory_hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["memory_entries"], 2)
+
+    def test_entries_expire(self):
+        """Entries older than the TTL are not returned"""
+        cache = ResultCache(ttl=0.05)
+        cache.set("a", {"value": 1})
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_is_shared(self):
+        """Separate cache instances share results through the SQLite tier"""
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "cache.db")
+            ResultCache(db_path=db_path).set("a", {"summary": "text"})
+
+            cache = ResultCache(db_path=db_path)
+            self.assertEqual(cache.get("a"), {"summary": "text"})
+            self.assertEqual(cache.get("a"), {"summary": "text"})
+            stats = cache.stats()
+            self.assertEqual(stats["disk_hits"], 1)
+            self.assertEqual(stats["memory_hits"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
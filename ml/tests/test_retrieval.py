@@ -0,0 +1,42 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import retrieval.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from retrieval import PassageIndex, PassageIndexCache, split_passages
+
+class TestRetrieval(unittest.TestCase):
+    def test_passages_overlap_and_map_to_offsets(self):
+        """Passages are overlapping word windows with offsets into the text"""
+        text = " ".join(f"w{i}" for i in range(10))
+        spans = split_passages(text, passage_words=4, stride_words=2)
+
+        self.assertEqual([text[start:end] for start, end in spans], [
+            "w0 w1 w2 w3", "w2 w3 w4 w5", "w4 w5 w6 w7", "w6 w7 w8 w9"
+        ])
+        self.assertEqual(split_passages("   "), [])
+
+    def test_ranks_relevant_passage_first(self):
+        """The passage sharing rare terms with the question ranks first"""
+        filler = " ".join(["The parties agree to the terms of this agreement."] * 20)
+        text = filler + " The liability cap is limited to fees paid in the previous twelve months. " + filler
+        index = PassageIndex(text, passage_words=30, stride_words=15)
+
+        best = index.rank("What is the liability cap?", top_k=1)[0]
+        self.assertIn("liability cap", index.passages[best])
+        start, end = index.spans[best]
+        self.assertEqual(text[start:end], index.passages[best])
+
+    def test_index_cache_reuses_index_per_document(self):
+        """The same document gets the same index until it is evicted"""
+        cache = PassageIndexCache(max_entries=1)
+        first = cache.get("The liability cap is one million riyals.")
+
+        self.assertIs(cache.get("The liability cap is one million riyals."), first)
+        cache.get("Notice must be given in writing.")
+        self.assertIsNot(cache.get("The liability cap is one million riyals."), first)
+        self.assertEqual(cache.stats(), {"entries": 1, "hits": 1, "misses": 3})
+
+if __name__ == '__main__':
+    unittest.main()
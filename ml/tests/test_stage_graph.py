@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the parent directory to sys.path to import stage_graph.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from stage_graph import Stage, StageError, order_stages, run_stages
+
+class TestStageGraph(unittest.TestCase):
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.executor.shutdown(wait=False)
+
+    def test_dependencies_receive_outputs(self):
+        """Stages get the outputs of their dependencies as arguments"""
+        stages = [
+            Stage("total", lambda a, b: a + b, depends_on=["a", "b"]),
+            Stage("a", lambda: 2),
+            Stage("b", lambda: 3)
+        ]
+        for executor in (None, self.executor):
+            results = run_stages(stages, executor)
+            self.assertEqual(results.values, {"a": 2, "b": 3, "total": 5})
+            self.assertFalse(results.partial)
+
+    def test_independent_stages_run_concurrently(self):
+        """Independent stages overlap instead of running back to back"""
+        barrier = threading.Barrier(3, timeout=2)
+        stages = [Stage(name, lambda: barrier.wait() is not None) for name in ("a", "b", "c")]
+
+        started = time.monotonic()
+        results = run_stages(stages, self.executor)
+        self.assertEqual(results.values, {"a": True, "b": True, "c": True})
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_optional_stage_timeout_gives_partial_results(self):
+        """A late optional stage and its dependents are left out"""
+        release = threading.Event()
+        stages = [
+            Stage("fast", lambda: "done", timeout=1),
+            Stage("slow", lambda: release.wait(5), timeout=0.05, optional=True),
+            Stage("after_slow", lambda value: value, depends_on=["slow"], optional=True)
+        ]
+        results = run_stages(stages, self.executor)
+        release.set()
+
+        self.assertEqual(results.values, {"fast": "done"})
+        self.assertTrue(results.partial)
+        self.assertIn("timed out", results.failed["slow"])
+        self.assertIn("skipped", results.failed["after_slow"])
+
+    def test_abandoned_optional_stages_do_not_delay_required_ones(self):
+        """Optional stages left running after their deadline do not occupy the required stages' pool"""
+        release = threading.Event()
+        optional_executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            for _ in range(6):
+                results = run_stages([
+                    Stage("clauses", lambda: "done", timeout=1),
+                    Stage("summary", lambda: release.wait(5), timeout=0.05, optional=True)
+                ], self.executor, optional_executor)
+                self.assertEqual(results.values, {"clauses": "done"})
+                self.assertIn("timed out", results.failed["summary"])
+        finally:
+            release.set()
+            optional_executor.shutdown(wait=False)
+
+    def test_queued_required_stage_deadline_starts_when_it_runs(self):
+        """A required stage does not time out while it waits for a busy pool"""
+        executor = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        try:
+            executor.submit(release.wait, 5)
+            threading.Timer(0.2, release.set).start()
+            results = run_stages([Stage("clauses", lambda: "done", timeout=0.1)], executor)
+            self.assertEqual(results.values, {"clauses": "done"})
+        finally:
+            release.set()
+            executor.shutdown(wait=False)
+
+    def test_running_required_stage_times_out(self):
+        """A required stage that runs past its deadline aborts the run"""
+        release = threading.Event()
+        try:
+            with self.assertRaises(StageError) as raised:
+                run_stages([Stage("clauses", lambda: release.wait(5), timeout=0.05)], self.executor)
+            self.assertIn("timed out", raised.exception.reason)
+        finally:
+            release.set()
+
+    def test_required_stage_failure_raises(self):
+        """A failing required stage aborts the run"""
+        def fail():
+            raise RuntimeError("model unavailable")
+
+        for executor in (None, self.executor):
+            with self.assertRaises(StageError) as raised:
+                run_stages([Stage("ok", lambda: 1), Stage("broken", fail)], executor)
+            self.assertEqual(raised.exception.stage, "broken")
+
+    def test_invalid_graphs_are_rejected(self):
+        """Unknown dependencies and cycles are reported"""
+        with self.assertRaises(ValueError):
+            order_stages([Stage("a", lambda x: x, depends_on=["missing"])])
+        with self.assertRaises(ValueError):
+            order_stages([Stage("a", lambda x: x, depends_on=["b"]), Stage("b", lambda x: x, depends_on=["a"])])
+
+if __name__ == '__main__':
+    unittest.main()
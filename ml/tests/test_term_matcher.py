@@ -0,0 +1,41 @@
+import unittest
+import os
+import sys
+import random
+
+# Add the parent directory to sys.path to import term_matcher.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from term_matcher import TermMatcher
+
+class TestTermMatcher(unittest.TestCase):
+    def test_finds_overlapping_terms(self):
+        """Terms inside or overlapping a longer match are still reported"""
+        matcher = TermMatcher({
+            "high": ["unlimited liability", "without notice"],
+            "low": ["limited liability", "notice period"]
+        })
+        hits = matcher.scan("Unlimited Liability applies without notice period.")
+
+        self.assertEqual(hits["unlimited liability"], [0])
+        self.assertEqual(hits["limited liability"], [2])
+        self.assertEqual(hits["without notice"], [28])
+        self.assertEqual(hits["notice period"], [36])
+        self.assertEqual(matcher.count_terms(hits), {"high": 2, "low": 2})
+
+    def test_matches_substring_semantics(self):
+        """Results agree with a brute-force substring search"""
+        random.seed(7)
+        for _ in range(200):
+            terms = list({"".join(random.choice("ab c") for _ in range(random.randint(1, 5))) for _ in range(8)})
+            text = "".join(random.choice("ab cAB") for _ in range(60))
+            matcher = TermMatcher({"terms": terms})
+
+            expected = {}
+            for term in set(term.lower() for term in terms):
+                positions = [i for i in range(len(text)) if text.lower().startswith(term, i)]
+                if positions:
+                    expected[term] = positions
+            self.assertEqual(dict(matcher.scan(text)), expected)
+
+if __name__ == '__main__':
+    unittest.main()
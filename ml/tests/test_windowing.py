@@ -0,0 +1,98 @@
+import unittest
+import os
+import sys
+
+# Add the parent directory to sys.path to import windowing.py
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from windowing import aggregate_window_scores, chunk_sentences, model_max_tokens, select_evenly, split_text, token_windows
+
+class WhitespaceTokenizer:
+    """Counts one token per word"""
+    def __call__(self, texts, add_special_tokens=False):
+        return {"input_ids": [text.split() for text in texts]}
+
+    def encode(self, text, add_special_tokens=False):
+        return text.split()
+
+class FastCharacterTokenizer:
+    """Fast tokenizer stand-in with one token per two characters of each word"""
+    is_fast = True
+    model_max_length = 8
+
+    def __call__(self, text, add_special_tokens=False, return_offsets_mapping=False):
+        offsets = []
+        position = 0
+        for word in text.split():
+            start = text.index(word, position)
+            offsets.extend((i, min(i + 2, start + len(word))) for i in range(start, start + len(word), 2))
+            position = start + len(word)
+        return {"input_ids": list(range(len(offsets))), "offset_mapping": offsets}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+class TestWindowing(unittest.TestCase):
+    def test_chunks_end_on_sentence_boundaries(self):
+        """Sentences are packed into chunks without exceeding the token budget"""
+        sentences = ["one two three.", "four five.", "six seven eight nine.", "ten."]
+        chunks = chunk_sentences(sentences, WhitespaceTokenizer(), max_tokens=5)
+
+        self.assertEqual(chunks, [
+            ("one two three. four five.", 5),
+            ("six seven eight nine. ten.", 5)
+        ])
+
+    def test_long_sentences_are_split(self):
+        """A sentence longer than the window is split on word boundaries"""
+        sentence = " ".join(f"w{i}" for i in range(12))
+        chunks = chunk_sentences([sentence], WhitespaceTokenizer(), max_tokens=5)
+
+        self.assertTrue(all(tokens <= 5 for _, tokens in chunks))
+        self.assertEqual(" ".join(chunk for chunk, _ in chunks), sentence)
+
+    def test_select_evenly(self):
+        """Selection keeps the first and last items and spreads the rest"""
+        self.assertEqual(select_evenly(list(range(10)), 4), [0, 3, 6, 9])
+        self.assertEqual(select_evenly([1, 2], 5), [1, 2])
+
+    def test_model_max_tokens(self):
+        """The window leaves room for special tokens and ignores unlimited sentinels"""
+        self.assertEqual(model_max_tokens(FastCharacterTokenizer()), 6)
+        self.assertEqual(model_max_tokens(None, default=100), 100)
+
+        unlimited = FastCharacterTokenizer()
+        unlimited.model_max_length = int(1e30)
+        self.assertEqual(model_max_tokens(unlimited, default=512), 510)
+
+    def test_token_windows_overlap_by_stride(self):
+        """Windows are slices of the text measured in tokens, overlapping by the stride"""
+        text = "abcd efgh ijkl mnop"
+        windows = token_windows(FastCharacterTokenizer(), text, max_tokens=4, stride=2)
+
+        self.assertEqual(windows, [("abcd efgh", 4), ("efgh ijkl", 4), ("ijkl mnop", 4)])
+        self.assertEqual(token_windows(None, "one two three", max_tokens=5), [("one two three", 3)])
+        self.assertEqual(token_windows(None, "", max_tokens=5), [("", 0)])
+
+    def test_aggregate_window_scores(self):
+        """Label scores are averaged over windows weighted by length"""
+        scores = aggregate_window_scores(
+            [[{"label": "5 stars", "score": 0.9}], {"label": "1 star", "score": 0.6}],
+            [300, 100]
+        )
+        self.assertEqual([item["label"] for item in scores], ["5 stars", "1 star"])
+        self.assertAlmostEqual(scores[0]["score"], 0.675)
+        self.assertAlmostEqual(scores[1]["score"], 0.15)
+
+    def test_split_text_on_whitespace(self):
+        """Long texts are split at whitespace into pieces that rebuild the text"""
+        text = "first paragraph here.\n\nsecond paragraph is longer than the rest"
+        pieces = split_text(text, 25)
+
+        self.assertTrue(all(len(piece) <= 25 for _, piece in pieces))
+        self.assertEqual(pieces[0], (0, "first paragraph here.\n\n"))
+        self.assertEqual("".join(piece for _, piece in pieces), text)
+        self.assertTrue(all(text[start:start + len(piece)] == piece for start, piece in pieces))
+        self.assertEqual(split_text("short", 25), [(0, "short")])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import re
+from collections import defaultdict
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+WORD_PATTERN = re.compile(r'\S+\s*')
+WORD_SPAN_PATTERN = re.compile(r'\S+')
+
+# Tokenizers without a length limit report a huge sentinel value instead
+MAX_MODEL_LENGTH = 100000
+
+
+def count_tokens(tokenizer, text):
+    """Number of model tokens in a text, without special tokens"""
+    if tokenizer is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def count_tokens_batch(tokenizer, texts):
+    """Token counts for several texts with one tokenizer call"""
+    if tokenizer is None:
+        return [max(1, len(text) // CHARS_PER_TOKEN) for text in texts]
+    if not texts:
+        return []
+    encoded = tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+    return [len(ids) for ids in encoded]
+
+
+def split_long_sentence(sentence, tokens, max_tokens):
+    """Split a sentence that exceeds the window into word-aligned pieces"""
+    pieces_needed = -(-tokens // max_tokens)
+    words = WORD_PATTERN.findall(sentence)
+    words_per_piece = max(1, -(-len(words) // pieces_needed))
+    return [
+        "".join(words[i:i + words_per_piece]).strip()
+        for i in range(0, len(words), words_per_piece)
+    ]
+
+
+def chunk_sentences(sentences, tokenizer, max_tokens):
+    """Pack consecutive sentences into chunks of at most `max_tokens` tokens
+
+    Chunks always end on a sentence boundary, except when a single sentence is
+    longer than the window; such sentences are split on word boundaries.
+    Returns a list of (chunk_text, token_count) tuples.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for sentence, tokens in zip(sentences, count_tokens_batch(tokenizer, sentences)):
+        if tokens > max_tokens:
+            pieces = split_long_sentence(sentence, tokens, max_tokens)
+        else:
+            pieces = [sentence]
+
+        for piece in pieces:
+            piece_tokens = tokens if len(pieces) == 1 else count_tokens(tokenizer, piece)
+            if current and current_tokens + piece_tokens > max_tokens:
+                chunks.append((" ".join(current), current_tokens))
+                current = []
+                current_tokens = 0
+            current.append(piece)
+            current_tokens += piece_tokens
+
+    if current:
+        chunks.append((" ".join(current), current_tokens))
+    return chunks
+
+
+def select_evenly(items, limit):
+    """Keep at most `limit` items, spread evenly over the sequence"""
+    if limit <= 0 or len(items) <= limit:
+        return list(items)
+    if limit == 1:
+        return [items[0]]
+    step = (len(items) - 1) / (limit - 1)
+    return [items[round(i * step)] for i in range(limit)]
+
+
+def model_max_tokens(tokenizer, default=512):
+    """Number of text tokens that fit one model input, leaving room for special tokens"""
+    if tokenizer is None:
+        return default
+    limit = getattr(tokenizer, "model_max_length", None)
+    if not limit or limit > MAX_MODEL_LENGTH:
+        limit = default
+    try:
+        special_tokens = tokenizer.num_special_tokens_to_add()
+    except Exception:
+        special_tokens = 2
+    return max(1, limit - special_tokens)
+
+
+def token_offsets(tokenizer, text):
+    """Character (start, end) span of each model token in the text
+
+    Fast tokenizers report exact offsets; otherwise every word counts as one
+    token, which undercounts, so callers should leave some headroom.
+    """
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return [(start, end) for start, end in encoded["offset_mapping"] if end > start]
+    return [match.span() for match in WORD_SPAN_PATTERN.finditer(text)]
+
+
+def token_windows(tokenizer, text, max_tokens, stride=0):
+    """Split text into windows of at most `max_tokens` model tokens
+
+    Consecutive windows overlap by `stride` tokens so content cut at one
+    boundary appears whole in the next window. Windows are slices of the
+    original text. Returns a list of (window_text, token_count) tuples; a text
+    without tokens is returned as a single window.
+    """
+    offsets = token_offsets(tokenizer, text)
+    if not offsets:
+        return [(text, 0)]
+    stride = max(0, min(stride, max_tokens // 2))
+    step = max(1, max_tokens - stride)
+
+    windows = []
+    for first in range(0, len(offsets), step):
+        last = min(first + max_tokens, len(offsets)) - 1
+        windows.append((text[offsets[first][0]:offsets[last][1]], last - first + 1))
+        if last == len(offsets) - 1:
+            break
+    return windows
+
+
+def aggregate_window_scores(predictions, weights):
+    """Combine the label predictions of several windows of one text
+
+    `predictions` holds the classification pipeline output of each window (a
+    list of {"label", "score"} dicts). Each label's score is averaged over all
+    windows, weighted by `weights` (typically the window token counts), and
+    the labels are returned best first in the pipeline's output format.
+    """
+    totals = defaultdict(float)
+    weights = [max(1, weight) for weight in weights]
+    for prediction, weight in zip(predictions, weights):
+        if isinstance(prediction, dict):
+            prediction = [prediction]
+        for item in prediction:
+            totals[item["label"]] += weight * item["score"]
+    total_weight = sum(weights) or 1
+    return sorted(
+        ({"label": label, "score": score / total_weight} for label, score in totals.items()),
+        key=lambda item: item["score"],
+        reverse=True
+    )
+
+
+def split_text(text, max_chars):
+    """Split text into pieces of at most `max_chars` characters
+
+    Pieces end at the last paragraph break, line break or space before the
+    limit when there is one, so words are not cut. Returns (start, piece)
+    tuples; the pieces concatenate back to the original text.
+    """
+    pieces = []
+    start = 0
+    while len(text) - start > max_chars:
+        end = start + max_chars
+        for separator in ("\n\n", "\n", " "):
+            boundary = text.rfind(separator, start + 1, end)
+            if boundary != -1:
+                end = boundary + len(separator)
+                break
+        pieces.append((start, text[start:end]))
+        start = end
+    pieces.append((start, text[start:]))
+    return pieces